@@ -1,6 +1,10 @@
+from typing import Any
+
+from django.db.models import Model
 from rest_framework import serializers
 
 from apps.category.models import Category, Style
+from apps.category.utils import get_taxonomy_id
 
 
 class CategorySerializer(serializers.ModelSerializer[Category]):
@@ -13,3 +17,29 @@ class StyleSerializer(serializers.ModelSerializer[Style]):
     class Meta:
         model = Style
         fields = ("id", "name")
+
+
+class TaxonomySlugRelatedField(serializers.SlugRelatedField[Model]):
+    """
+    카테고리/스타일 이름을 db 대신 캐싱된 목록(get_taxonomy)에서 찾아서 id만 채운 객체로 변환
+    캐시에 없는 이름(다른 프로세스에서 방금 추가된 경우 등)만 기존처럼 db에서 조회
+    다른 프로세스에서 삭제된 뒤 캐시가 갱신되기 전(최대 TAXONOMY_LOCAL_CACHE_TIME)에는 삭제된 id가 반환될 수 있으므로
+    저장하다 IntegrityError 가 발생하면 to_db_value 로 db에서 다시 조회 (ProductSerializer.save 참고)
+    """
+
+    def __init__(self, taxonomy_kind: str, **kwargs: Any) -> None:
+        self.taxonomy_kind = taxonomy_kind
+        super().__init__(slug_field="name", **kwargs)
+
+    def to_internal_value(self, data: Any) -> Model:
+        taxonomy_id = get_taxonomy_id(self.taxonomy_kind, str(data))
+        if taxonomy_id is None:
+            return super().to_internal_value(data)
+        # db에서 조회한 객체처럼 만들어서 FK 저장, M2M set 에 그대로 사용할 수 있도록 함
+        queryset = self.get_queryset()
+        assert queryset is not None
+        return queryset.model.from_db(queryset.db, ["id", "name"], [taxonomy_id, str(data)])
+
+    def to_db_value(self, obj: Model) -> Model:
+        # 캐시된 id 대신 이름으로 db에서 다시 조회, 삭제된 이름이면 ValidationError(does_not_exist)
+        return super().to_internal_value(getattr(obj, self.slug_field))
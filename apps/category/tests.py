@@ -8,8 +8,10 @@ from apps.category.models import Category, Style
 
 class CategoryListTest(TestCase):
     def setUp(self) -> None:
-        Category.objects.create(name="test_category1")
-        Category.objects.create(name="test_category2")
+        # 목록 캐시 버전은 커밋 후에 올라가므로 on_commit 콜백을 실행
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="test_category1")
+            Category.objects.create(name="test_category2")
 
     def test_get_all_categories(self) -> None:
         """
@@ -25,8 +27,9 @@ class CategoryListTest(TestCase):
 
 class StyleListTest(TestCase):
     def setUp(self) -> None:
-        Style.objects.create(name="test_style1")
-        Style.objects.create(name="test_style2")
+        with self.captureOnCommitCallbacks(execute=True):
+            Style.objects.create(name="test_style1")
+            Style.objects.create(name="test_style2")
 
     def test_get_all_styles(self) -> None:
         client = APIClient()
@@ -34,3 +37,33 @@ class StyleListTest(TestCase):
         response = client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
+
+
+class TaxonomyCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            Style.objects.create(name="test_style1")
+
+    def test_not_modified_until_taxonomy_changes(self) -> None:
+        url = reverse("style-list")
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # 같은 ETag 로 다시 요청하면 db를 조회하지 않고 304 응답
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 스타일이 추가되어도 커밋 전에는 버전이 바뀌지 않음
+        with self.captureOnCommitCallbacks(execute=True):
+            Style.objects.create(name="test_style2")
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 커밋되면 버전이 바뀌어서 새 목록을 응답
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual([style["name"] for style in response.json()], ["test_style1", "test_style2"])
@@ -0,0 +1,92 @@
+import time
+from typing import Any, Optional, cast
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.category.models import Category, Style
+
+TAXONOMY_KEY = "taxonomy"
+TAXONOMY_VERSION_KEY = f"{TAXONOMY_KEY}:version"
+
+# 프로세스마다 유지하는 카테고리/스타일 캐시, TAXONOMY_LOCAL_CACHE_TIME 마다 redis의 버전과 비교해서 갱신
+local_taxonomy: dict[str, Any] = {}
+
+
+def get_taxonomy_version() -> int:
+    version = cache.get(TAXONOMY_VERSION_KEY)
+    if version is None:
+        # 버전 키는 만료되지 않도록 timeout=None 으로 저장
+        cache.add(TAXONOMY_VERSION_KEY, 1, None)
+        version = cache.get(TAXONOMY_VERSION_KEY, 1)
+    return int(version)
+
+
+def bump_taxonomy_version() -> None:
+    try:
+        cache.incr(TAXONOMY_VERSION_KEY)
+    except ValueError:
+        cache.add(TAXONOMY_VERSION_KEY, 2, None)
+    # 현재 프로세스는 다음 조회에서 바로 redis의 버전을 확인하도록 함
+    clear_local_taxonomy()
+
+
+def build_taxonomy(version: int) -> dict[str, Any]:
+    return {
+        "version": version,
+        "categories": list(Category.objects.order_by("id").values("id", "name")),
+        "styles": list(Style.objects.order_by("id").values("id", "name")),
+        # 버전이 바뀐 뒤 처음 만들어진 시각을 Last-Modified 로 사용 (삭제도 버전을 올리므로 updated_at 대신 사용)
+        "last_modified": int(time.time()),
+    }
+
+
+def get_taxonomy() -> dict[str, Any]:
+    """
+    카테고리/스타일 목록을 프로세스 메모리 -> redis -> db 순서로 조회
+    카테고리/스타일이 저장, 삭제되면 버전이 올라가서 다른 프로세스도 TAXONOMY_LOCAL_CACHE_TIME 안에 새 목록을 사용
+    """
+    now = time.monotonic()
+    if local_taxonomy and now - local_taxonomy["checked_at"] < settings.TAXONOMY_LOCAL_CACHE_TIME:
+        return cast(dict[str, Any], local_taxonomy["taxonomy"])
+
+    version = get_taxonomy_version()
+    if local_taxonomy.get("version") != version:
+        key = f"{TAXONOMY_KEY}:v{version}"
+        taxonomy = cache.get(key)
+        if taxonomy is None:
+            taxonomy = build_taxonomy(version)
+            cache.set(key, taxonomy, settings.TAXONOMY_CACHE_TIME)
+        local_taxonomy.update(
+            version=version,
+            taxonomy=taxonomy,
+            # 이름으로 id를 찾는 serializer 에서 사용
+            category_ids={category["name"]: category["id"] for category in taxonomy["categories"]},
+            style_ids={style["name"]: style["id"] for style in taxonomy["styles"]},
+        )
+    local_taxonomy["checked_at"] = now
+    return cast(dict[str, Any], local_taxonomy["taxonomy"])
+
+
+def clear_local_taxonomy() -> None:
+    # 다음 조회에서 redis의 버전을 바로 확인하도록 현재 프로세스의 캐시만 비움
+    local_taxonomy.clear()
+
+
+def get_taxonomy_id(kind: str, name: str) -> Optional[int]:
+    # kind: "category" 또는 "style", 캐시에 없는 이름이면 None
+    get_taxonomy()
+    ids: dict[str, int] = local_taxonomy[f"{kind}_ids"]
+    return ids.get(name)
+
+
+@receiver(post_save, sender=Category)  # type: ignore
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Style)
+@receiver(post_delete, sender=Style)
+def taxonomy_changed(sender, **kwargs: Any) -> None:
+    # 커밋 전에 버전을 올리면 다른 프로세스가 변경 전 목록을 새 버전으로 다시 캐싱할 수 있으므로 커밋 후에 올림
+    transaction.on_commit(bump_taxonomy_version)
@@ -1,18 +1,46 @@
+from typing import Any
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import generics, permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
 
 from apps.category.models import Category, Style
 from apps.category.serializers import CategorySerializer, StyleSerializer
+from apps.category.utils import get_taxonomy
+
+
+class TaxonomyListMixin:
+    """
+    db 대신 캐싱된 카테고리/스타일 목록(get_taxonomy)으로 응답하고,
+    목록 버전으로 만든 ETag 와 Last-Modified 가 요청의 If-None-Match / If-Modified-Since 와 같으면 304 응답
+    """
+
+    taxonomy_key = ""
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        taxonomy = get_taxonomy()
+        headers = {"ETag": f'"{self.taxonomy_key}-{taxonomy["version"]}"'}
+        headers["Last-Modified"] = http_date(taxonomy["last_modified"])
+        not_modified = get_conditional_response(request, etag=headers["ETag"], last_modified=taxonomy["last_modified"])
+        if not_modified is not None:
+            # ListAPIView.list 와 같이 Response 로 응답 (304 는 본문 없이 헤더만 보냄)
+            return Response(status=not_modified.status_code, headers=headers)
+        return Response(taxonomy[self.taxonomy_key], headers=headers)
 
 
-class CategoryListView(generics.ListAPIView[Category]):
+class CategoryListView(TaxonomyListMixin, generics.ListAPIView[Category]):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    taxonomy_key = "categories"
 
 
-class StyleListView(generics.ListAPIView[Style]):
+class StyleListView(TaxonomyListMixin, generics.ListAPIView[Style]):
     queryset = Style.objects.all()
     serializer_class = StyleSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    taxonomy_key = "styles"
@@ -1,57 +1,150 @@
 import asyncio
 import logging
-from collections import defaultdict
-from typing import Any, DefaultDict, Optional
+import time
+import uuid
+from typing import Any, Optional
 
 from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 from django.http import QueryDict
 from django.utils import timezone
-from django_redis import get_redis_connection
 
-from apps.chat.models import Chatroom
 from apps.chat.utils import (
+    ChatroomState,
+    add_presence,
     cashe_set_chat_message,
-    check_entered_chatroom,
+    cashe_set_chat_messages,
     check_opponent_online,
-    get_group_name,
-    save_redis_to_postgres,
-    save_remaining_messages_to_postgres,
+    get_chat_image_data,
+    get_chatroom_state,
+    remove_presence,
 )
 from apps.notification.utils import chat_notification
 
 logger = logging.getLogger(__name__)
-redis_conn = get_redis_connection("default")
 
 
-class ChatConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
-    disconnect_locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+class ChatMessageBatcher:
+    """
+    CHAT_MESSAGE_BATCH_WINDOW(초) 동안 같은 프로세스에서 채팅방별로 들어온 메시지를 모아서
+    한 번의 redis 파이프라인으로 저장하고 chat_messages 프레임 하나로 그룹에 전송
+    메시지마다 redis 왕복과 group_send가 반복되는 단체 채팅처럼 메시지가 몰리는 채팅방에서 사용
+    """
+
+    def __init__(self) -> None:
+        self.pending: dict[str, list[tuple[dict[str, Any], Optional[int]]]] = {}
+        # 채팅방별로 redis 저장에 연속으로 실패한 횟수
+        self.retries: dict[str, int] = {}
+        # 실행중인 flush 태스크가 가비지 컬렉션되지 않도록 참조를 유지
+        self.tasks: set[asyncio.Task[None]] = set()
+
+    def add(self, channel_layer: Any, chat_group_name: str, data: dict[str, Any], recipient_id: Optional[int]) -> None:
+        messages = self.get_pending(channel_layer, chat_group_name)
+        # redis 장애가 길어져도 메모리가 계속 늘어나지 않도록 모아둘 수 있는 메시지 수를 제한
+        if len(messages) >= settings.CHAT_MESSAGE_BATCH_MAX_PENDING:
+            logger.error(
+                "채팅방 %s의 저장 대기 메시지가 가득 차서 메시지를 버립니다: %s", chat_group_name, data["uuid"]
+            )
+            return
+        messages.append((data, recipient_id))
+
+    def get_pending(self, channel_layer: Any, chat_group_name: str) -> list[tuple[dict[str, Any], Optional[int]]]:
+        # 채팅방의 첫 메시지가 들어오면 window 뒤에 모인 메시지를 한 번에 보내도록 예약
+        # redis 저장에 실패하고 있는 채팅방은 실패한 횟수만큼 간격을 늘림 (window * 2^실패 횟수)
+        messages = self.pending.get(chat_group_name)
+        if messages is None:
+            messages = self.pending[chat_group_name] = []
+            delay = settings.CHAT_MESSAGE_BATCH_WINDOW * 2 ** self.retries.get(chat_group_name, 0)
+            task = asyncio.create_task(self.flush_later(channel_layer, chat_group_name, delay))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return messages
+
+    async def flush_later(self, channel_layer: Any, chat_group_name: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        messages = self.pending.pop(chat_group_name)
+        try:
+            # redis 파이프라인은 blocking 호출이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+            await sync_to_async(cashe_set_chat_messages)(chat_group_name, messages)
+        except Exception as e:
+            logger.error("예외 발생: %s", e, exc_info=True)
+            self.retry_later(channel_layer, chat_group_name, messages)
+            return
+        self.retries.pop(chat_group_name, None)
+
+        try:
+            # 클라이언트는 messages의 각 항목을 chat_message 프레임과 같은 방식으로 처리하면 됨
+            await channel_layer.group_send(
+                chat_group_name,
+                {"type": "chat_messages", "messages": [{**data, "type": "chat_message"} for data, _ in messages]},
+            )
+            # 상대방에게는 읽지 않은 메시지 중 가장 최근 메시지만 새메시지 알림으로 전송 (안읽은 메시지 수는 redis에 반영됨)
+            latest_unread: dict[int, dict[str, Any]] = {}
+            for data, recipient_id in messages:
+                if data["status"] and recipient_id is not None:
+                    latest_unread[recipient_id] = data
+            for recipient_id, data in latest_unread.items():
+                await sync_to_async(chat_notification)(data=dict(data), recipient_id=recipient_id)
+        except Exception as e:
+            # redis에는 이미 저장되었으므로 다시 저장하지 않음 (클라이언트는 재접속시 메시지 목록으로 받아감)
+            logger.error("예외 발생: %s", e, exc_info=True)
+
+    def retry_later(
+        self, channel_layer: Any, chat_group_name: str, messages: list[tuple[dict[str, Any], Optional[int]]]
+    ) -> None:
+        """
+        저장하지 못한 메시지는 그 사이 들어온 메시지 앞에 다시 넣어서 점점 긴 간격으로 다시 저장
+        CHAT_MESSAGE_BATCH_MAX_RETRIES번 넘게 실패하면 redis 장애가 계속되는 것으로 보고 메시지를 버림
+        """
+        retries = self.retries.get(chat_group_name, 0) + 1
+        if retries > settings.CHAT_MESSAGE_BATCH_MAX_RETRIES:
+            self.retries.pop(chat_group_name, None)
+            logger.error("채팅방 %s의 메시지 %d개를 저장하지 못해서 버립니다.", chat_group_name, len(messages))
+            return
+        self.retries[chat_group_name] = retries
+
+        pending = self.get_pending(channel_layer, chat_group_name)
+        pending[:0] = messages
+        overflow = len(pending) - settings.CHAT_MESSAGE_BATCH_MAX_PENDING
+        if overflow > 0:
+            # 보낸 순서를 유지하도록 가장 나중에 들어온 메시지부터 버림
+            del pending[-overflow:]
+            logger.error("채팅방 %s의 저장 대기 메시지가 가득 차서 메시지 %d개를 버립니다.", chat_group_name, overflow)
+
+
+chat_message_batcher = ChatMessageBatcher()
+
 
+class ChatConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
-        self.chat_group_name = ""
-        self.chatroom_id = -1
+        # connect에서 채팅방과 참여자 정보를 한 번만 조회해서 저장
+        self.state: Optional[ChatroomState] = None
+        # 상대방 접속 상태를 연결마다 캐싱해서 메시지마다 redis를 조회하지 않도록 함
+        self.opponent_online = False
+        self.opponent_online_checked_at = 0.0
+        self.heartbeat_task: Optional[asyncio.Task[None]] = None
 
     # 소켓에 연결
     async def connect(self) -> None:
         try:
             # scope로 채팅방 id 가져오기
-            self.chatroom_id = self.scope["url_route"]["kwargs"]["chatroom_id"]
-            self.chat_group_name = get_group_name(self.chatroom_id)
-
-            chatroom = await self.get_chatroom(self.chatroom_id)
-
-            if chatroom is None:
-                raise ValueError("해당 채팅방이 존재하지 않습니다.")
-            user = self.scope["user"]
-            if not await database_sync_to_async(check_entered_chatroom)(chatroom, user):
-                raise ValueError("해당 채팅방에 존재하는 유저가 아닙니다.")
-            await self.channel_layer.group_add(self.chat_group_name, self.channel_name)
+            chatroom_id = self.scope["url_route"]["kwargs"]["chatroom_id"]
+            # 채팅방, 참여자, 상대방(안읽은 메시지 수를 증가시킬 유저) 정보를 한 번에 조회
+            # 채팅방에 참여하지 않은 유저면 get_chatroom_state가 ValueError를 발생시키므로 state는 항상 존재
+            state = await database_sync_to_async(get_chatroom_state)(chatroom_id, self.scope["user"])
+            self.state = state
+            await self.channel_layer.group_add(state.group_name, self.channel_name)
             await self.accept()
-            if check_opponent_online(self.chat_group_name):
+            # 접속 상태를 저장하고 연결이 유지되는 동안 heartbeat로 만료 시각을 연장
+            # redis 호출은 blocking 이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+            await sync_to_async(add_presence)(state.chatroom_id, state.user_id, self.channel_name)
+            self.heartbeat_task = asyncio.create_task(self.heartbeat(state))
+            if await self.is_opponent_online(refresh=True):
                 await self.channel_layer.group_send(
-                    self.chat_group_name,
+                    state.group_name,
                     {
                         "type": "alert",
                         "opponent_state": "online",
@@ -59,7 +152,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
                 )
             else:
                 await self.channel_layer.group_send(
-                    self.chat_group_name,
+                    state.group_name,
                     {
                         "type": "alert",
                         "opponent_state": "offline",
@@ -76,45 +169,52 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
         """
         클라이언트로 부터 입력받은 메시지를 받고 데이터 서버에 저장,
         그룹 접속자에게 메시지를 전달
+        메시지마다 db는 조회하지 않고 connect에서 만든 state만 사용
         """
+        state = self.state
+        if state is None:
+            return
         try:
-            # 수신된 JSON에서 필요한 데이터를 가져옴
+            # 수신된 JSON에서 필요한 데이터를 가져옴 (보낸 사람 닉네임은 클라이언트 값 대신 서버에 저장된 값을 사용)
             text = content.get("text")
             image = content.get("image")
-            sender = content.get("sender")
+            thumbnail = content.get("thumbnail")
 
             # redis에 저장할 데이터
             data = {
+                "uuid": str(uuid.uuid4()),
                 "text": text,
-                "nickname": sender,
-                "sender_id": self.scope["user"].id,
-                "chatroom_id": self.chatroom_id,
+                "nickname": state.nickname,
+                "sender_id": state.user_id,
+                "chatroom_id": state.chatroom_id,
                 "status": True,
                 "created_at": timezone.now().isoformat(),
             }
 
             # 수신한 데이터에서 이미지가 있으면 데이터에 포함
+            # 이미지는 업로드 api로 먼저 스토리지에 저장하고, 메시지에는 스토리지 키만 받음
             if image:
-                # image_data = self.decode_image(image)
-                data["image"] = image
+                data.update(await sync_to_async(get_chat_image_data)(state.chatroom_id, image, thumbnail))
 
-            # 만약 그룹에 속한 멤버가 2명이면 메시지는 무조건 읽은것으로 상태저장
-            # django-redis를 사용해서 그룹에 속한 멤버의 수를 가져옴
-            if check_opponent_online(self.chat_group_name):
+            # 상대방이 채팅방에 접속중이면 메시지는 무조건 읽은것으로 상태저장
+            if await self.is_opponent_online():
                 data["status"] = False
 
-            # redis에 메시지를 캐싱해놓음
-            cashe_set_chat_message(self.chat_group_name, data)
-            # redis에 캐싱된 메시지가 100개가 넘으면 db로 저장하고 캐시를 비움
-            if redis_conn.llen(f"{self.chat_group_name}_messages") > 100:
-                await database_sync_to_async(save_redis_to_postgres)(self.chat_group_name)
+            # 배치 모드에서는 저장과 전송을 ChatMessageBatcher가 채팅방 단위로 모아서 처리
+            if settings.CHAT_MESSAGE_BATCH_WINDOW > 0:
+                chat_message_batcher.add(self.channel_layer, state.group_name, data, state.opponent_id)
+                return
+
+            # redis에 메시지를 캐싱해놓음 (상대방이 읽지 않은 메시지면 상대방의 안읽은 메시지 수도 함께 증가)
+            # db 저장은 flush_chat_messages 커맨드가 메시지 수, 캐싱된 시간을 기준으로 따로 처리함
+            await sync_to_async(cashe_set_chat_message)(state.group_name, data, recipient_id=state.opponent_id)
 
             data["type"] = "chat_message"
             # 수신된 메시지와 정보를 그룹에 속한 채팅 참가자들에게 보내기
-            await self.channel_layer.group_send(self.chat_group_name, data)
+            await self.channel_layer.group_send(state.group_name, data)
             # redis에 알림이 저장되고 상대가 채팅소켓에 접속중이지 않으면 읽지않은 채팅알림을 발송
             if data["status"]:
-                await sync_to_async(chat_notification)(chatroom_id=self.chatroom_id, data=data)
+                await sync_to_async(chat_notification)(data=data, recipient_id=state.opponent_id)
         # 예외 발생 시 내용을 json으로 보내줌
         except ValueError as e:
             logger.error("예외 발생: %s", e, exc_info=True)
@@ -125,27 +225,61 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
 
     # 소켓 연결 해제
     async def disconnect(self, close_code: int) -> None:
-        lock = ChatConsumer.disconnect_locks[self.chat_group_name]
-        # print(f"user id: {self.scope["user"].id} get disconnect lock")
-        async with lock:
-            # 레디스에 남은 메시지들을 데이터베이스에 저장
-            if redis_conn.exists(f"{self.chat_group_name}_messages") and not check_opponent_online(
-                self.chat_group_name
-            ):
-                await database_sync_to_async(save_remaining_messages_to_postgres)(self.chat_group_name)
-            # 레디스에 남은 그룹들 모두 해제
-            await self.channel_layer.group_discard(self.chat_group_name, self.channel_name)
+        # 레디스에 남은 메시지들은 flush_chat_messages 커맨드가 캐싱된 시간이 지나면 데이터베이스에 저장
+        state = self.state
+        if state is None:
+            return
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            await sync_to_async(remove_presence)(state.chatroom_id, state.user_id, self.channel_name)
+            # 상대방 연결이 캐싱한 접속 상태를 다시 확인하도록 알림
+            await self.channel_layer.group_send(
+                state.group_name, {"type": "presence_changed", "user_id": state.user_id}
+            )
+        await self.channel_layer.group_discard(state.group_name, self.channel_name)
+
+    async def heartbeat(self, state: ChatroomState) -> None:
+        while True:
+            await asyncio.sleep(settings.CHAT_PRESENCE_HEARTBEAT_INTERVAL)
+            try:
+                await sync_to_async(add_presence)(state.chatroom_id, state.user_id, self.channel_name)
+            except Exception as e:
+                # redis 예외로 heartbeat가 멈추면 TTL이 지나 오프라인으로 판단되므로 다음 주기에 다시 시도
+                logger.error("예외 발생: %s", e, exc_info=True)
+
+    async def is_opponent_online(self, refresh: bool = False) -> bool:
+        """
+        캐싱된 상대방 접속 상태가 CHAT_PRESENCE_CACHE_TIME 보다 오래되었을 때만 redis에서 다시 확인
+        접속/접속 해제 이벤트를 받으면 캐시가 바로 갱신되므로, 캐시 시간은 워커가 비정상 종료된 경우에만 영향을 줌
+        """
+        state = self.state
+        if state is None:
+            return False
+        now = time.monotonic()
+        if refresh or now - self.opponent_online_checked_at > settings.CHAT_PRESENCE_CACHE_TIME:
+            self.opponent_online = await sync_to_async(check_opponent_online)(state.chatroom_id, state.opponent_id)
+            self.opponent_online_checked_at = now
+        return self.opponent_online
+
+    async def presence_changed(self, event: dict[str, Any]) -> None:
+        # 상대방의 연결이 끊기면 같은 유저의 다른 연결이 남아있을 수 있으므로 다음 메시지에서 다시 확인
+        if self.state is not None and event["user_id"] == self.state.opponent_id:
+            self.opponent_online_checked_at = 0.0
 
     async def alert(self, event: dict[str, Any]) -> None:
         try:
+            # online 알림은 두 유저가 모두 접속했을 때만 그룹으로 전송되므로 상대방 접속 상태를 바로 갱신
+            if event["opponent_state"] == "online":
+                self.opponent_online = True
+                self.opponent_online_checked_at = time.monotonic()
             await self.send_json(event)
         except Exception as e:
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(code=1011, reason=str(e))
 
-    async def chat_message(self, event: QueryDict) -> None:
+    async def chat_messages(self, event: dict[str, Any]) -> None:
         """
-        그룹으로부터 수신한 메시지를 클라이언트에 전달
+        배치 모드에서 그룹으로부터 수신한 메시지 묶음을 {"type": "chat_messages", "messages": [...]} 프레임 하나로 전달
         """
         try:
             await self.send_json(event)
@@ -153,12 +287,15 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(code=1011, reason=str(e))
 
-    @database_sync_to_async  # type: ignore
-    def get_chatroom(self, chatroom_id: int) -> Optional[Chatroom]:
+    async def chat_message(self, event: QueryDict) -> None:
+        """
+        그룹으로부터 수신한 메시지를 클라이언트에 전달
+        """
         try:
-            return Chatroom.objects.get(id=chatroom_id)
-        except Chatroom.DoesNotExist:
-            return None
+            await self.send_json(event)
+        except Exception as e:
+            logger.error("예외 발생: %s", e, exc_info=True)
+            await self.close(code=1011, reason=str(e))
 
     # @database_sync_to_async  # type: ignore
     # def save_chat_message(self, message: str, sender: Account, chatroom_id: int, **kwargs: Any) -> Message:
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0001_initial"),
+        ("product", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chatroom",
+            index=models.Index(
+                condition=models.Q(("lender_status", True)), fields=["lender"], name="chatroom_active_lender_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chatroom",
+            index=models.Index(
+                condition=models.Q(("borrower_status", True)), fields=["borrower"], name="chatroom_active_borrower_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(fields=["chatroom", "created_at"], name="message_chatroom_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("status", True)), fields=["chatroom", "sender"], name="message_unread_idx"
+            ),
+        ),
+    ]
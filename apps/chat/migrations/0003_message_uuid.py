@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0002_chatroom_message_indexes"),
+    ]
+
+    operations = [
+        # 기존 메시지에 값을 채운 뒤 unique 제약을 추가하므로 우선 null 을 허용하는 컬럼으로 추가
+        migrations.AddField(
+            model_name="message",
+            name="uuid",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
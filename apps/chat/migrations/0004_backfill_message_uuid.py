@@ -0,0 +1,33 @@
+import uuid
+from typing import Any
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_message_uuid(apps: Any, schema_editor: Any) -> None:
+    """
+    uuid 컬럼이 추가되기 전에 저장된 메시지에 uuid 를 채움
+    마이그레이션이 트랜잭션 밖에서 실행되므로 배치마다 커밋되고, 중간에 실패하면 비어있는 메시지부터 다시 채움
+    """
+    Message = apps.get_model("chat", "Message")
+    last_id = 0
+    while messages := list(Message.objects.filter(uuid__isnull=True, id__gt=last_id).order_by("id")[:BATCH_SIZE]):
+        for message in messages:
+            message.uuid = uuid.uuid4()
+        Message.objects.bulk_update(messages, ["uuid"])
+        last_id = messages[-1].id
+
+
+class Migration(migrations.Migration):
+    # 메시지가 많을 때 backfill 이 하나의 트랜잭션으로 테이블을 오래 잠그지 않도록 배치마다 커밋
+    atomic = False
+
+    dependencies = [
+        ("chat", "0003_message_uuid"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_message_uuid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_backfill_message_uuid"),
+    ]
+
+    operations = [
+        # flush 할 때 bulk_create(update_conflicts=True, unique_fields=["uuid"]) 가 사용하는 unique 인덱스
+        migrations.AlterField(
+            model_name="message",
+            name="uuid",
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+import apps.chat.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0005_alter_message_uuid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="thumbnail",
+            field=models.ImageField(blank=True, null=True, upload_to=apps.chat.models.upload_to_s3_chat),
+        ),
+    ]
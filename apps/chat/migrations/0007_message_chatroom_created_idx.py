@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0006_message_thumbnail"),
+    ]
+
+    operations = [
+        # 커서 페이지네이션의 tie-breaker(id)까지 인덱스로 정렬하도록 다시 생성
+        migrations.RemoveIndex(
+            model_name="message",
+            name="message_chatroom_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(fields=["chatroom", "created_at", "id"], name="message_chatroom_created_idx"),
+        ),
+    ]
@@ -18,6 +18,15 @@ class Chatroom(models.Model):
     borrower_status = models.BooleanField(default=True)
     lender_status = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # 채팅방 목록 조회: 나가지 않은(status=True) 채팅방만 조회하므로 부분 인덱스로 구성
+            models.Index(fields=["lender"], condition=models.Q(lender_status=True), name="chatroom_active_lender_idx"),
+            models.Index(
+                fields=["borrower"], condition=models.Q(borrower_status=True), name="chatroom_active_borrower_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"판매자: {self.borrower.nickname}, 대여자: {self.lender.nickname}의 채팅방"
 
@@ -27,7 +36,18 @@ class Message(BaseModel):
     sender = models.ForeignKey(Account, on_delete=models.CASCADE)
     text = models.TextField()
     image = models.ImageField(upload_to=upload_to_s3_chat, null=True, blank=True)
+    thumbnail = models.ImageField(upload_to=upload_to_s3_chat, null=True, blank=True)  # 이미지 미리보기
     status = models.BooleanField(default=True)  # 메시지의 읽음 여부를 처리
+    # redis에 캐싱될 때 발급되는 메시지 id, flush를 재시도해도 같은 메시지가 중복 저장되지 않도록 함
+    uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # 채팅방 메시지 조회, 마지막 메시지 조회, (created_at, id) 커서로 이전 메시지 조회
+            models.Index(fields=["chatroom", "created_at", "id"], name="message_chatroom_created_idx"),
+            # 안읽은 메시지 수 조회, 읽음 처리: 안읽은(status=True) 메시지만 인덱싱
+            models.Index(fields=["chatroom", "sender"], condition=models.Q(status=True), name="message_unread_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.sender} : {self.text[:30]}.."
@@ -1,21 +1,25 @@
 from typing import Any, Dict, Optional
 
-from django.db.models import Q
+from django.conf import settings
 from rest_framework import serializers
 
 from apps.chat.models import Chatroom, Message
 from apps.chat.utils import (
     get_chatroom_message,
-    get_last_message,
-    get_unread_message_count_at_redis,
     read_messages_at_postgres,
     read_messages_at_redis,
 )
-from apps.product.models import ProductImage, RentalHistory
+from apps.product.models import RentalHistory
 from apps.product.serializers import RentalHistoryStatusSerializer
 
 
 class ChatroomListSerializer(serializers.ModelSerializer[Chatroom]):
+    """
+    get_chatroom_list_queryset 으로 조회한 채팅방을 직렬화
+    context 로 redis 파이프라인 결과(redis_summaries)와 db 마지막 메시지(db_last_messages)를 받아서
+    채팅방마다 추가 쿼리나 redis 요청 없이 응답을 만듦
+    """
+
     unread_chat_count = serializers.SerializerMethodField()  # 안읽은 채팅 수
 
     class Meta:
@@ -25,39 +29,38 @@ class ChatroomListSerializer(serializers.ModelSerializer[Chatroom]):
     def to_representation(self, instance: Chatroom) -> Dict[str, Any]:
         data = super().to_representation(instance)
         user = self.context.get("user")
-        if user == instance.lender:
-            user_data = {
-                "nickname": instance.borrower.nickname,
-            }
-            if instance.borrower.profile_img:
-                user_data["profile_img"] = instance.borrower.profile_img.url
-            data["user_info"] = user_data
-
-        if user == instance.borrower:
+        opponent = None
+        if user and user.id == instance.lender_id:
+            opponent = instance.borrower
+        if user and user.id == instance.borrower_id:
+            opponent = instance.lender
+        if opponent:
             user_data = {
-                "nickname": instance.lender.nickname,
+                "nickname": opponent.nickname,
             }
-            if instance.lender.profile_img:
-                user_data["profile_img"] = instance.lender.profile_img.url
+            if opponent.profile_img:
+                user_data["profile_img"] = opponent.profile_img.url
             data["user_info"] = user_data
 
         if instance.product:
-            product_image = ProductImage.objects.filter(product=instance.product).first()
-            if product_image:
-                data["product_image"] = product_image.image.url
+            product_images = getattr(instance.product, "prefetched_images", [])
+            if product_images:
+                data["product_image"] = product_images[0].image.url
 
-        last_message = get_last_message(chatroom_id=instance.id)
-        data["last_message"] = last_message
+        redis_summary = self.context.get("redis_summaries", {}).get(instance.id)
+        if redis_summary:
+            data["last_message"] = redis_summary["last_message"]
+        else:
+            data["last_message"] = self.context.get("db_last_messages", {}).get(instance.id)
         return data
 
     def get_unread_chat_count(self, obj: Chatroom) -> Optional[int]:
-        user = self.context.get("user")
-        if user and obj.message_set:
-            user = self.context.get("user")
-            db_unread_count: int = obj.message_set.filter(~Q(sender=user), status=True).count()
-            redis_unread_count: int = get_unread_message_count_at_redis(chatroom_id=obj.id, nickname=user.nickname)
-            return db_unread_count + redis_unread_count
-        return None
+        if not self.context.get("user"):
+            return None
+        redis_summary = self.context.get("redis_summaries", {}).get(obj.id, {})
+        db_unread_count: int = getattr(obj, "db_unread_count", 0)
+        redis_unread_count: int = redis_summary.get("unread_count", 0)
+        return db_unread_count + redis_unread_count
 
 
 class CreateChatroomSerializer(serializers.ModelSerializer[Chatroom]):
@@ -75,6 +78,17 @@ class MessageSerializer(serializers.ModelSerializer[Message]):
         exclude = ["sender"]
 
 
+class ChatImageUploadSerializer(serializers.Serializer[Any]):
+    image = serializers.ImageField()
+
+    def validate_image(self, image: Any) -> Any:
+        if image.size > settings.CHAT_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"이미지는 {settings.CHAT_IMAGE_MAX_SIZE // (1024 * 1024)}MB 이하로 업로드해주세요."
+            )
+        return image
+
+
 class EnterChatroomSerializer(serializers.ModelSerializer[Chatroom]):
     product_image = serializers.SerializerMethodField()  # 상품 이미지
     product_name = serializers.CharField(source="product.name", read_only=True)
@@ -98,7 +112,7 @@ class EnterChatroomSerializer(serializers.ModelSerializer[Chatroom]):
         user = self.context.get("user")
         if user:
             # redis에 캐싱된 채팅방 메시지 읽음처리
-            read_messages_at_redis(nickname=user.nickname, chatroom_id=instance.id)
+            read_messages_at_redis(user_id=user.id, chatroom_id=instance.id)
             # postgres에 저장된 채팅방 메시지를 읽음처리
             read_messages_at_postgres(user_id=user.id, chatroom_id=instance.id)
 
@@ -1,22 +1,60 @@
+import asyncio
+import io
 import json
+import time
+import uuid
 from datetime import datetime
+from typing import Any
+from unittest.mock import AsyncMock, patch
 
 from channels.db import database_sync_to_async
 from channels.routing import URLRouter
 from channels.testing import WebsocketCommunicator
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
 from django.db.models import Q
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import path, reverse
 from django.utils import timezone
 from django_redis import get_redis_connection
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import AccessToken
 
 from apps.category.models import Category
-from apps.chat.consumers import ChatConsumer
+from apps.chat.consumers import ChatConsumer, ChatMessageBatcher
 from apps.chat.models import Chatroom, Message
-from apps.chat.utils import get_group_name, get_unread_message_count_at_redis
+from apps.chat.utils import (
+    add_presence,
+    cashe_set_chat_message,
+    cashe_set_chat_messages,
+    check_opponent_online,
+    create_thumbnail,
+    decode_message_cursor,
+    encode_message_cursor,
+    fetch_cached_messages,
+    flush_chat_rooms,
+    flush_chat_stream,
+    get_chat_image_data,
+    get_chatroom_message,
+    get_chatroom_message_page,
+    get_flush_due_rooms,
+    get_flushed_key,
+    get_group_name,
+    get_message_key,
+    get_presence_key,
+    get_unread_key,
+    get_unread_message_count_at_redis,
+    load_cached_messages,
+    read_messages_at_redis,
+    read_stream_entries,
+    remove_presence,
+    save_messages_to_postgres,
+)
 from apps.product.models import Product
 from apps.user.models import Account
 
@@ -102,11 +140,37 @@ class ChatRoomTestCase(APITestCase):
         self.assertEqual(response.data[0]["last_message"].get("text"), data["text"])
         self.assertEqual(response.data[0]["last_message"].get("nickname"), data["nickname"])
         count = Message.objects.filter(~Q(sender=self.user), status=True, chatroom=chatroom).count()
-        count += get_unread_message_count_at_redis(chatroom_id=chatroom.id, nickname=self.user.nickname)
+        count += get_unread_message_count_at_redis(chatroom_id=chatroom.id, user_id=self.user.id)
         self.assertEqual(response.data[0]["unread_chat_count"], count)
 
         self.redis_conn.delete(key)
 
+    def test_채팅방_수가_늘어나도_채팅방리스트_쿼리수가_일정한지_확인(self) -> None:
+        url = reverse("chatroom")
+
+        def create_chatroom(index: int) -> Chatroom:
+            opponent = Account.objects.create_user(
+                email=f"opponent{index}@example.com", password="testpw1234", nickname=f"opponent{index}"
+            )
+            chatroom = Chatroom.objects.create(lender=opponent, borrower=self.user, product=self.product)
+            Message.objects.create(sender=opponent, text=f"message-{index}", chatroom=chatroom)
+            return chatroom
+
+        create_chatroom(0)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers={"Authorization": f"Bearer {self.token}"})
+        single_room_queries = len(context.captured_queries)
+        self.assertEqual(response.data[0]["unread_chat_count"], 1)
+
+        chatrooms = [create_chatroom(i) for i in range(1, 5)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(len(context.captured_queries), single_room_queries)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[-1]["id"], chatrooms[-1].id)
+        self.assertEqual(response.data[-1]["last_message"]["text"], "message-4")
+        self.assertEqual(response.data[-1]["user_info"]["nickname"], "opponent4")
+
 
 class ChatDetailTestCase(APITestCase):
     def setUp(self) -> None:
@@ -181,6 +245,120 @@ class ChatDetailTestCase(APITestCase):
         # 테스트가 끝나면 레디스의 자원을 정리
         self.redis_conn.delete(key)
 
+    def test_채팅방에_입장하면_redis의_안읽은_메시지_수가_초기화되는지_확인(self) -> None:
+        # given : 상대방이 보낸 안읽은 메시지 3개를 redis에 캐싱
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        # 테스트가 끝나면 레디스의 자원을 정리
+        self.addCleanup(self.redis_conn.delete, f"{chat_group_name}_messages", get_unread_key(chat_group_name))
+        for i in range(3):
+            data = {
+                "text": f"unread message - {i}",
+                "nickname": self.lender.nickname,
+                "sender_id": self.lender.id,
+                "chatroom_id": self.chatroom.id,
+                "status": True,
+                "created_at": timezone.now().isoformat(),
+            }
+            cashe_set_chat_message(chat_group_name, data, recipient_id=self.user.id)
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.user.id), 3)
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.lender.id), 0)
+
+        url = reverse("chat-detail", kwargs={"chatroom_id": self.chatroom.id})
+        response = self.client.get(url, headers={"Authorization": f"Bearer {self.token}"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.user.id), 0)
+        received_messages = [msg for msg in response.data["messages"] if msg["nickname"] == self.lender.nickname]
+        self.assertEqual(response.data["messages"][0]["text"], "unread message - 2")
+        self.assertTrue(all(not msg["status"] for msg in received_messages))
+
+    def test_채팅_이미지를_업로드하면_스토리지_키와_미리보기를_내려주는지_확인(self) -> None:
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 800), "red").save(buffer, format="PNG")
+        image = SimpleUploadedFile("chat.png", buffer.getvalue(), content_type="image/png")
+
+        url = reverse("chat-image", kwargs={"chatroom_id": self.chatroom.id})
+        response = self.client.post(url, {"image": image}, headers={"Authorization": f"Bearer {self.token}"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.addCleanup(default_storage.delete, response.data["image"])
+        self.addCleanup(default_storage.delete, response.data["thumbnail"])
+        self.assertTrue(response.data["image"].startswith(f"images/chat/{self.chatroom.id}/"))
+        with default_storage.open(response.data["thumbnail"]) as thumbnail:
+            self.assertLessEqual(max(Image.open(thumbnail).size), 320)
+
+        # 메시지에는 업로드한 이미지의 스토리지 키만 담고, 다른 채팅방의 키는 거부
+        image_data = get_chat_image_data(self.chatroom.id, response.data["image"], response.data["thumbnail"])
+        self.assertEqual(image_data["image_key"], response.data["image"])
+        with self.assertRaises(ValueError):
+            get_chat_image_data(self.chatroom.id + 1, response.data["image"])
+        # 접두어가 같아도 상위 경로로 벗어나거나 업로드되지 않은 키는 거부
+        prefix = f"images/chat/{self.chatroom.id}/"
+        for key in [f"{prefix}../{self.chatroom.id + 1}/a.png", f"{prefix}./a.png", f"{prefix}not_uploaded.png"]:
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                get_chat_image_data(self.chatroom.id, key)
+
+    @override_settings(CHAT_IMAGE_MAX_PIXELS=1000 * 1000)
+    def test_픽셀_수가_너무_큰_이미지는_미리보기를_만들지_않는지_확인(self) -> None:
+        for size, has_thumbnail in [((1000, 1000), True), ((1200, 900), False)]:
+            buffer = io.BytesIO()
+            Image.new("RGB", size, "red").save(buffer, format="JPEG")
+            image = SimpleUploadedFile("chat.jpg", buffer.getvalue(), content_type="image/jpeg")
+            with self.subTest(size=size):
+                thumbnail = create_thumbnail(image)
+                self.assertEqual(thumbnail is not None, has_thumbnail)
+                # 원본 이미지는 처음부터 다시 읽을 수 있어야 함
+                self.assertEqual(image.tell(), 0)
+
+    def test_메시지_목록을_커서로_redis와_db에서_이어서_가져오는지_확인(self) -> None:
+        # given : db에 메시지 20개, redis에 메시지 5개
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        self.addCleanup(
+            self.redis_conn.delete,
+            get_message_key(chat_group_name),
+            get_unread_key(chat_group_name),
+            get_flushed_key(chat_group_name),
+        )
+        self.addCleanup(self.redis_conn.zrem, "chat_dirty_rooms", chat_group_name)
+        for i in range(5):
+            data = {
+                "uuid": f"0b6a2c3e-5d4f-4e8a-9c1b-2d3e4f5a6b7{i}",
+                "text": f"cached message - {i}",
+                "nickname": self.lender.nickname,
+                "sender_id": self.lender.id,
+                "chatroom_id": self.chatroom.id,
+                "status": True,
+                "created_at": timezone.now().isoformat(),
+            }
+            cashe_set_chat_message(chat_group_name, data, recipient_id=self.user.id)
+        expected_texts = [f"cached message - {i}" for i in range(4, -1, -1)] + list(
+            Message.objects.filter(chatroom=self.chatroom).order_by("-created_at", "-id").values_list("text", flat=True)
+        )
+
+        url = reverse("chat-messages", kwargs={"chatroom_id": self.chatroom.id})
+        response = self.client.get(url, {"page_size": 4}, headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        texts = [msg["text"] for msg in response.data["results"]]
+
+        # 다음 페이지를 가져오기 전에 redis의 메시지가 db로 저장되어도 이어서 가져와야함
+        flush_chat_rooms([chat_group_name])
+        next_link = response.data["next"]
+        while next_link:
+            response = self.client.get(next_link, headers={"Authorization": f"Bearer {self.token}"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 4)
+            texts += [msg["text"] for msg in response.data["results"]]
+            next_link = response.data["next"]
+
+        self.assertEqual(texts, expected_texts)
+
+    def test_메시지_목록에_잘못된_커서를_보내는_경우(self) -> None:
+        url = reverse("chat-messages", kwargs={"chatroom_id": self.chatroom.id})
+        response = self.client.get(url, {"cursor": "invalid"}, headers={"Authorization": f"Bearer {self.token}"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data.get("msg"), "유효하지 않은 커서입니다.")
+
     def test_비정상적인_유저가_get요청을_보내는_경우(self) -> None:
         invaild_user = Account.objects.create_user(email="invalid-user@example.com", password="testpassword123")
         self.client.logout()
@@ -277,6 +455,9 @@ class ChatConsumerTest(TransactionTestCase):
             ]
         )
         self.redis_conn = get_redis_connection("default")
+        # 이전 테스트에서 같은 채팅방 id로 남은 접속 상태를 지움
+        for user in (self.user, self.user2):
+            self.redis_conn.delete(get_presence_key(self.chatroom.id, user.id))
 
     async def test_단일유저의_웹소켓_접속과_메시지전송_테스트(self) -> None:
         # 웹소켓에 접속 요청
@@ -318,8 +499,13 @@ class ChatConsumerTest(TransactionTestCase):
         # 메시지의 읽음상태 확인 : 두 유저가 동시에 채팅 소켓에 접속한 상태 이므로 읽음상태
         self.assertTrue(redis_message.get("status"))
 
-        # 유저가 나가면 redis의 채팅 메시지가 db에 저장되는지 확인
+        # 유저가 나가도 메시지는 redis에 남아있고, flusher가 실행되면 db에 저장되는지 확인
         await self.communicator.disconnect()
+        self.assertTrue(self.redis_conn.exists(key))
+        due_rooms = get_flush_due_rooms(max_messages=100, max_age=0)
+        self.assertIn(get_group_name(chatroom_id=self.chatroom.id), due_rooms)
+        flushed_message_num = await database_sync_to_async(flush_chat_rooms)(due_rooms)
+        self.assertEqual(flushed_message_num, 1)
         self.assertFalse(self.redis_conn.exists(key))
         messages_count = await database_sync_to_async(Message.objects.count)()
         self.assertEqual(messages_count, 1)
@@ -420,12 +606,409 @@ class ChatConsumerTest(TransactionTestCase):
         await communicator1.disconnect()
         stored_message = self.redis_conn.lrange(key, 0, -1)
         self.assertEqual(len(stored_message), 2)
-        # 마지막 유저까지 나가는 경우 -> redis의 채팅메시지가 삭제되고 db에 저장되어야함
+        # 마지막 유저까지 나가고 flusher가 실행되는 경우 -> redis의 채팅메시지가 삭제되고 db에 저장되어야함
         await communicator2.disconnect()
+        await database_sync_to_async(flush_chat_rooms)(get_flush_due_rooms(max_messages=100, max_age=0))
         self.assertFalse(self.redis_conn.exists(key))
         messages_count = await database_sync_to_async(Message.objects.count)()
         self.assertEqual(messages_count, 2)
 
+    async def test_상대방이_나가면_다음_메시지는_안읽은_메시지로_저장되는지_확인(self) -> None:
+        communicators = []
+        for user in (self.user, self.user, self.user2):
+            communicator = WebsocketCommunicator(self.application, f"/ws/chat/{self.chatroom.id}/")
+            communicator.scope["user"] = user
+            communicator.scope["type"] = "websocket"
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            communicators.append(communicator)
+        key = get_message_key(get_group_name(chatroom_id=self.chatroom.id))
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(get_group_name(chatroom_id=self.chatroom.id)))
+
+        # 같은 유저가 두 개의 연결로 접속해도 상대방이 나가면 오프라인으로 판단
+        await communicators[2].disconnect()
+        # presence_changed 이벤트는 채널 레이어를 거쳐서 전달되므로 웹소켓 메시지보다 늦게 처리될 수 있음
+        await asyncio.sleep(0.1)
+        await communicators[0].send_json_to({"text": "Message from user1", "sender": self.user.nickname})
+        while (await communicators[0].receive_json_from()).get("type") != "chat_message":
+            pass
+        redis_message = json.loads(self.redis_conn.lrange(key, 0, 0)[0])
+        self.assertTrue(redis_message["status"])
+
+        await communicators[0].disconnect()
+        await communicators[1].disconnect()
+
+    async def test_메시지_전송시_db를_조회하지않고_서버의_닉네임을_사용하는지_확인(self) -> None:
+        communicator = WebsocketCommunicator(self.application, f"/ws/chat/{self.chatroom.id}/")
+        communicator.scope["user"] = self.user
+        communicator.scope["type"] = "websocket"
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        key = get_message_key(get_group_name(chatroom_id=self.chatroom.id))
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(get_group_name(chatroom_id=self.chatroom.id)))
+
+        # 소켓 연결은 워커 스레드에서 쿼리를 실행하므로 모든 커서 실행을 감시
+        with patch.object(CursorWrapper, "execute", side_effect=AssertionError("메시지 전송 중 쿼리 실행")) as execute:
+            # 클라이언트가 다른 닉네임을 보내도 connect에서 조회한 닉네임을 사용
+            await communicator.send_json_to({"text": "Message from user1", "sender": self.user2.nickname})
+            message = await communicator.receive_json_from()
+        execute.assert_not_called()
+        self.assertEqual(message["nickname"], self.user.nickname)
+        self.assertEqual(message["sender_id"], self.user.id)
+        self.assertEqual(json.loads(self.redis_conn.lrange(key, 0, 0)[0])["nickname"], self.user.nickname)
+
+        await communicator.disconnect()
+
+    @override_settings(CHAT_MESSAGE_BATCH_WINDOW=0.05)
+    async def test_배치모드에서_메시지를_모아서_한번에_저장하고_전송하는지_확인(self) -> None:
+        communicator = WebsocketCommunicator(self.application, f"/ws/chat/{self.chatroom.id}/")
+        communicator.scope["user"] = self.user
+        communicator.scope["type"] = "websocket"
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        key = get_message_key(chat_group_name)
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name))
+
+        for index in range(3):
+            await communicator.send_json_to({"text": f"message-{index}"})
+
+        # window 동안 보낸 메시지가 보낸 순서대로 하나의 프레임에 담겨서 전달
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["type"], "chat_messages")
+        self.assertEqual([message["text"] for message in frame["messages"]], ["message-0", "message-1", "message-2"])
+        self.assertTrue(all(message["type"] == "chat_message" for message in frame["messages"]))
+        self.assertTrue(await communicator.receive_nothing())
+
+        # redis에는 최신 메시지가 0번 인덱스에 오도록 저장되고 상대방의 안읽은 메시지 수도 한 번에 증가
+        self.assertEqual(json.loads(self.redis_conn.lrange(key, 0, 0)[0])["text"], "message-2")
+        self.assertEqual(self.redis_conn.llen(key), 3)
+        self.assertEqual(get_unread_message_count_at_redis(self.chatroom.id, self.user2.id), 3)
+
+        await communicator.disconnect()
+
+    @override_settings(CHAT_MESSAGE_BATCH_WINDOW=0.01)
+    async def test_배치모드에서_redis_저장에_실패하면_메시지를_다시_모아서_저장하는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        key = get_message_key(chat_group_name)
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name))
+        self.addCleanup(self.redis_conn.zrem, "chat_dirty_rooms", chat_group_name)
+        batcher = ChatMessageBatcher()
+        channel_layer = AsyncMock()
+        first, second = (self.make_message_data(text, self.user) for text in ("first", "second"))
+        failed_once = False
+
+        def fail_once(*args: Any) -> int:
+            nonlocal failed_once
+            if not failed_once:
+                failed_once = True
+                raise ConnectionError("redis down")
+            return cashe_set_chat_messages(*args)
+
+        with patch("apps.chat.consumers.cashe_set_chat_messages", side_effect=fail_once):
+            # 첫 번째 flush는 저장에 실패하고 메시지를 다시 모음
+            batcher.add(channel_layer, chat_group_name, first, self.user2.id)
+            await asyncio.gather(*list(batcher.tasks))
+            channel_layer.group_send.assert_not_awaited()
+
+            # 다음 window에 그 사이 들어온 메시지와 함께 보낸 순서대로 저장하고 전송
+            batcher.add(channel_layer, chat_group_name, second, self.user2.id)
+            await asyncio.gather(*list(batcher.tasks))
+
+        self.assertEqual([json.loads(msg)["text"] for msg in self.redis_conn.lrange(key, 0, -1)], ["second", "first"])
+        frame = channel_layer.group_send.await_args.args[1]
+        self.assertEqual([message["text"] for message in frame["messages"]], ["first", "second"])
+        self.assertFalse(batcher.pending)
+
+    @override_settings(
+        CHAT_MESSAGE_BATCH_WINDOW=0.01, CHAT_MESSAGE_BATCH_MAX_RETRIES=2, CHAT_MESSAGE_BATCH_MAX_PENDING=2
+    )
+    async def test_배치모드에서_redis_저장에_계속_실패하면_메시지를_버리는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        batcher = ChatMessageBatcher()
+        channel_layer = AsyncMock()
+        with (
+            patch("apps.chat.consumers.cashe_set_chat_messages", side_effect=ConnectionError("redis down")) as save,
+            self.assertLogs("apps.chat.consumers") as logs,
+        ):
+            # 모아둘 수 있는 메시지 수를 넘는 메시지는 바로 버림
+            for text in ("first", "second", "third"):
+                batcher.add(channel_layer, chat_group_name, self.make_message_data(text, self.user), self.user2.id)
+            self.assertEqual(len(batcher.pending[chat_group_name]), 2)
+            while batcher.tasks:
+                await asyncio.gather(*list(batcher.tasks))
+
+        # 처음 저장 + 재시도 2번을 모두 실패하면 메시지를 버리고 더 이상 다시 저장하지 않음
+        self.assertEqual([len(call.args[1]) for call in save.call_args_list], [2, 2, 2])
+        self.assertFalse(batcher.pending)
+        self.assertFalse(batcher.retries)
+        self.assertTrue(any("2개를 저장하지 못해서 버립니다" in line for line in logs.output))
+        channel_layer.group_send.assert_not_awaited()
+
+    @override_settings(
+        CHANNEL_LAYERS={
+            "default": {
+                "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+                "CONFIG": {"hosts": [("127.0.0.1", 6379)]},
+            }
+        }
+    )
+    async def test_pubsub_채널_레이어로_두유저가_메시지를_주고받는지_확인(self) -> None:
+        communicators = []
+        for user, opponent_state in ((self.user, "offline"), (self.user2, "online")):
+            communicator = WebsocketCommunicator(self.application, f"/ws/chat/{self.chatroom.id}/")
+            communicator.scope["user"] = user
+            communicator.scope["type"] = "websocket"
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual((await communicator.receive_json_from())["opponent_state"], opponent_state)
+            communicators.append(communicator)
+        # 두번째 유저가 접속하면 첫번째 유저도 online 알림을 받음
+        self.assertEqual((await communicators[0].receive_json_from())["opponent_state"], "online")
+        key = get_message_key(get_group_name(chatroom_id=self.chatroom.id))
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(get_group_name(chatroom_id=self.chatroom.id)))
+
+        await communicators[0].send_json_to({"text": "Message from user1", "sender": self.user.nickname})
+        for communicator in communicators:
+            message = await communicator.receive_json_from()
+            self.assertEqual(message["text"], "Message from user1")
+        # 두 유저가 모두 접속중이므로 읽음상태로 저장
+        self.assertFalse(json.loads(self.redis_conn.lrange(key, 0, 0)[0])["status"])
+
+        for communicator in communicators:
+            await communicator.disconnect()
+
+    def test_접속상태는_연결이_모두_끊기거나_heartbeat가_만료되면_오프라인(self) -> None:
+        key = get_presence_key(self.chatroom.id, self.user.id)
+        self.addCleanup(self.redis_conn.delete, key)
+        add_presence(self.chatroom.id, self.user.id, "channel-1")
+        add_presence(self.chatroom.id, self.user.id, "channel-2")
+        self.assertTrue(check_opponent_online(self.chatroom.id, self.user.id))
+        self.assertFalse(check_opponent_online(self.chatroom.id, self.user2.id))
+
+        # 연결 하나가 끊겨도 다른 연결이 남아있으면 접속중
+        remove_presence(self.chatroom.id, self.user.id, "channel-1")
+        self.assertTrue(check_opponent_online(self.chatroom.id, self.user.id))
+
+        # disconnect 없이 워커가 종료되어 heartbeat가 멈춘 연결은 만료 시각이 지나면 오프라인
+        self.redis_conn.zadd(key, {"channel-2": time.time() - 1})
+        self.assertFalse(check_opponent_online(self.chatroom.id, self.user.id))
+
+    def test_flush를_재시도해도_메시지가_중복저장되지_않는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        data = {
+            "uuid": "5f0c6c1e-8f5b-4d53-9a53-0d2b0d6f1f10",
+            "text": "Test message",
+            "image": f"/media/images/chat/{self.chatroom.id}/test.png",
+            "image_key": f"images/chat/{self.chatroom.id}/test.png",
+            "nickname": self.user.nickname,
+            "sender_id": self.user.id,
+            "chatroom_id": self.chatroom.id,
+            "status": True,
+            "created_at": timezone.now().isoformat(),
+        }
+        cashe_set_chat_message(chat_group_name, dict(data), recipient_id=self.user2.id)
+        flush_chat_rooms([chat_group_name])
+
+        # db에 저장된 뒤 redis에서 지워지지 못한 상황을 재현하고, 그 사이 상대방이 메시지를 읽음
+        cashe_set_chat_message(chat_group_name, dict(data))
+        flush_chat_rooms([chat_group_name])
+
+        self.assertEqual(Message.objects.count(), 1)
+        self.assertFalse(Message.objects.get().status)
+        # 이미지는 스토리지 키로 저장
+        self.assertEqual(Message.objects.get().image.name, data["image_key"])
+        self.assertFalse(self.redis_conn.exists(f"{chat_group_name}_messages"))
+
+    def make_message_data(self, text: str, sender: Account) -> dict[str, Any]:
+        return {
+            "uuid": str(uuid.uuid4()),
+            "text": text,
+            "nickname": sender.nickname,
+            "sender_id": sender.id,
+            "chatroom_id": self.chatroom.id,
+            "status": True,
+            "created_at": timezone.now().isoformat(),
+        }
+
+    def test_flush_도중_들어온_메시지는_남기고_저장한_메시지만_redis에서_지우는지_확인(self) -> None:
+        # given : 안읽은 메시지 3개가 캐싱되어 있음
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        key = get_message_key(chat_group_name)
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name))
+        self.addCleanup(self.redis_conn.zrem, "chat_dirty_rooms", chat_group_name)
+        for i in range(3):
+            cashe_set_chat_message(
+                chat_group_name, self.make_message_data(f"old - {i}", self.user), recipient_id=self.user2.id
+            )
+        first_cached_at = self.redis_conn.zscore("chat_dirty_rooms", chat_group_name)
+
+        # when : db에 저장하는 동안 새 메시지 2개가 들어옴
+        def save_with_new_messages(messages: list[dict[str, Any]]) -> dict[int, int]:
+            saved_ids = save_messages_to_postgres(messages)
+            for i in range(2):
+                cashe_set_chat_message(
+                    chat_group_name, self.make_message_data(f"new - {i}", self.user), recipient_id=self.user2.id
+                )
+            return saved_ids
+
+        with patch("apps.chat.utils.save_messages_to_postgres", side_effect=save_with_new_messages):
+            self.assertEqual(flush_chat_rooms([chat_group_name]), 3)
+
+        # then : 저장한 메시지만 지워지고 새 메시지와 그만큼의 안읽은 메시지 수만 남음
+        self.assertEqual(Message.objects.filter(status=True).count(), 3)
+        self.assertEqual(
+            [json.loads(msg)["text"] for msg in self.redis_conn.lrange(key, 0, -1)], ["new - 1", "new - 0"]
+        )
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.user2.id), 2)
+        # 남은 메시지는 다시 max_age가 지나야 flush 대상이 됨
+        self.assertGreater(self.redis_conn.zscore("chat_dirty_rooms", chat_group_name), first_cached_at)
+
+        # 다음 flush에서 남은 메시지를 저장하고 키를 지움
+        self.assertEqual(flush_chat_rooms([chat_group_name]), 2)
+        self.assertEqual(Message.objects.filter(status=True).count(), 5)
+        self.assertFalse(self.redis_conn.exists(key, get_unread_key(chat_group_name)))
+        self.assertIsNone(self.redis_conn.zscore("chat_dirty_rooms", chat_group_name))
+
+    def test_flush_도중_상대방이_메시지를_읽으면_저장한_메시지를_읽음처리하는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        key = get_message_key(chat_group_name)
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name))
+        self.addCleanup(self.redis_conn.zrem, "chat_dirty_rooms", chat_group_name)
+        for i in range(2):
+            cashe_set_chat_message(
+                chat_group_name, self.make_message_data(f"old - {i}", self.user), recipient_id=self.user2.id
+            )
+
+        # db에 저장하는 동안 상대방이 채팅방에 들어와서 읽은 뒤 새 메시지 하나를 받음
+        def save_with_read(messages: list[dict[str, Any]]) -> dict[int, int]:
+            saved_ids = save_messages_to_postgres(messages)
+            read_messages_at_redis(user_id=self.user2.id, chatroom_id=self.chatroom.id)
+            cashe_set_chat_message(
+                chat_group_name, self.make_message_data("new", self.user), recipient_id=self.user2.id
+            )
+            return saved_ids
+
+        with patch("apps.chat.utils.save_messages_to_postgres", side_effect=save_with_read):
+            self.assertEqual(flush_chat_rooms([chat_group_name]), 2)
+
+        self.assertFalse(Message.objects.filter(status=True).exists())
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.user2.id), 1)
+        self.assertEqual(self.redis_conn.llen(key), 1)
+
+    def test_flush_도중에도_메시지_목록을_중복없이_페이지_크기만큼_가져오는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        for store in ["list", "stream"]:
+            with self.subTest(store=store), override_settings(CHAT_MESSAGE_STORE=store):
+                key = get_message_key(chat_group_name)
+                self.addCleanup(
+                    self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name)
+                )
+                self.addCleanup(self.redis_conn.zrem, "chat_dirty_rooms", chat_group_name)
+                Message.objects.all().delete()
+                # given : 메시지 5개는 flush를 마쳤고, 상대방이 읽은 메시지 6개와 안읽은 메시지 3개가 캐싱되어 있음
+                for i in range(5):
+                    cashe_set_chat_message(
+                        chat_group_name, self.make_message_data(f"{i}", self.user), recipient_id=self.user2.id
+                    )
+                if store == "list":
+                    flush_chat_rooms([chat_group_name])
+                else:
+                    flush_chat_stream(chat_group_name)
+                for i in range(5, 14):
+                    if i == 11:
+                        read_messages_at_redis(user_id=self.user2.id, chatroom_id=self.chatroom.id)
+                    cashe_set_chat_message(
+                        chat_group_name, self.make_message_data(f"{i}", self.user), recipient_id=self.user2.id
+                    )
+                # db에 저장하고 redis에서 지우기 전에 조회하는 상황 -> 같은 메시지가 redis와 db에 모두 있음
+                save_messages_to_postgres(load_cached_messages(fetch_cached_messages(self.redis_conn, chat_group_name)))
+
+                # when : 4개씩 이어서 가져옴
+                pages = []
+                messages, cursor = get_chatroom_message_page(self.chatroom.id, page_size=4)
+                pages.append(messages)
+                while cursor:
+                    messages, cursor = get_chatroom_message_page(
+                        self.chatroom.id, cursor=decode_message_cursor(encode_message_cursor(cursor)), page_size=4
+                    )
+                    pages.append(messages)
+
+                # then : redis의 메시지 9개 다음에 db의 메시지 5개를 중복없이 가져오고, 안읽은 메시지는 최신 3개뿐
+                self.assertEqual([len(page) for page in pages], [4, 4, 4, 2])
+                texts = [msg["text"] for page in pages for msg in page]
+                self.assertEqual(texts, [f"{i}" for i in range(13, -1, -1)])
+                statuses = [msg["status"] for page in pages for msg in page]
+                self.assertEqual(statuses, [True] * 3 + [False] * 6 + [True] * 5)
+
+    @override_settings(CHAT_MESSAGE_STORE="stream")
+    def test_stream모드에서_메시지가_중복없이_db에_저장되는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        key = get_message_key(chat_group_name)
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name))
+        for i in range(3):
+            data = {
+                "uuid": f"5f0c6c1e-8f5b-4d53-9a53-0d2b0d6f1f1{i}",
+                "text": f"stream message - {i}",
+                "nickname": self.user.nickname,
+                "sender_id": self.user.id,
+                "chatroom_id": self.chatroom.id,
+                "status": True,
+                "created_at": timezone.now().isoformat(),
+            }
+            cashe_set_chat_message(chat_group_name, data, recipient_id=self.user2.id)
+
+        # 캐싱된 메시지는 최신순으로 조회
+        messages = get_chatroom_message(chatroom_id=self.chatroom.id)
+        self.assertEqual([msg["text"] for msg in messages], [f"stream message - {i}" for i in (2, 1, 0)])
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.user2.id), 3)
+
+        # db에 저장한 뒤 XACK 전에 flusher가 종료된 상황을 재현 -> 메시지가 pending으로 남음
+        entries = read_stream_entries(key, count=100)
+        save_messages_to_postgres([json.loads(fields[b"data"]) for _, fields in entries])
+
+        # 다시 flush 하면 pending 메시지를 다시 저장하지만 uuid 기준으로 중복 저장되지 않음
+        self.assertEqual(flush_chat_stream(chat_group_name), 3)
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertEqual(Message.objects.filter(status=True).count(), 3)
+        self.assertFalse(self.redis_conn.exists(key))
+
+    @override_settings(CHAT_MESSAGE_STORE="stream")
+    def test_stream모드에서_xack를_재시도해도_db에는_한번만_저장하는지_확인(self) -> None:
+        chat_group_name = get_group_name(chatroom_id=self.chatroom.id)
+        key = get_message_key(chat_group_name)
+        self.addCleanup(self.redis_conn.delete, key, get_unread_key(chat_group_name), get_flushed_key(chat_group_name))
+        self.addCleanup(self.redis_conn.zrem, "chat_dirty_rooms", chat_group_name)
+        for i in range(3):
+            cashe_set_chat_message(
+                chat_group_name, self.make_message_data(f"old - {i}", self.user), recipient_id=self.user2.id
+            )
+
+        # WATCH 한 뒤 처음 남은 메시지를 확인할 때 새 메시지가 들어와서 XACK 트랜잭션이 한 번 실패함
+        loaded = []
+
+        def load_with_new_message(stored_messages: list[Any]) -> list[dict[str, Any]]:
+            loaded.append(stored_messages)
+            if len(loaded) == 3:
+                cashe_set_chat_message(
+                    chat_group_name, self.make_message_data("new", self.user), recipient_id=self.user2.id
+                )
+            return load_cached_messages(stored_messages)
+
+        with (
+            patch("apps.chat.utils.load_cached_messages", side_effect=load_with_new_message),
+            patch("apps.chat.utils.save_messages_to_postgres", wraps=save_messages_to_postgres) as save,
+        ):
+            self.assertEqual(flush_chat_stream(chat_group_name), 3)
+
+        save.assert_called_once()
+        self.assertEqual(len(loaded), 4)
+        self.assertEqual(Message.objects.filter(status=True).count(), 3)
+        self.assertEqual(self.redis_conn.xlen(key), 1)
+        self.assertEqual(get_unread_message_count_at_redis(chatroom_id=self.chatroom.id, user_id=self.user2.id), 1)
+
     async def test_허용되지않은_유저가_채팅방에_접근하는경우(self) -> None:
         invalid_user = await database_sync_to_async(Account.objects.create)(
             email="test3@example.com",
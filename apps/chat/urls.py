@@ -5,5 +5,7 @@ from apps.chat import views
 urlpatterns = [
     path("", views.ChatRoomView.as_view(), name="chatroom"),
     path("<int:chatroom_id>/", views.ChatDetailView.as_view(), name="chat-detail"),
+    path("<int:chatroom_id>/messages/", views.ChatMessageListView.as_view(), name="chat-messages"),
+    path("<int:chatroom_id>/images/", views.ChatImageView.as_view(), name="chat-image"),
     path("enter/", views.render_chat),
 ]
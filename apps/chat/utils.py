@@ -1,21 +1,37 @@
 import base64
+import io
 import json
 import logging
-from typing import Any, Optional, Union
+import posixpath
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional, TypedDict, Union
 
 import redis
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Prefetch, Q, QuerySet, Subquery
+from django.utils.dateparse import parse_datetime
 from django_redis import get_redis_connection
+from PIL import Image, ImageOps
 
 from apps.chat.models import Chatroom, Message
+from apps.common.utils import uuid4_generator
+from apps.product.models import ProductImage
 from apps.user.models import Account
 
 logger = logging.getLogger(__name__)
 redis_conn = get_redis_connection("default")
 
+# 메시지가 캐싱된 채팅방 그룹 네임과 처음 캐싱된 시각을 저장하는 sorted set (write-behind flusher가 사용)
+CHAT_DIRTY_ROOMS_KEY = "chat_dirty_rooms"
+# stream 모드에서 메시지를 db에 저장하는 consumer group
+CHAT_STREAM_GROUP = "chat_persister"
+
 
 def check_entered_chatroom(chatroom: Chatroom, user: Union[Account, AnonymousUser]) -> bool:
     """
@@ -23,9 +39,10 @@ def check_entered_chatroom(chatroom: Chatroom, user: Union[Account, AnonymousUse
     만약 유저가 lender이면 lender_status의 값을 반환해서 채팅방에 존재하는지 나갔는지를 판단
     유저가 둘다 속하지 않는다면 잘못된 접근으로 판단하고 False를 반환
     """
-    if chatroom.borrower == user:
+    # FK 객체끼리 비교하면 borrower/lender를 조회하는 쿼리가 추가로 실행되므로 id로 비교
+    if chatroom.borrower_id == user.id:
         return chatroom.borrower_status
-    elif chatroom.lender == user:
+    elif chatroom.lender_id == user.id:
         return chatroom.lender_status
     else:
         return False
@@ -35,9 +52,9 @@ def change_entered_status(chatroom: Chatroom, user: Union[Account, AnonymousUser
     """
     채팅방에 참여해 있는 유저의 역할을 파악하고, 그에 맞는 status를 False로 변경(False는 나가기한 상태)
     """
-    if chatroom.borrower == user:
+    if chatroom.borrower_id == user.id:
         chatroom.borrower_status = False
-    if chatroom.lender == user:
+    if chatroom.lender_id == user.id:
         chatroom.lender_status = False
     chatroom.save()
 
@@ -53,12 +70,88 @@ def delete_chatroom(chatroom: Chatroom) -> bool:
     return False
 
 
-def check_opponent_online(chat_group_name: str) -> bool:
-    """django-redis를 사용해서 그룹에 속한 멤버의 수를 가져옴"""
-    redis_conn = get_redis_connection("default")
-    if redis_conn.zcard(f"asgi:group:{chat_group_name}") == 2:
-        return True
-    return False
+@dataclass(frozen=True, slots=True)
+class ChatroomState:
+    """
+    소켓 연결마다 connect 시점에 한 번만 만들어서 메시지마다 사용하는 채팅방 정보
+    메시지 전송 경로에서 채팅방, 참여자, 닉네임을 다시 조회하지 않도록 함
+    """
+
+    chatroom_id: int
+    group_name: str
+    user_id: int
+    nickname: str
+    opponent_id: int
+    opponent_nickname: str
+
+
+class MessageCursor(TypedDict):
+    """
+    채팅방 메시지 목록의 다음 페이지 커서, 마지막으로 내려준 메시지의 정보
+    created_at, id: db에 저장된 메시지를 (created_at, id) 순서로 이어서 가져올 때 사용 (redis 메시지는 id가 None)
+    position: redis에 캐싱된 메시지의 위치 (db 메시지는 None)
+    unread: 이전 페이지까지 읽음 상태를 계산하고 남은 받는 사람별 안읽은 메시지 수
+    """
+
+    created_at: Union[str, datetime]
+    id: Optional[int]
+    uuid: Optional[str]
+    position: Optional[str]
+    unread: dict[int, int]
+
+
+def get_chatroom_state(chatroom_id: int, user: Union[Account, AnonymousUser]) -> ChatroomState:
+    """
+    채팅방과 두 참여자를 select_related 로 한 번에 조회해서 연결 상태 객체를 만듦
+    채팅방이 없거나 유저가 참여중인 채팅방이 아니면 ValueError
+    """
+    chatroom = Chatroom.objects.select_related("borrower", "lender").filter(id=chatroom_id).first()
+    if chatroom is None:
+        raise ValueError("해당 채팅방이 존재하지 않습니다.")
+    if not check_entered_chatroom(chatroom, user):
+        raise ValueError("해당 채팅방에 존재하는 유저가 아닙니다.")
+    me, opponent = (
+        (chatroom.borrower, chatroom.lender)
+        if chatroom.borrower_id == user.id
+        else (chatroom.lender, chatroom.borrower)
+    )
+    return ChatroomState(
+        chatroom_id=chatroom.id,
+        group_name=get_group_name(chatroom.id),
+        user_id=me.id,
+        nickname=me.nickname,
+        opponent_id=opponent.id,
+        opponent_nickname=opponent.nickname,
+    )
+
+
+def get_presence_key(chatroom_id: int, user_id: int) -> str:
+    # 채팅방에 접속중인 유저의 소켓 연결(channel name)을 만료 시각과 함께 저장하는 zset
+    return f"{get_group_name(chatroom_id)}_presence_{user_id}"
+
+
+def add_presence(chatroom_id: int, user_id: int, channel_name: str) -> None:
+    """
+    소켓 연결의 접속 상태를 CHAT_PRESENCE_TTL 동안 유효하도록 저장, heartbeat 마다 다시 호출해서 만료 시각을 연장
+    disconnect 없이 워커가 종료되어도 heartbeat가 멈추므로 TTL이 지나면 접속중이 아닌 것으로 판단
+    """
+    key = get_presence_key(chatroom_id, user_id)
+    now = time.time()
+    with redis_conn.pipeline() as pipe:
+        pipe.zadd(key, {channel_name: now + settings.CHAT_PRESENCE_TTL})
+        # 만료된 연결은 heartbeat 할 때 같이 정리
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.expire(key, settings.CHAT_PRESENCE_TTL)
+        pipe.execute()
+
+
+def remove_presence(chatroom_id: int, user_id: int, channel_name: str) -> None:
+    redis_conn.zrem(get_presence_key(chatroom_id, user_id), channel_name)
+
+
+def check_opponent_online(chatroom_id: int, opponent_id: int) -> bool:
+    # 상대방의 소켓 연결 중 만료되지 않은 연결이 하나라도 있으면 접속중
+    return bool(redis_conn.zcount(get_presence_key(chatroom_id, opponent_id), time.time(), "+inf"))
 
 
 def get_group_name(chatroom_id: int) -> str:
@@ -67,6 +160,7 @@ def get_group_name(chatroom_id: int) -> str:
 
 
 def decode_image(image_data: str) -> ContentFile[Any]:
+    # 이미지 업로드 api 도입 전에 redis에 캐싱된 base64 이미지를 저장할 때만 사용
     # Base64 문자열 디코딩
     format, imgstr = image_data.split(";base64,")
     ext = format.split("/")[-1]
@@ -74,126 +168,722 @@ def decode_image(image_data: str) -> ContentFile[Any]:
     return ContentFile(base64.b64decode(imgstr), name="image." + ext)
 
 
-def cashe_set_chat_message(chat_group_name: str, data: dict[str, Any]) -> None:
-    # Redis에 메시지를 json형식으로 직렬화하여 저장
+def get_chat_image_prefix(chatroom_id: int) -> str:
+    # 채팅방별로 이미지 경로를 나눠서 메시지에 다른 채팅방의 이미지 키를 담을 수 없도록 함
+    return f"images/chat/{chatroom_id}/"
+
+
+def create_thumbnail(image: File[Any]) -> Optional[ContentFile[Any]]:
+    """
+    업로드한 이미지로 CHAT_IMAGE_THUMBNAIL_SIZE 크기 안에 들어가는 jpeg 미리보기를 만듦
+    미리보기는 선택사항이므로 만들지 못하면 None을 반환
+    """
     try:
-        key = f"{chat_group_name}_messages"
-        redis_conn.lpush(key, json.dumps(data))
+        image.seek(0)
+        with Image.open(image) as img:
+            # Image.open은 헤더만 읽으므로 픽셀을 디코딩하기 전에 크기를 확인해서 너무 큰 이미지는 미리보기를 만들지 않음
+            if img.width * img.height > settings.CHAT_IMAGE_MAX_PIXELS:
+                logger.warning("미리보기를 만들기에는 이미지가 너무 큽니다: %dx%d", img.width, img.height)
+                return None
+            # jpeg는 미리보기 크기에 가까운 배율로 줄여서 디코딩
+            img.draft("RGB", settings.CHAT_IMAGE_THUMBNAIL_SIZE)
+            transposed = ImageOps.exif_transpose(img)
+            if transposed is None:
+                return None
+            thumbnail = transposed.convert("RGB")
+            thumbnail.thumbnail(settings.CHAT_IMAGE_THUMBNAIL_SIZE)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format="JPEG", quality=80)
+        return ContentFile(buffer.getvalue(), name="thumbnail.jpg")
+    except Exception as e:
+        logger.error("예외 발생: %s", e, exc_info=True)
+        return None
+    finally:
+        image.seek(0)
+
+
+def save_chat_image(chatroom_id: int, image: File[Any]) -> dict[str, Optional[str]]:
+    """
+    채팅 이미지를 메시지와 별개로 스토리지에 한 번만 업로드하고 스토리지 키와 url을 반환
+    메시지에는 이미지 대신 스토리지 키만 담아서 보냄
+    """
+    prefix = get_chat_image_prefix(chatroom_id)
+    name = uuid4_generator(length=8)
+    thumbnail = create_thumbnail(image)
+    image_key = default_storage.save(f"{prefix}{name}_{image.name}", image)
+    thumbnail_key = default_storage.save(f"{prefix}thumbnails/{name}.jpg", thumbnail) if thumbnail else None
+    return {
+        "image": image_key,
+        "image_url": default_storage.url(image_key),
+        "thumbnail": thumbnail_key,
+        "thumbnail_url": default_storage.url(thumbnail_key) if thumbnail_key else None,
+    }
+
+
+def is_chat_image_key(chatroom_id: int, key: str) -> bool:
+    """
+    클라이언트가 보낸 스토리지 키가 해당 채팅방에 실제로 업로드된 이미지인지 확인
+    경로를 정규화했을 때 바뀌는 키(.., //, 역슬래시 등)는 다른 경로를 가리킬 수 있으므로 거부
+    """
+    if not isinstance(key, str) or not key:
+        return False
+    if "\\" in key or ".." in key.split("/") or posixpath.normpath(key) != key:
+        return False
+    if not key.startswith(get_chat_image_prefix(chatroom_id)):
+        return False
+    return bool(default_storage.exists(key))
+
+
+def get_chat_image_data(chatroom_id: int, image_key: str, thumbnail_key: Optional[str] = None) -> dict[str, Any]:
+    """
+    클라이언트가 보낸 스토리지 키로 redis에 캐싱하고 그룹에 보낼 이미지 데이터를 만듦
+    image, thumbnail은 db에 저장된 메시지를 직렬화한 것과 같이 url로 내려주고, 키는 db에 저장할 때 사용
+    """
+    if not is_chat_image_key(chatroom_id, image_key) or (
+        thumbnail_key is not None and not is_chat_image_key(chatroom_id, thumbnail_key)
+    ):
+        raise ValueError("채팅방에 업로드된 이미지가 아닙니다.")
+    image_data = {"image": default_storage.url(image_key), "image_key": image_key}
+    if thumbnail_key:
+        image_data.update(thumbnail=default_storage.url(thumbnail_key), thumbnail_key=thumbnail_key)
+    return image_data
+
+
+def use_message_stream() -> bool:
+    return bool(settings.CHAT_MESSAGE_STORE == "stream")
+
+
+def get_message_key(chat_group_name: str) -> str:
+    # 캐싱 방식에 따라 자료형이 다르므로 키 이름도 다르게 사용
+    if use_message_stream():
+        return f"{chat_group_name}_stream"
+    return f"{chat_group_name}_messages"
+
+
+def fetch_cached_messages(conn: Any, chat_group_name: str, count: Optional[int] = None) -> Any:
+    """
+    캐싱된 메시지를 최신순으로 가져옴, conn으로 redis 연결이나 파이프라인을 받음
+    결과는 load_cached_messages로 역직렬화
+    """
+    key = get_message_key(chat_group_name)
+    if use_message_stream():
+        return conn.xrevrange(key, count=count)
+    return conn.lrange(key, 0, -1 if count is None else count - 1)
+
+
+def fetch_cached_message_num(conn: Any, chat_group_name: str) -> Any:
+    key = get_message_key(chat_group_name)
+    if use_message_stream():
+        return conn.xlen(key)
+    return conn.llen(key)
+
+
+def load_cached_messages(stored_messages: list[Any]) -> list[dict[str, Any]]:
+    if use_message_stream():
+        return [json.loads(fields[b"data"]) for _, fields in stored_messages]
+    return [json.loads(msg) for msg in stored_messages]
+
+
+def get_unread_key(chat_group_name: str) -> str:
+    # 채팅방의 받는 사람(user id)별 안읽은 메시지 수를 저장하는 hash
+    return f"{chat_group_name}_unread"
+
+
+def get_flushed_key(chat_group_name: str) -> str:
+    """
+    db에 저장하고 redis에서 지운 메시지 수(count)와 마지막으로 저장을 마친 메시지 id(id)를 저장하는 hash
+    메시지 목록 조회에서 list의 메시지 위치를 계산하고, db와 redis에 모두 있는 메시지를 제외하는 기준으로 사용
+    """
+    return f"{chat_group_name}_flushed"
+
+
+def record_flushed_messages(
+    pipe: Any, chat_group_name: str, flushed_message_num: int, flushed_id: Optional[int]
+) -> None:
+    # redis에서 메시지를 지우는 트랜잭션에서 함께 호출해서 메시지 목록 조회가 항상 같은 시점의 값을 읽도록 함
+    flushed_key = get_flushed_key(chat_group_name)
+    pipe.hincrby(flushed_key, "count", flushed_message_num)
+    if flushed_id is not None:
+        pipe.hset(flushed_key, "id", flushed_id)
+
+
+def get_unread_counts_at_redis(chat_group_name: str) -> dict[int, int]:
+    return {int(user_id): int(count) for user_id, count in redis_conn.hgetall(get_unread_key(chat_group_name)).items()}
+
+
+def apply_unread_status(messages: list[dict[str, Any]], unread_counts: dict[int, int]) -> list[dict[str, Any]]:
+    """
+    redis에 캐싱된 메시지의 읽음 상태는 안읽은 메시지 수 hash를 기준으로 판단
+    메시지는 최신순으로 받아서, 받는 사람의 안읽은 메시지 수만큼 최신 메시지부터 안읽음(True)으로 처리
+    """
+    remaining = dict(unread_counts)
+    for msg in messages:
+        msg["status"] = False
+        for recipient_id, count in remaining.items():
+            if recipient_id != msg["sender_id"] and count > 0:
+                remaining[recipient_id] = count - 1
+                msg["status"] = True
+    return messages
+
+
+def cashe_set_chat_message(chat_group_name: str, data: dict[str, Any], recipient_id: Optional[int] = None) -> int:
+    """
+    Redis에 메시지를 json형식으로 직렬화하여 저장하고, 상대방이 읽지 않은 메시지면 상대방의 안읽은 메시지 수를 1 증가
+    db 저장은 flush_chat_messages 커맨드가 따로 처리하므로 채팅방을 flush 대상으로 등록만 함
+    저장 후 redis에 캐싱된 메시지 수를 반환
+    """
+    return cashe_set_chat_messages(chat_group_name, [(data, recipient_id)])
+
+
+def cashe_set_chat_messages(chat_group_name: str, messages: list[tuple[dict[str, Any], Optional[int]]]) -> int:
+    """
+    같은 채팅방의 (메시지, 안읽은 메시지 수를 증가시킬 유저 id) 목록을 한 번의 파이프라인으로 저장
+    list 모드는 보낸 순서대로 LPUSH 한 번에 넣으므로 가장 최근 메시지가 0번 인덱스에 위치함
+    저장 후 redis에 캐싱된 메시지 수를 반환
+    """
+    try:
+        key = get_message_key(chat_group_name)
+        unread_counts: dict[str, int] = {}
+        for data, recipient_id in messages:
+            if data["status"] and recipient_id is not None:
+                unread_counts[str(recipient_id)] = unread_counts.get(str(recipient_id), 0) + 1
+        with redis_conn.pipeline() as pipe:
+            if use_message_stream():
+                for data, _ in messages:
+                    pipe.xadd(key, {"data": json.dumps(data)})
+            else:
+                pipe.lpush(key, *(json.dumps(data) for data, _ in messages))
+            pipe.zadd(CHAT_DIRTY_ROOMS_KEY, {chat_group_name: time.time()}, nx=True)
+            for unread_user_id, count in unread_counts.items():
+                pipe.hincrby(get_unread_key(chat_group_name), unread_user_id, count)
+            fetch_cached_message_num(pipe, chat_group_name)
+            stored_message_num: int = pipe.execute()[-1]
+        return stored_message_num
     except Exception as e:
         raise ValueError(str(e))
 
 
-def save_redis_to_postgres(chat_group_name: str) -> None:
-    # 메시지 수가 100개를 초과하면 저장된 메시지를 역직렬화해서 불러온 뒤 DB에 저장
-    key = f"{chat_group_name}_messages"
+def get_flush_due_rooms(max_messages: int, max_age: float) -> list[str]:
+    """
+    redis에 메시지가 캐싱된 채팅방들 중 캐싱된 메시지 수가 max_messages 이상이거나
+    처음 캐싱된 뒤 max_age초가 지난 채팅방의 그룹 네임을 반환
+    """
+    dirty_rooms = redis_conn.zrange(CHAT_DIRTY_ROOMS_KEY, 0, -1, withscores=True)
+    if not dirty_rooms:
+        return []
+    with redis_conn.pipeline(transaction=False) as pipe:
+        for chat_group_name, _ in dirty_rooms:
+            fetch_cached_message_num(pipe, chat_group_name.decode())
+        stored_message_nums = pipe.execute()
+
+    now = time.time()
+    return [
+        chat_group_name.decode()
+        for (chat_group_name, first_cached_at), stored_message_num in zip(dirty_rooms, stored_message_nums)
+        if stored_message_num >= max_messages or now - first_cached_at >= max_age
+    ]
+
+
+def save_messages_to_postgres(messages: list[dict[str, Any]]) -> dict[int, int]:
+    """
+    redis에서 가져온 메시지들을 한 번의 bulk_create로 저장하고 채팅방별로 저장한 메시지의 가장 큰 id를 반환
+    이전 flush에서 저장까지 되고 redis에서 지워지지 못한 메시지는 uuid가 겹치므로 읽음 상태만 갱신 (재시도해도 중복 저장되지 않음)
+    """
+    bulk_messages = []
+    # 메시지는 최신순으로 받으므로 오래된 메시지부터 저장해서 (created_at, id) 순서가 보낸 순서와 같도록 함
+    for msg in reversed(messages):
+        msg.pop("nickname", None)
+        image = msg.pop("image", None)
+        msg.pop("thumbnail", None)
+        # 이미지는 업로드 api로 이미 스토리지에 저장되어 있으므로 스토리지 키만 저장
+        msg["image"] = msg.pop("image_key", None)
+        msg["thumbnail"] = msg.pop("thumbnail_key", None)
+        # 업로드 api 도입 전에 캐싱된 base64 이미지는 디코딩 후 파일로 변환해서 s3에 저장될 수 있도록함
+        if image and not msg["image"] and image.startswith("data:"):
+            msg["image"] = decode_image(image)
+        bulk_messages.append(Message(**msg))
+
+    with transaction.atomic():
+        saved_messages = Message.objects.bulk_create(
+            bulk_messages, update_conflicts=True, unique_fields=["uuid"], update_fields=["status"]
+        )
+    saved_ids: dict[int, int] = {}
+    for message in saved_messages:
+        if message.id is not None:
+            saved_ids[message.chatroom_id] = max(saved_ids.get(message.chatroom_id, 0), message.id)
+    return saved_ids
+
+
+def count_unread_messages(messages: list[dict[str, Any]], recipient_ids: Any) -> dict[int, int]:
+    # 받는 사람별로 메시지 목록에서 안읽음(status=True) 상태인 메시지 수를 셈
+    return {
+        recipient_id: sum(1 for msg in messages if msg["status"] and msg["sender_id"] != recipient_id)
+        for recipient_id in recipient_ids
+    }
+
+
+def clear_flushed_room(
+    chat_group_name: str,
+    flushed_messages: list[dict[str, Any]],
+    unread_counts: dict[int, int],
+    flushed_id: Optional[int] = None,
+) -> bool:
+    """
+    db에 저장한 메시지만 redis에서 지우고, 저장한 안읽은 메시지 수만큼 안읽은 메시지 수에서 뺌
+    list는 LPUSH로 쌓이므로 저장한 메시지는 항상 가장 오래된 쪽(끝)에 있고 저장하는 동안 들어온 메시지는 앞쪽에 남음
+    남은 메시지가 있으면 flush 대상 시각을 다시 매기고, 없으면 키를 지우고 flush 대상에서 제외
+    저장하는 동안 받는 사람이 메시지를 읽었으면(안읽은 메시지 수가 새 메시지만큼 늘어난 값과 다르면) db에 저장한 메시지를 읽음처리
+    """
+    key = get_message_key(chat_group_name)
+    unread_key = get_unread_key(chat_group_name)
+    flushed_message_num = len(flushed_messages)
+    flushed_unread_counts = count_unread_messages(flushed_messages, unread_counts)
 
     with redis_conn.pipeline() as pipe:
-        while True:
+        for _ in range(3):
             try:
-                # watch로 모니터링 시작
-                pipe.watch(key)
-                if pipe.llen(key) > 100:
-                    messages = [json.loads(msg) for msg in pipe.lrange(key, 0, -1)]
-                    for msg in messages:
-                        # 메시지 데이터에 이미지가 존재하면 디코딩 후 파일로 변환해서 db의 image필드로 s3에 저장될 수 있도록함
-                        if "image" in msg:
-                            msg["image"] = decode_image(msg["image"])
-                        msg.pop("nickname", None)
-                    bulk_messages = [Message(**msg) for msg in messages]
-                    # 트랜잭션 시작
-                    with transaction.atomic():
-                        Message.objects.bulk_create(bulk_messages)
-                        # 데이터베이스에 저장되고나면 redis에 남은 메시지들을 지움
-                        pipe.delete(key)
+                pipe.watch(key, unread_key)
+                # 다른 flusher가 먼저 지운 경우 저장하지 않은 메시지까지 지우지 않도록 함
+                if pipe.llen(key) < flushed_message_num:
+                    return False
+                new_messages = load_cached_messages(pipe.lrange(key, 0, -(flushed_message_num + 1)))
+                current_unread_counts = {
+                    int(user_id): int(count) for user_id, count in pipe.hgetall(unread_key).items()
+                }
+                new_unread_counts = count_unread_messages(new_messages, unread_counts)
+                read_user_ids = {
+                    recipient_id
+                    for recipient_id, count in flushed_unread_counts.items()
+                    if count
+                    and current_unread_counts.get(recipient_id, 0)
+                    != unread_counts[recipient_id] + new_unread_counts[recipient_id]
+                }
+
+                pipe.multi()
+                if new_messages:
+                    pipe.ltrim(key, 0, -(flushed_message_num + 1))
+                    for recipient_id, count in flushed_unread_counts.items():
+                        # 읽음 처리로 초기화된 유저의 안읽은 메시지 수는 저장하는 동안 들어온 메시지만 세고 있으므로 빼지 않음
+                        if count and recipient_id not in read_user_ids:
+                            pipe.hincrby(unread_key, str(recipient_id), -count)
+                    # 남은 메시지는 이번 flush 도중에 들어온 것이므로 지금부터 다시 max_age를 셈
+                    pipe.zadd(CHAT_DIRTY_ROOMS_KEY, {chat_group_name: time.time()})
+                else:
+                    pipe.delete(key, unread_key)
+                    pipe.zrem(CHAT_DIRTY_ROOMS_KEY, chat_group_name)
+                record_flushed_messages(pipe, chat_group_name, flushed_message_num, flushed_id)
+                pipe.execute()
                 break
-            except redis.WatchError as e:
-                logger.error("예외 발생: %s", e, exc_info=True)
+            except redis.WatchError:
+                # 그 사이 새 메시지가 들어오거나 읽음 처리가 되었으면 남은 메시지를 다시 확인
                 continue
-            except Exception as e:
-                logger.error("예외 발생: %s", e, exc_info=True)
-                break
+        else:
+            # 계속 실패하면 redis에 그대로 남겨두고 다음 flush에서 다시 저장 (uuid 기준 upsert로 중복 저장 없음)
+            return False
 
+    if read_user_ids:
+        for user_id in read_user_ids:
+            Message.objects.filter(uuid__in=[msg["uuid"] for msg in flushed_messages], status=True).exclude(
+                sender_id=user_id
+            ).update(status=False)
+        clear_unread_notifications_cache_at_flush(read_user_ids)
+    return True
 
-def save_remaining_messages_to_postgres(chat_group_name: str) -> None:
-    # Redis에서 남은 메시지 가져와 DB에 저장
-    key = f"{chat_group_name}_messages"
-    remaining_messages = redis_conn.lrange(key, 0, -1)
-    if remaining_messages:
-        messages = [json.loads(msg) for msg in remaining_messages]
-        for msg in messages:
-            # 메시지 데이터에 이미지가 존재하면 디코딩 후 파일로 변환해서 db의 image필드로 s3에 저장될 수 있도록함
-            if msg.get("image"):
-                msg["image"] = decode_image(msg["image"])
-            msg.pop("nickname", None)
-        bulk_messages = [Message(**msg) for msg in messages]
-        Message.objects.bulk_create(bulk_messages)
-
-    # Redis 캐시 삭제
-    redis_conn.delete(key)
-
-
-def get_last_message(chatroom_id: int) -> Optional[dict[str, Any]]:
-    key = f"{get_group_name(chatroom_id)}_messages"
-    # 만약 redis에 채팅 메시지가 존재하면 레디스에서 마지막 채팅내용을 가져옴
-    if redis_conn.exists(key):
-        stored_last_message = redis_conn.lrange(key, -1, -1)
-        last_message: dict[str, Any] = json.loads(stored_last_message[0])
-
-        return last_message
-    # redis에 채팅내용이없으면 데이터베이스에서 마지막 채팅내용을 가져옴
-    messages = Message.objects.filter(chatroom_id=chatroom_id)
+
+def flush_chat_rooms(chat_group_names: list[str]) -> int:
+    """
+    여러 채팅방의 캐싱된 메시지를 한 번에 가져와서 db에 저장하고 저장한 메시지만 redis에서 지움
+    저장된 메시지 수를 반환
+    """
+    if not chat_group_names:
+        return 0
+    if use_message_stream():
+        return sum(flush_chat_stream(chat_group_name) for chat_group_name in chat_group_names)
+
+    with redis_conn.pipeline(transaction=False) as pipe:
+        for chat_group_name in chat_group_names:
+            fetch_cached_messages(pipe, chat_group_name)
+            pipe.hgetall(get_unread_key(chat_group_name))
+        results = pipe.execute()
+
+    snapshots = {}
+    messages = []
+    for chat_group_name, stored_messages, stored_unread_counts in zip(chat_group_names, results[::2], results[1::2]):
+        unread_counts = {int(user_id): int(count) for user_id, count in stored_unread_counts.items()}
+        # 안읽은 메시지 수 hash를 기준으로 db에 저장할 메시지의 읽음 상태를 맞춤
+        room_messages = apply_unread_status(load_cached_messages(stored_messages), unread_counts)
+        snapshots[chat_group_name] = (room_messages, unread_counts)
+        messages += room_messages
+
+    saved_ids: dict[int, int] = {}
     if messages:
-        from apps.chat.serializers import MessageSerializer
+        saved_ids = save_messages_to_postgres(messages)
+        # 안읽은 메시지가 db에 저장된 유저는 소켓 연결시 보내줄 안읽은 알림이 바뀌므로 캐시를 지움
+        clear_unread_notifications_cache_at_flush(
+            {user_id for _, unread_counts in snapshots.values() for user_id, count in unread_counts.items() if count}
+        )
 
-        return MessageSerializer(messages.order_by("-created_at").first()).data
+    flushed_message_num = 0
+    for chat_group_name, (room_messages, unread_counts) in snapshots.items():
+        flushed_id = saved_ids.get(room_messages[0]["chatroom_id"]) if room_messages else None
+        if clear_flushed_room(chat_group_name, room_messages, unread_counts, flushed_id):
+            flushed_message_num += len(room_messages)
+    return flushed_message_num
 
-    return None
 
+def clear_unread_notifications_cache_at_flush(user_ids: set[int]) -> None:
+    from apps.notification.utils import clear_unread_notifications_cache
 
-def get_chatroom_message(chatroom_id: int) -> Any:
+    clear_unread_notifications_cache(*user_ids)
+
+
+def read_stream_entries(key: str, count: int) -> list[Any]:
+    """
+    consumer group으로 저장할 메시지를 읽어옴
+    다른 flusher가 오래 처리하지 못한 메시지를 먼저 가져오고, 자신의 pending 메시지(이전에 저장에 실패한 메시지)가 있으면
+    새 메시지보다 먼저 다시 저장
+    """
+    consumer = settings.CHAT_STREAM_CONSUMER
+    try:
+        redis_conn.xgroup_create(key, CHAT_STREAM_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    redis_conn.xautoclaim(
+        key, CHAT_STREAM_GROUP, consumer, min_idle_time=settings.CHAT_STREAM_CLAIM_IDLE * 1000, count=count
+    )
+    for last_id in ("0", ">"):
+        result = redis_conn.xreadgroup(CHAT_STREAM_GROUP, consumer, {key: last_id}, count=count)
+        if result and result[0][1]:
+            entries: list[Any] = result[0][1]
+            return entries
+    return []
+
+
+def flush_chat_stream(chat_group_name: str, count: int = 1000) -> int:
+    """
+    Redis Stream에 캐싱된 채팅방 메시지를 db에 한 번 저장하고, 저장한 메시지만 XACK/XDEL
+    db에 저장한 뒤에 XACK 하므로 중간에 실패한 메시지는 pending으로 남아 다음 flush에서 다시 저장됨 (uuid 기준 upsert로 중복 저장 없음)
+    저장한 메시지의 안읽은 메시지 수는 hash에서 빼서 db의 status로 옮김
+    """
+    key = get_message_key(chat_group_name)
+    entries = read_stream_entries(key, count)
+    if not entries:
+        return 0
+    last_entry_id = entries[-1][0].decode()
+
+    with redis_conn.pipeline(transaction=False) as pipe:
+        # 읽어온 메시지보다 나중에 들어온 메시지까지 포함해서 최신순으로 읽음 상태를 계산
+        pipe.xrange(key, min=f"({last_entry_id}", max="+")
+        pipe.hgetall(get_unread_key(chat_group_name))
+        newer_entries, stored_unread_counts = pipe.execute()
+    unread_counts = {int(user_id): int(count) for user_id, count in stored_unread_counts.items()}
+    newer_messages = load_cached_messages(newer_entries[::-1])
+    messages = apply_unread_status(newer_messages + load_cached_messages(entries[::-1]), unread_counts)
+    flushed_messages = messages[len(newer_messages) :]
+    snapshot_entry_id = newer_entries[-1][0].decode() if newer_entries else last_entry_id
+    flushed_unread_counts = count_unread_messages(flushed_messages, unread_counts)
+
+    saved_ids = save_messages_to_postgres(flushed_messages)
+    # 안읽은 메시지가 db에 저장된 유저는 소켓 연결시 보내줄 안읽은 알림이 바뀌므로 캐시를 지움
+    clear_unread_notifications_cache_at_flush(
+        {recipient_id for recipient_id, count in flushed_unread_counts.items() if count}
+    )
+    flushed_id = saved_ids.get(flushed_messages[0]["chatroom_id"]) if flushed_messages else None
+    if not clear_flushed_stream(
+        chat_group_name, entries, snapshot_entry_id, flushed_messages, unread_counts, flushed_id
+    ):
+        return 0
+    return len(entries)
+
+
+def clear_flushed_stream(
+    chat_group_name: str,
+    entries: list[Any],
+    snapshot_entry_id: str,
+    flushed_messages: list[dict[str, Any]],
+    unread_counts: dict[int, int],
+    flushed_id: Optional[int] = None,
+) -> bool:
+    """
+    db에 저장한 stream 메시지만 XACK/XDEL 하고, 저장한 안읽은 메시지 수만큼 안읽은 메시지 수에서 뺌
+    WATCH 가 실패하면 db에 다시 저장하지 않고 이 단계만 재시도
+    저장하는 동안 받는 사람이 메시지를 읽었으면(안읽은 메시지 수가 새 메시지만큼 늘어난 값과 다르면) db에 저장한 메시지를 읽음처리
+    """
+    key = get_message_key(chat_group_name)
+    unread_key = get_unread_key(chat_group_name)
+    entry_ids = [entry_id for entry_id, _ in entries]
+    flushed_unread_counts = count_unread_messages(flushed_messages, unread_counts)
+
+    with redis_conn.pipeline() as pipe:
+        for _ in range(3):
+            try:
+                pipe.watch(key, unread_key)
+                stored_message_num = pipe.xlen(key)
+                # 읽음 상태를 계산한 뒤에 들어온 메시지
+                new_messages = load_cached_messages(pipe.xrange(key, min=f"({snapshot_entry_id}", max="+"))
+                current_unread_counts = {
+                    int(user_id): int(count) for user_id, count in pipe.hgetall(unread_key).items()
+                }
+                new_unread_counts = count_unread_messages(new_messages, unread_counts)
+                read_user_ids = {
+                    recipient_id
+                    for recipient_id, count in flushed_unread_counts.items()
+                    if count
+                    and current_unread_counts.get(recipient_id, 0)
+                    != unread_counts[recipient_id] + new_unread_counts[recipient_id]
+                }
+
+                pipe.multi()
+                if stored_message_num == len(entry_ids):
+                    # stream에 남은 메시지가 없으면 키를 지우고 flush 대상에서 제외
+                    pipe.delete(key, unread_key)
+                    pipe.zrem(CHAT_DIRTY_ROOMS_KEY, chat_group_name)
+                else:
+                    pipe.xack(key, CHAT_STREAM_GROUP, *entry_ids)
+                    pipe.xdel(key, *entry_ids)
+                    for recipient_id, count in flushed_unread_counts.items():
+                        # 읽음 처리로 초기화된 유저의 안읽은 메시지 수는 저장하는 동안 들어온 메시지만 세고 있으므로 빼지 않음
+                        if count and recipient_id not in read_user_ids:
+                            pipe.hincrby(unread_key, str(recipient_id), -count)
+                    # 남은 메시지는 이번 flush 도중에 들어온 것이므로 지금부터 다시 max_age를 셈
+                    pipe.zadd(CHAT_DIRTY_ROOMS_KEY, {chat_group_name: time.time()})
+                record_flushed_messages(pipe, chat_group_name, len(entry_ids), flushed_id)
+                pipe.execute()
+                break
+            except redis.WatchError:
+                # 그 사이 새 메시지가 들어오거나 읽음 처리가 되었으면 남은 메시지를 다시 확인
+                continue
+        else:
+            # 계속 실패하면 pending으로 남겨두고 다음 flush에서 다시 저장 (uuid 기준 upsert로 중복 저장 없음)
+            return False
+
+    if read_user_ids:
+        for user_id in read_user_ids:
+            Message.objects.filter(uuid__in=[msg["uuid"] for msg in flushed_messages], status=True).exclude(
+                sender_id=user_id
+            ).update(status=False)
+        clear_unread_notifications_cache_at_flush(read_user_ids)
+    return True
+
+
+def get_chatroom_list_queryset(user: Account) -> QuerySet[Chatroom]:
+    """
+    유저가 참여중인 채팅방 목록을 한 번의 쿼리로 조회
+    상대방 정보는 select_related, 마지막 메시지 id와 안읽은 메시지 수는 서브쿼리/집계로 함께 가져오고
+    상품 이미지는 prefetch 로 한 번에 가져옴
+    """
+    last_message_id = Message.objects.filter(chatroom=OuterRef("pk")).order_by("-created_at", "-id").values("id")[:1]
+    return (
+        Chatroom.objects.filter(Q(lender=user, lender_status=True) | Q(borrower=user, borrower_status=True))
+        .select_related("borrower", "lender", "product")
+        .prefetch_related(
+            Prefetch("product__images", queryset=ProductImage.objects.order_by("id"), to_attr="prefetched_images")
+        )
+        .annotate(
+            last_message_id=Subquery(last_message_id),
+            db_unread_count=Count("message", filter=Q(message__status=True) & ~Q(message__sender=user)),
+        )
+        .order_by("id")
+    )
+
+
+def get_last_messages_at_postgres(message_ids: list[int]) -> dict[int, dict[str, Any]]:
+    # 채팅방별 마지막 메시지들을 한 번의 쿼리로 가져와서 채팅방 id 기준으로 반환
+    from apps.chat.serializers import MessageSerializer
+
+    messages = Message.objects.filter(id__in=message_ids).select_related("sender")
+    return {message.chatroom_id: MessageSerializer(message).data for message in messages}
+
+
+def get_chatroom_summaries_at_redis(chatroom_ids: list[int], user_id: int) -> dict[int, dict[str, Any]]:
+    """
+    redis에 캐싱된 채팅방들의 마지막 메시지와 안읽은 메시지 수를 하나의 파이프라인으로 가져옴
+    """
+    with redis_conn.pipeline(transaction=False) as pipe:
+        for chatroom_id in chatroom_ids:
+            chat_group_name = get_group_name(chatroom_id)
+            fetch_cached_messages(pipe, chat_group_name, count=1)
+            pipe.hgetall(get_unread_key(chat_group_name))
+        results = pipe.execute()
+
+    summaries = {}
+    for chatroom_id, stored_last_message, stored_unread_counts in zip(chatroom_ids, results[::2], results[1::2]):
+        # 안읽은 메시지 수 hash는 메시지 리스트와 함께 저장/삭제되므로 캐싱된 메시지가 없으면 건너뜀
+        if not stored_last_message:
+            continue
+        unread_counts = {int(recipient_id): int(count) for recipient_id, count in stored_unread_counts.items()}
+        summaries[chatroom_id] = {
+            "last_message": apply_unread_status(load_cached_messages(stored_last_message), unread_counts)[0],
+            "unread_count": unread_counts.get(user_id, 0),
+        }
+    return summaries
+
+
+def read_cached_message_page(
+    chat_group_name: str, position: Optional[str], count: int
+) -> Optional[tuple[list[dict[str, Any]], list[str], dict[int, int], Optional[int]]]:
+    """
+    캐싱된 메시지를 최신순으로 최대 count개만 가져와서 메시지, 각 메시지의 위치, 안읽은 메시지 수, db에 저장을 마친 메시지 id를 반환
+    position이 있으면 그 위치의 메시지보다 이전 메시지만 가져오고, 그 메시지가 이미 redis에서 지워졌으면 None을 반환
+    위치는 list 모드에서는 처음 캐싱된 메시지부터의 순번(redis에서 지운 메시지 수 + 남은 메시지 중 순서), stream 모드에서는 entry id
+    """
+    key = get_message_key(chat_group_name)
+    unread_key = get_unread_key(chat_group_name)
+    flushed_key = get_flushed_key(chat_group_name)
+
+    if use_message_stream():
+        with redis_conn.pipeline() as pipe:
+            # position의 메시지도 함께 가져와서 아직 redis에 남아있는지 확인
+            pipe.xrevrange(key, max=position or "+", count=count + 1 if position else count)
+            pipe.hgetall(unread_key)
+            pipe.hget(flushed_key, "id")
+            entries, stored_unread_counts, flushed_id = pipe.execute()
+        if position:
+            if not entries or entries[0][0].decode() != position:
+                return None
+            entries = entries[1:]
+        stored_messages = entries
+        positions = [entry_id.decode() for entry_id, _ in entries]
+    else:
+        # 남은 메시지 중 순서는 flush로 오래된 메시지를 지울 때만 바뀌므로 지운 메시지 수로 position의 index를 계산
+        flushed_count = int(redis_conn.hget(flushed_key, "count") or 0) if position else 0
+        for _ in range(3):
+            with redis_conn.pipeline() as pipe:
+                pipe.hmget(flushed_key, "count", "id")
+                pipe.hgetall(unread_key)
+                pipe.llen(key)
+                if position is None:
+                    pipe.lrange(key, 0, count - 1)
+                else:
+                    # 오래된 메시지가 list의 끝에 있으므로 끝에서부터 position의 메시지와 그 이전 메시지를 가져옴
+                    start = flushed_count - int(position) - 1
+                    pipe.lrange(key, start, min(start + count, -1))
+                (stored_count, flushed_id), stored_unread_counts, message_num, stored_messages = pipe.execute()
+            if position is None or int(stored_count or 0) == flushed_count:
+                break
+            # 그 사이 flush가 되었으면 지운 메시지 수가 바뀌었으므로 다시 계산
+            flushed_count = int(stored_count or 0)
+        else:
+            return None
+
+        if position is None:
+            newest_position = int(stored_count or 0) + message_num - 1
+        else:
+            if not 0 <= int(position) - flushed_count < message_num:
+                return None
+            newest_position = int(position) - 1
+            stored_messages = stored_messages[1:]
+        positions = [str(newest_position - index) for index in range(len(stored_messages))]
+
+    unread_counts = {int(user_id): int(num) for user_id, num in stored_unread_counts.items()}
+    return load_cached_messages(stored_messages), positions, unread_counts, int(flushed_id) if flushed_id else None
+
+
+def get_chatroom_message_page(
+    chatroom_id: int, cursor: Optional[MessageCursor] = None, page_size: int = 30
+) -> tuple[list[dict[str, Any]], Optional[MessageCursor]]:
+    """
+    채팅방 메시지를 최신순으로 page_size개 가져오고, 이전 메시지를 이어서 가져올 커서를 함께 반환
+    redis에 캐싱된 메시지는 db에 저장된 메시지보다 항상 최신이므로 redis -> db 순서로 이어서 가져옴
+    redis에서는 커서의 위치부터, db에서는 (created_at, id) 기준으로 필요한 개수만 조회하므로 메시지가 많아도 한 페이지 이상을 가져오지 않음
+    """
     from apps.chat.serializers import MessageSerializer
 
-    key = f"{get_group_name(chatroom_id)}_messages"
-    if redis_conn.exists(key):
-        stored_message_num = redis_conn.llen(key)
-        # 레디스에 저장된 메시지가 30개가 넘으면 가장 마지막에 저장된 메시지부터 30개를 가져옴
-        if stored_message_num >= 30:
-            stored_messages = redis_conn.lrange(key, 0, 29)
-            messages = [json.loads(msg) for msg in stored_messages]
-            return messages
-
-        # 30개가 넘지않으면 레디스에 저장된 메시지들을 가져오고
-        stored_messages = redis_conn.lrange(key, 0, stored_message_num - 1)
-        messages = [json.loads(msg) for msg in stored_messages]
-
-        # 데이터베이스에서 30 - stored_message_num을 뺀 개수만큼 가져옴
-        db_messages = Message.objects.filter(chatroom_id=chatroom_id).order_by("-created_at")
-
-        # db에 저장된 메시지가 없으면 레디스에 캐싱된 메시지만 가져옴
-        if not db_messages.exists():
-            return messages
-
-        # 디비에 저장된 메시지가 30-stored_message_num 보다 많으면 슬라이싱해서 필요한 만큼의 데이터를 가져옴
-        if len(db_messages) >= 30 - stored_message_num:
-            serialized_messages = MessageSerializer(db_messages[: 30 - stored_message_num], many=True).data
-            return messages + list(serialized_messages)
-
-        # 디비에 저장된 메시지가 30-stored_message_num 보다 적으면 db에 저장된 채팅방의 모든 메시지를 가져옴
-        serialized_messages = MessageSerializer(db_messages, many=True).data
-        return messages + list(serialized_messages)
-
-    # 레디스에 해당 채팅방 그룹 네임으로 지정된 키값이 없으면 데이터베이스에서 채팅 메시지를 가져옴
-    db_messages = Message.objects.filter(chatroom_id=chatroom_id)
-    if db_messages:
-        if db_messages.count() >= 30:
-            serialized_messages = MessageSerializer(db_messages[:30], many=True).data
-            return serialized_messages
-
-        serialized_messages = MessageSerializer(db_messages, many=True).data
-        return serialized_messages
+    count = page_size + 1
+    messages: list[dict[str, Any]] = []
+    positions: list[Optional[str]] = []
+    remaining_unread_counts: dict[int, int] = {}
+    flushed_id: Optional[int] = None
+    db_cursor: Optional[tuple[Any, Optional[int]]] = None
+
+    if cursor is not None and cursor["position"] is None:
+        # db 메시지가 커서면 redis 메시지는 이전 페이지에서 모두 내려줌
+        db_cursor = (cursor["created_at"], cursor["id"])
+    else:
+        cached_page = read_cached_message_page(get_group_name(chatroom_id), cursor and cursor["position"], count)
+        if cached_page is None:
+            assert cursor is not None
+            # 커서의 메시지가 그 사이 db에 저장되었으면 db에 저장된 위치부터 이어서 가져옴
+            saved_message = None
+            if cursor["uuid"]:
+                saved_message = Message.objects.filter(uuid=cursor["uuid"]).values("created_at", "id").first()
+            if saved_message:
+                db_cursor = (saved_message["created_at"], saved_message["id"])
+            else:
+                db_cursor = (cursor["created_at"], None)
+        else:
+            cached_messages, cached_positions, unread_counts, flushed_id = cached_page
+            if cursor is not None:
+                # 이전 페이지까지 계산하고 남은 안읽은 메시지 수로 이어서 계산, 그 사이 읽었으면 현재 값을 넘지 않음
+                unread_counts = {
+                    user_id: min(num, unread_counts.get(user_id, 0)) for user_id, num in cursor["unread"].items()
+                }
+            messages = apply_unread_status(cached_messages, unread_counts)
+            positions += cached_positions
+            remaining_unread_counts = {
+                user_id: max(num - sum(1 for msg in messages[:page_size] if msg["sender_id"] != user_id), 0)
+                for user_id, num in unread_counts.items()
+            }
+
+    if len(messages) < count:
+        db_messages = Message.objects.filter(chatroom_id=chatroom_id)
+        if flushed_id is not None:
+            # flush 도중에는 db에 저장되고 아직 redis에서 지워지지 않은 메시지가 있으므로 redis에서 지운 메시지까지만 가져옴
+            db_messages = db_messages.filter(id__lte=flushed_id)
+        if db_cursor:
+            created_at, message_id = db_cursor
+            older = Q(created_at__lt=created_at)
+            if message_id is not None:
+                older |= Q(created_at=created_at, id__lt=message_id)
+            db_messages = db_messages.filter(older)
+        db_messages = db_messages.select_related("sender").order_by("-created_at", "-id")
+        saved_messages = MessageSerializer(db_messages[: count - len(messages)], many=True).data
+        messages += saved_messages
+        positions += [None] * len(saved_messages)
+
+    if len(messages) <= page_size:
+        return messages, None
+    messages = messages[:page_size]
+    last_message = messages[-1]
+    next_cursor = MessageCursor(
+        created_at=last_message["created_at"],
+        id=last_message.get("id"),
+        uuid=str(last_message["uuid"]) if last_message.get("uuid") else None,
+        position=positions[page_size - 1],
+        unread=remaining_unread_counts,
+    )
+    return messages, next_cursor
+
+
+def encode_message_cursor(cursor: MessageCursor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(cursor, default=str).encode()).decode()
+
+
+def decode_message_cursor(encoded: str) -> MessageCursor:
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        created_at = parse_datetime(cursor["created_at"])
+        if created_at is None:
+            raise ValueError("invalid created_at")
+        position = cursor.get("position")
+        return MessageCursor(
+            created_at=created_at,
+            id=int(cursor["id"]) if cursor["id"] is not None else None,
+            uuid=str(cursor["uuid"]) if cursor["uuid"] else None,
+            position=str(position) if position is not None else None,
+            # json으로 바꾸면 hash의 user id가 문자열이 되므로 다시 int로 바꿈
+            unread={int(user_id): int(num) for user_id, num in cursor.get("unread", {}).items()},
+        )
+    except Exception:
+        raise ValueError("유효하지 않은 커서입니다.")
 
+
+def get_chatroom_message(chatroom_id: int) -> Any:
+    # 채팅방에 입장할 때는 가장 최근 메시지 30개만 내려주고, 이전 메시지는 메시지 목록 api로 이어서 가져옴
+    messages, _ = get_chatroom_message_page(chatroom_id, page_size=30)
     # 어디에도 데이터가 존재하지않으면 None을 반환
-    return None
+    return messages or None
 
 
 def read_messages_at_postgres(user_id: int, chatroom_id: int) -> None:
@@ -204,59 +894,20 @@ def read_messages_at_postgres(user_id: int, chatroom_id: int) -> None:
     if messages:
         # bulk_update 메서드를 사용하여 한 번에 여러 개체를 업데이트, 안읽은 메시지들을 읽음처리
         filter_condition = Q(status=True, id__in=messages.values_list("id", flat=True))
-        Message.objects.filter(filter_condition).update(status=False)
+        if Message.objects.filter(filter_condition).update(status=False):
+            from apps.notification.utils import clear_unread_notifications_cache
 
+            clear_unread_notifications_cache(user_id)
 
-def read_messages_at_redis(nickname: str, chatroom_id: int) -> None:
+
+def read_messages_at_redis(user_id: int, chatroom_id: int) -> None:
     """
     redis에 저장된 메시지들 중 읽음상태가 아닌 것들을 읽음처리
-    메시지를 읽음 처리 중에 다른 메시지가 입력되면 메시지의 순서가 보장되지 않기 때문에
-    하나의 트랜잭션으로 키를 지우는것과 다시 입력하는 것을 묶음
+    캐싱된 메시지를 다시 쓰지 않고 유저의 안읽은 메시지 수만 0으로 초기화
     """
-    key = f"{get_group_name(chatroom_id=chatroom_id)}_messages"
-    if redis_conn.exists(key):
-        with redis_conn.pipeline() as pipe:
-            while True:
-                try:
-                    # WATCH를 사용하여 키를 모니터링
-                    pipe.watch(key)
-                    # MULTI 시작
-                    pipe.multi()
-
-                    # 메시지 가져오기
-                    stored_messages = redis_conn.lrange(key, 0, -1)
-                    messages = [json.loads(msg) for msg in stored_messages]
-
-                    # 메시지 업데이트
-                    for msg in messages:
-                        if msg["status"] and msg["nickname"] != nickname:
-                            msg["status"] = False
-
-                    # 기존 키 삭제
-                    pipe.delete(key)
-                    # 업데이트된 메시지 다시 저장
-                    for msg in messages:
-                        pipe.rpush(key, json.dumps(msg))
-
-                    # 트랜잭션 실행
-                    pipe.execute()
-                    break
-                except redis.WatchError as e:
-                    logger.error("예외 발생: %s", e, exc_info=True)
-                    continue
-                except Exception as e:
-                    logger.error("예외 발생: %s", e, exc_info=True)
-                    break
-
-
-def get_unread_message_count_at_redis(chatroom_id: int, nickname: str) -> int:
-    key = f"{get_group_name(chatroom_id=chatroom_id)}_messages"
-    count = 0
-    if redis_conn.exists(key):
-        stored_messages = redis_conn.lrange(key, 0, -1)
-        messages = [json.loads(msg) for msg in stored_messages]
-        for msg in messages:
-            if msg["status"] and msg["nickname"] != nickname:
-                count += 1
-
-    return count
+    redis_conn.hdel(get_unread_key(get_group_name(chatroom_id=chatroom_id)), str(user_id))
+
+
+def get_unread_message_count_at_redis(chatroom_id: int, user_id: int) -> int:
+    count = redis_conn.hget(get_unread_key(get_group_name(chatroom_id=chatroom_id)), str(user_id))
+    return int(count) if count else 0
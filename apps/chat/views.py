@@ -1,13 +1,14 @@
 from django.contrib.auth.models import AnonymousUser
 from django.db import transaction
-from django.db.models import Q
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
-from drf_spectacular.utils import extend_schema, inline_serializer
+from drf_spectacular.utils import OpenApiParameter, extend_schema, inline_serializer
 from rest_framework import serializers as serializer
 from rest_framework import status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
 from apps.chat import serializers
@@ -15,7 +16,14 @@ from apps.chat.models import Chatroom
 from apps.chat.utils import (
     change_entered_status,
     check_entered_chatroom,
+    decode_message_cursor,
     delete_chatroom,
+    encode_message_cursor,
+    get_chatroom_list_queryset,
+    get_chatroom_message_page,
+    get_chatroom_summaries_at_redis,
+    get_last_messages_at_postgres,
+    save_chat_image,
 )
 from apps.product.serializers import RentalHistoryStatusSerializer
 from apps.user.api_schema import UserInfoSerializer
@@ -42,11 +50,29 @@ class ChatRoomView(APIView):
         description="유저가 참여한 채팅방 리스트를 내려주는 get메서드",
     )
     def get(self, request: Request) -> Response:
-        chatroom_list = Chatroom.objects.filter(
-            Q(lender=request.user, lender_status=True) | Q(borrower=request.user, borrower_status=True)
-        )
+        chatroom_list = list(get_chatroom_list_queryset(user=request.user))  # type: ignore
         if chatroom_list:
-            serializer = serializers.ChatroomListSerializer(chatroom_list, context={"user": request.user}, many=True)
+            chatroom_ids = [chatroom.id for chatroom in chatroom_list]
+            redis_summaries = get_chatroom_summaries_at_redis(
+                chatroom_ids=chatroom_ids, user_id=request.user.id  # type: ignore
+            )
+            # redis에 메시지가 없는 채팅방만 db에서 마지막 메시지를 가져옴
+            db_last_messages = get_last_messages_at_postgres(
+                message_ids=[
+                    chatroom.last_message_id  # type: ignore
+                    for chatroom in chatroom_list
+                    if chatroom.id not in redis_summaries and chatroom.last_message_id  # type: ignore
+                ]
+            )
+            serializer = serializers.ChatroomListSerializer(
+                chatroom_list,
+                context={
+                    "user": request.user,
+                    "redis_summaries": redis_summaries,
+                    "db_last_messages": db_last_messages,
+                },
+                many=True,
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response({"msg": "참여 중인 채팅방을 찾을 수 없습니다."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -128,3 +154,85 @@ class ChatDetailView(APIView):
             return Response({"msg": "채팅방 나가기에 성공했습니다."}, status=status.HTTP_200_OK)
         except Chatroom.DoesNotExist:
             return Response({"msg": "해당 채팅방이 존재하지 않습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class ChatImageView(APIView):
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        request=serializers.ChatImageUploadSerializer,
+        responses=inline_serializer(
+            name="ChatImageSerializer",
+            fields={
+                "image": serializer.CharField(),
+                "image_url": serializer.URLField(),
+                "thumbnail": serializer.CharField(),
+                "thumbnail_url": serializer.URLField(),
+            },
+        ),
+        description="""
+        채팅 이미지를 스토리지에 업로드하고 스토리지 키를 내려줌
+        웹소켓으로 이미지 메시지를 보낼 때는 이미지 대신 내려받은 image, thumbnail 키를 보냄
+        """,
+    )
+    def post(self, request: Request, chatroom_id: int) -> Response:
+        try:
+            chatroom = Chatroom.objects.get(id=chatroom_id)
+            if not check_entered_chatroom(chatroom=chatroom, user=request.user):
+                return Response(
+                    {"msg": "이미 나간 채팅방이거나 접근할 수 없는 채팅방입니다."}, status=status.HTTP_400_BAD_REQUEST
+                )
+            serializer = serializers.ChatImageUploadSerializer(data=request.data)
+            if serializer.is_valid():
+                image_data = save_chat_image(chatroom_id=chatroom.id, image=serializer.validated_data["image"])
+                return Response(image_data, status=status.HTTP_201_CREATED)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        except Chatroom.DoesNotExist:
+            return Response({"msg": "해당 채팅방이 존재하지 않습니다."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class ChatMessageListView(APIView):
+    page_size = 30
+    max_page_size = 100
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("cursor", str, description="이전 응답의 next에 담긴 커서 (없으면 가장 최근 메시지부터)"),
+            OpenApiParameter("page_size", int, description=f"한 번에 가져올 메시지 수 (최대 {max_page_size})"),
+        ],
+        responses=inline_serializer(
+            name="ChatMessageListSerializer",
+            fields={
+                "next": serializer.URLField(),
+                "results": serializers.MessageSerializer(many=True),
+            },
+        ),
+        description="""
+        채팅방의 메시지를 최신순으로 내려주고, next 링크로 이전 메시지를 이어서 가져옴
+        redis에 캐싱된 메시지와 db에 저장된 메시지를 이어서 내려줌
+        """,
+    )
+    def get(self, request: Request, chatroom_id: int) -> Response:
+        try:
+            chatroom = Chatroom.objects.get(id=chatroom_id)
+            if not check_entered_chatroom(chatroom=chatroom, user=request.user):
+                return Response(
+                    {"msg": "이미 나간 채팅방이거나 접근할 수 없는 채팅방입니다."}, status=status.HTTP_400_BAD_REQUEST
+                )
+            page_size = self.page_size
+            if request.query_params.get("page_size", "").isdigit():
+                page_size = min(max(int(request.query_params["page_size"]), 1), self.max_page_size)
+            cursor = request.query_params.get("cursor")
+            messages, next_cursor = get_chatroom_message_page(
+                chatroom_id=chatroom.id, cursor=decode_message_cursor(cursor) if cursor else None, page_size=page_size
+            )
+            next_link = None
+            if next_cursor:
+                next_link = replace_query_param(
+                    request.build_absolute_uri(), "cursor", encode_message_cursor(next_cursor)
+                )
+            return Response({"next": next_link, "results": messages}, status=status.HTTP_200_OK)
+        except Chatroom.DoesNotExist:
+            return Response({"msg": "해당 채팅방이 존재하지 않습니다."}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({"msg": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Union
+
+from channels_redis.core import RedisChannelLayer
+
+
+def jump_consistent_hash(key: int, num_buckets: int) -> int:
+    """
+    Jump consistent hash
+    샤드 수가 N -> N+1 로 늘어나도 전체 키 중 약 1/(N+1) 만 새 샤드로 옮겨지고 나머지는 같은 샤드에 남음
+    """
+    bucket, next_bucket = -1, 0
+    while next_bucket < num_buckets:
+        bucket = next_bucket
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        next_bucket = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def get_shard_index(value: Union[str, bytes], shard_num: int) -> int:
+    if shard_num == 1:
+        return 0
+    if isinstance(value, str):
+        value = value.encode("utf8")
+    key = int.from_bytes(hashlib.md5(value).digest()[:8], "big")
+    return jump_consistent_hash(key, shard_num)
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):  # type: ignore
+    """
+    여러 redis 호스트에 그룹과 채널을 나눠서 저장하는 채널 레이어
+    chat_<id>, notification-user_<id> 같은 그룹 이름을 consistent hashing 으로 호스트에 배정해서
+    호스트를 추가해도 대부분의 그룹은 기존 호스트에 남아있도록 함
+    (channels_redis 기본 구현은 crc32 값을 호스트 수로 나눠서 배정하므로 호스트 수가 바뀌면 대부분의 그룹이 옮겨짐)
+
+    연결 풀은 channels_redis 가 호스트마다 따로 관리하므로 django-redis 캐시(채팅 메시지 버퍼)와 연결을 공유하지 않음
+    """
+
+    def consistent_hash(self, value: Any) -> int:
+        return get_shard_index(value, self.ring_size)
@@ -0,0 +1,63 @@
+import logging
+import signal
+import threading
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class PollingCommand(BaseCommand):
+    """
+    redis, db에 쌓인 작업을 주기적으로 처리하는 백그라운드 커맨드의 공통 루프
+    하위 클래스는 default_interval, run_once(처리한 작업 수를 반환), success_message 를 정의
+    예외가 발생해도 종료하지 않고 다음 주기에 다시 시도 (처리하지 못한 작업은 redis, db에 그대로 남아있음)
+    SIGTERM, SIGINT를 받으면 처리중인 주기를 마치고 종료하므로 docker stop 으로 안전하게 재시작할 수 있음
+    """
+
+    default_interval: float = 1
+    once_help = "Run once and exit."
+    # 처리한 작업 수를 {num} 으로 받아서 verbosity 2 이상일 때 출력
+    success_message = "{num}개의 작업을 처리했습니다."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--interval", type=float, default=self.default_interval)
+        parser.add_argument("--once", action="store_true", help=self.once_help)
+
+    def run_once(self, **options: Any) -> int:
+        raise NotImplementedError
+
+    def should_wait(self, processed_num: int, **options: Any) -> bool:
+        # 한 번에 처리하지 못할 만큼 작업이 쌓여있으면 기다리지 않고 바로 다음 주기를 실행하도록 하위 클래스에서 변경
+        return True
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.stop_event = threading.Event()
+        previous_handlers = {
+            signum: signal.signal(signum, lambda *_: self.stop_event.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            self.poll(**options)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def poll(self, **options: Any) -> None:
+        while not self.stop_event.is_set():
+            processed_num = 0
+            try:
+                # 오래 실행되는 프로세스이므로 끊어진 db 연결을 정리하고 시작
+                close_old_connections()
+                processed_num = self.run_once(**options)
+                if processed_num and options["verbosity"] > 1:
+                    self.stdout.write(self.success_message.format(num=processed_num))
+            except Exception as e:
+                logger.error("예외 발생: %s", e, exc_info=True)
+
+            if options["once"]:
+                break
+            if self.should_wait(processed_num, **options):
+                self.stop_event.wait(options["interval"])
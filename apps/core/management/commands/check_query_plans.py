@@ -0,0 +1,282 @@
+import random
+import re
+from datetime import date, timedelta
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, transaction
+from django.db.models import Model
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.category.models import Category, Style
+from apps.chat.models import Chatroom, Message
+from apps.chat.utils import (
+    MessageCursor,
+    get_chatroom_list_queryset,
+    get_chatroom_message_page,
+    read_messages_at_postgres,
+)
+from apps.common.utils import uuid4_generator
+from apps.notification.models import GlobalNotification, RentalNotification
+from apps.notification.utils import (
+    get_unread_chat_notifications,
+    get_unread_global_notifications,
+    get_unread_notification_counts,
+    get_unread_rental_notifications,
+)
+from apps.product.models import Product, RentalHistory
+from apps.product.search import get_product_search_backend
+from apps.product.views import (
+    ProductViewSet,
+    RentalHistoryBorrowerView,
+    RentalHistoryLenderView,
+)
+from apps.user.models import Account
+
+PRODUCT_NAMES = ["셔츠", "바지", "자켓", "코트", "원피스", "니트", "청바지", "스커트"]
+SEQ_SCAN_PATTERN = re.compile(r"Seq Scan on (\S+)")
+
+
+def seed_query_plan_data(scale: int) -> dict[str, Any]:
+    """
+    실행 계획을 확인할 데이터를 만들고 hot query 에 사용할 유저, 채팅방 등을 반환
+    테이블마다 행 수가 어느 정도 있어야 planner 가 운영 환경과 같은 인덱스를 선택하므로 scale 배수로 생성
+    (기존 데이터와 겹치지 않도록 이메일, 닉네임, 카테고리/스타일 이름에 임의의 접미사를 붙임)
+    """
+    rng = random.Random(0)
+    suffix = uuid4_generator(length=6)
+    users = Account.objects.bulk_create(
+        [Account(email=f"plan{i}.{suffix}@example.com", nickname=f"p{suffix}{i}") for i in range(200 * scale)]
+    )
+    categories = Category.objects.bulk_create([Category(name=f"plan{suffix}{i}") for i in range(10)])
+    styles = Style.objects.bulk_create([Style(name=f"plan{suffix}{i}") for i in range(20)])
+
+    products = Product.objects.bulk_create(
+        [
+            Product(
+                name=f"{rng.choice(PRODUCT_NAMES)} {i}",
+                lender=users[i % len(users)],
+                condition="condition",
+                purchase_date=date(2024, 1, 1),
+                purchase_price=rng.randrange(10000, 500000),
+                rental_fee=rng.randrange(1000, 50000),
+                size=rng.choice(["s", "m", "l"]),
+                views=rng.randrange(1000),
+                likes=rng.randrange(100),
+                product_category=categories[i % len(categories)],
+                status=i % 5 != 0,
+            )
+            for i in range(5000 * scale)
+        ],
+        batch_size=1000,
+    )
+    Product.styles.through.objects.bulk_create(
+        [
+            Product.styles.through(product_id=product.pk, style_id=style.pk)
+            for product in products
+            for style in rng.sample(styles, 2)
+        ],
+        batch_size=1000,
+    )
+    # bulk_create 는 post_save signal 을 보내지 않으므로 검색 색인을 직접 채움
+    get_product_search_backend().update_search_vector(product.pk for product in products)
+
+    chatrooms = Chatroom.objects.bulk_create(
+        [
+            Chatroom(borrower=users[i % len(users)], lender=users[(i + 1) % len(users)], product=products[i])
+            for i in range(1000 * scale)
+        ]
+    )
+    Message.objects.bulk_create(
+        [
+            # 채팅방마다 마지막 몇 개의 메시지만 안읽은 상태
+            Message(chatroom=chatroom, sender_id=(chatroom.borrower_id, chatroom.lender_id)[j % 2], status=j >= 17)
+            for chatroom in chatrooms
+            for j in range(20)
+        ],
+        batch_size=1000,
+    )
+
+    now = timezone.now()
+    rental_histories = RentalHistory.objects.bulk_create(
+        [
+            RentalHistory(
+                borrower=users[i % len(users)],
+                product=products[i % len(products)],
+                rental_date=now,
+                return_date=now + timedelta(days=7),
+                status=rng.choice(["REQUEST", "ACCEPT", "BORROWING", "RETURNED"]),
+            )
+            for i in range(20000 * scale)
+        ],
+        batch_size=1000,
+    )
+    RentalNotification.objects.bulk_create(
+        [
+            RentalNotification(
+                recipient_id=rental_history.product.lender_id,
+                rental_history=rental_history,
+                text="text",
+                confirm=i % 4 != 0,
+            )
+            for i, rental_history in enumerate(rental_histories)
+        ],
+        batch_size=1000,
+    )
+    GlobalNotification.objects.bulk_create([GlobalNotification(text="text") for _ in range(100 * scale)])
+
+    # 통계가 없으면 planner 가 행 수를 추정하지 못하므로 시드 데이터를 넣은 테이블의 통계를 갱신
+    models: list[type[Model]] = [Account, Category, Style, Product, Product.styles.through, Chatroom, Message]
+    models += [RentalHistory, RentalNotification, GlobalNotification]
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    return {"user": users[0], "chatroom": chatrooms[0], "category": categories[0], "search_term": PRODUCT_NAMES[0]}
+
+
+def call_view(view: Callable[..., Any], path: str, user: Account, params: Optional[dict[str, Any]] = None) -> Any:
+    # 상세 url 을 만들 때 ALLOWED_HOSTS 검사를 통과하도록 허용된 호스트로 요청
+    host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+    request = APIRequestFactory().get(path, params or {}, HTTP_HOST=host)
+    # 비로그인 요청은 목록 캐시에서 응답할 수 있으므로 로그인한 유저로 요청해서 항상 db를 조회
+    force_authenticate(request, user=user)
+    response = view(request)
+    if response.status_code != 200:
+        raise CommandError(f"{path} 요청이 {response.status_code} 로 실패했습니다: {response.data}")
+    return response
+
+
+def get_hot_queries(seed: dict[str, Any]) -> dict[str, Callable[[], Any]]:
+    """
+    요청마다 실행되는 뷰, 유틸 함수 목록, 실행하면서 보낸 쿼리를 그대로 캡처해서 실행 계획을 확인
+    """
+    user = seed["user"]
+    chatroom = seed["chatroom"]
+    # 이전 메시지 조회에 사용할 커서, 채팅방의 중간쯤 메시지부터 이전 메시지를 가져옴
+    older_message = (
+        Message.objects.filter(chatroom=chatroom).order_by("created_at", "id").values("created_at", "id")[10]
+    )
+    product_list = ProductViewSet.as_view({"get": "list"})
+    product_list_path = reverse("product-list")
+
+    def get_product_list(**params: Any) -> Any:
+        # keyset 페이지네이션(cursor)을 사용하는 목록 조회 경로
+        return call_view(product_list, product_list_path, user, {"cursor": "", **params})
+
+    return {
+        # apps/chat/utils.py
+        "chat: 채팅방 메시지 조회": lambda: get_chatroom_message_page(chatroom.id),
+        "chat: 이전 메시지 조회": lambda: get_chatroom_message_page(
+            chatroom.id,
+            cursor=MessageCursor(
+                created_at=older_message["created_at"], id=older_message["id"], uuid=None, position=None, unread={}
+            ),
+        ),
+        "chat: 참여중인 채팅방 목록": lambda: list(get_chatroom_list_queryset(user)),
+        "chat: 메시지 읽음 처리": lambda: read_messages_at_postgres(user.id, chatroom.id),
+        # apps/notification/utils.py
+        "notification: 안읽은 채팅 알림": lambda: get_unread_chat_notifications(user.id),
+        "notification: 안읽은 알림 수": lambda: get_unread_notification_counts(user.id),
+        "notification: 안읽은 대여 알림": lambda: list(get_unread_rental_notifications(user.id)),
+        "notification: 안읽은 전체 알림": lambda: list(get_unread_global_notifications(user.id)),
+        # apps/product/views.py, apps/product/search.py
+        "product: 상품 목록": lambda: get_product_list(),
+        "product: 상품 목록 필터": lambda: get_product_list(status=True, product_category=seed["category"].id),
+        "product: 상품 목록 정렬(rental_fee)": lambda: get_product_list(ordering="rental_fee"),
+        "product: 상품 목록 정렬(views)": lambda: get_product_list(ordering="-views"),
+        "product: 상품 목록 정렬(likes)": lambda: get_product_list(ordering="-likes"),
+        "product: 상품 검색": lambda: get_product_list(search=seed["search_term"]),
+        "product: 빌린 대여 내역": lambda: call_view(
+            RentalHistoryBorrowerView.as_view(), reverse("borrowed_rental_history"), user
+        ),
+        "product: 빌려준 대여 내역": lambda: call_view(
+            RentalHistoryLenderView.as_view(), reverse("lending_rental_history"), user
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a dataset, run the hot views and utils, and EXPLAIN every query they send. "
+        "Fails if the planner picks a sequential scan on a large table. The seeded data is rolled back."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--scale", type=int, default=1, help="Multiply the number of seeded rows.")
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Only report a seq scan on tables with at least this many rows (small tables are fine to scan).",
+        )
+        parser.add_argument(
+            "--disable-seqscan",
+            action="store_true",
+            help="SET LOCAL enable_seqscan = off, so a seq scan means there is no usable index at all.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("실행 계획 확인은 PostgreSQL 에서만 지원합니다.")
+
+        failed = []
+        with transaction.atomic():
+            seed = seed_query_plan_data(options["scale"])
+            if options["disable_seqscan"]:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for name, run in get_hot_queries(seed).items():
+                try:
+                    # 쿼리가 실패해도 다음 쿼리를 확인할 수 있도록 savepoint 안에서 실행
+                    with transaction.atomic(), CaptureQueriesContext(connection) as context:
+                        run()
+                except Exception as e:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f"[ERROR] {name}: {e}"))
+                    continue
+
+                seq_scan_tables = set()
+                for sql in dict.fromkeys(query["sql"] for query in context.captured_queries):
+                    if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                        continue
+                    plan = self.explain(sql)
+                    tables = self.get_large_tables(SEQ_SCAN_PATTERN.findall(plan), options["min_rows"])
+                    seq_scan_tables |= tables
+                    if options["verbosity"] > 1 or tables:
+                        self.stdout.write(f"{sql}\n{plan}")
+
+                if seq_scan_tables:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f"[SEQ SCAN] {name}: {', '.join(sorted(seq_scan_tables))}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"[OK] {name}"))
+
+            # 시드 데이터는 남기지 않음
+            transaction.set_rollback(True)
+
+        if failed:
+            raise CommandError(
+                f"{len(failed)}개의 쿼리가 sequential scan 을 사용하거나 실패했습니다: {', '.join(failed)}"
+            )
+
+    def explain(self, sql: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def get_large_tables(self, tables: list[str], min_rows: int) -> set[str]:
+        # ANALYZE 로 갱신한 추정 행 수가 min_rows 이상인 테이블만 남김
+        if not tables:
+            return set()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND reltuples >= %s",
+                [list(set(tables)), min_rows],
+            )
+            return {row[0] for row in cursor.fetchall()}
@@ -0,0 +1,27 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import CommandParser
+
+from apps.core.management.base import PollingCommand
+from apps.notification.utils import dispatch_rental_notifications
+
+
+class Command(PollingCommand):
+    help = "Create and send the rental notifications queued in the notification outbox."
+    default_interval = settings.NOTIFICATION_DISPATCH_INTERVAL
+    once_help = "Dispatch the queued notifications once and exit."
+    success_message = "{num}개의 대여 알림을 전송했습니다."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=settings.NOTIFICATION_DISPATCH_BATCH_SIZE)
+
+    def run_once(self, **options: Any) -> int:
+        # 전송에 실패한 이벤트는 저장된 알림과 함께 outbox에 남아있으므로 lease가 지나면 다시 전송을 시도
+        return dispatch_rental_notifications(batch_size=options["batch_size"])
+
+    def should_wait(self, processed_num: int, **options: Any) -> bool:
+        # 한 번에 처리하지 못할 만큼 이벤트가 쌓여있으면 기다리지 않고 다음 배치를 처리
+        batch_size: int = options["batch_size"]
+        return processed_num < batch_size
@@ -0,0 +1,24 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import CommandParser
+
+from apps.chat.utils import flush_chat_rooms, get_flush_due_rooms
+from apps.core.management.base import PollingCommand
+
+
+class Command(PollingCommand):
+    help = "Drain chat messages buffered in Redis into the database (write-behind flusher)."
+    default_interval = settings.CHAT_FLUSH_INTERVAL
+    once_help = "Flush the due chatrooms once and exit."
+    success_message = "{num}개의 메시지를 저장했습니다."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument("--max-messages", type=int, default=settings.CHAT_FLUSH_MAX_MESSAGES)
+        parser.add_argument("--max-age", type=float, default=settings.CHAT_FLUSH_MAX_AGE)
+
+    def run_once(self, **options: Any) -> int:
+        # 저장하지 못한 메시지는 redis에 그대로 남아있으므로 다음 주기에 다시 저장
+        due_rooms = get_flush_due_rooms(max_messages=options["max_messages"], max_age=options["max_age"])
+        return flush_chat_rooms(due_rooms)
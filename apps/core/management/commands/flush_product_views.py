@@ -0,0 +1,17 @@
+from typing import Any
+
+from django.conf import settings
+
+from apps.core.management.base import PollingCommand
+from apps.product.utils import flush_product_views
+
+
+class Command(PollingCommand):
+    help = "Add product view counts buffered in Redis to Product.views with one batched UPDATE."
+    default_interval = settings.PRODUCT_VIEWS_FLUSH_INTERVAL
+    once_help = "Flush the buffered view counts once and exit."
+    success_message = "{num}개 상품의 조회수를 반영했습니다."
+
+    def run_once(self, **options: Any) -> int:
+        # 반영하지 못한 조회수는 redis에 남아있으므로 다음 주기에 다시 반영을 시도
+        return flush_product_views()
@@ -0,0 +1,42 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import CommandParser
+
+from apps.core.management.base import PollingCommand
+from apps.like.utils import reconcile_product_likes
+from apps.product.models import Product
+
+
+class Command(PollingCommand):
+    help = "Recompute Product.likes from Like rows for products liked or unliked since the last run."
+    default_interval = settings.PRODUCT_LIKES_RECONCILE_INTERVAL
+    once_help = "Reconcile the changed products once and exit."
+    success_message = "{num}개 상품의 좋아요 수를 다시 계산했습니다."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--all", action="store_true", help="Recompute the like count of every product in chunks and exit."
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not options["all"]:
+            super().handle(*args, **options)
+            return
+
+        # redis에 기록이 남지 않은 변경(커밋 후 redis 예외 등)까지 바로잡기 위해 전체 상품을 다시 계산
+        product_ids = Product.objects.order_by("pk").values_list("pk", flat=True)
+        chunk: list[Any] = []
+        for product_id in product_ids.iterator(chunk_size=options["chunk_size"]):
+            chunk.append(product_id)
+            if len(chunk) == options["chunk_size"]:
+                reconcile_product_likes(chunk)
+                chunk = []
+        if chunk:
+            reconcile_product_likes(chunk)
+
+    def run_once(self, **options: Any) -> int:
+        # 다시 계산하지 못한 상품은 redis에 남아있으므로 다음 주기에 다시 시도
+        return reconcile_product_likes()
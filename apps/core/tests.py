@@ -0,0 +1,58 @@
+from typing import Any
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from apps.core.channel_layers import ShardedRedisChannelLayer, get_shard_index
+from apps.core.management.base import PollingCommand
+
+
+class ShardedChannelLayerTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.group_names = [f"chat_{i}" for i in range(1000)] + [f"notification-user_{i}" for i in range(1000)]
+
+    def test_그룹을_호스트에_고르게_나누고_항상_같은_호스트에_배정(self) -> None:
+        layer = ShardedRedisChannelLayer(hosts=[f"redis://127.0.0.1:{port}" for port in (6379, 6380, 6381)])
+        shards = [layer.consistent_hash(group_name) for group_name in self.group_names]
+        self.assertEqual(shards, [layer.consistent_hash(group_name) for group_name in self.group_names])
+        for index in range(3):
+            self.assertGreater(shards.count(index), len(self.group_names) // 4)
+
+    def test_호스트를_추가하면_일부_그룹만_새_호스트로_옮겨짐(self) -> None:
+        moved = [
+            group_name
+            for group_name in self.group_names
+            if get_shard_index(group_name, 3) != get_shard_index(group_name, 4)
+        ]
+        # 옮겨진 그룹은 모두 새 호스트로 가고, 전체의 약 1/4 만 옮겨짐
+        self.assertTrue(all(get_shard_index(group_name, 4) == 3 for group_name in moved))
+        self.assertLess(len(moved), len(self.group_names) * 0.35)
+
+
+class FlakyCommand(PollingCommand):
+    # 첫 주기는 예외가 발생하고, 세 번째 주기를 마치면 종료 신호를 받은 것처럼 멈춤
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.runs = 0
+
+    def run_once(self, **options: Any) -> int:
+        self.runs += 1
+        if self.runs == 1:
+            raise ConnectionError("redis down")
+        if self.runs == 3:
+            self.stop_event.set()
+        return 1
+
+
+class PollingCommandTestCase(SimpleTestCase):
+    def test_예외가_발생해도_종료하지_않고_종료_신호를_받으면_멈춤(self) -> None:
+        command = FlakyCommand()
+        with self.assertLogs("apps.core.management.base", level="ERROR"):
+            call_command(command, "--interval", "0")
+        self.assertEqual(command.runs, 3)
+
+    def test_once_옵션은_한_번만_실행(self) -> None:
+        command = FlakyCommand()
+        with self.assertLogs("apps.core.management.base", level="ERROR"):
+            call_command(command, "--once")
+        self.assertEqual(command.runs, 1)
@@ -1,9 +1,19 @@
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from apps.category.models import Category
 from apps.like.models import Like
+from apps.like.utils import (
+    PRODUCT_LIKES_KEY,
+    PRODUCT_LIKES_RECONCILING_KEY,
+    reconcile_product_likes,
+    redis_conn,
+)
 from apps.product.models import Product
 from apps.user.models import Account
 
@@ -122,5 +132,70 @@ class TestLikeDestroyView(APITestCase):
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
 
+@override_settings(LIKE_COUNTER_MODE="buffered")
+class TestBufferedLikeCounter(APITestCase):
+    def setUp(self) -> None:
+        self.user = Account.objects.create_user(email="user@email.com", password="fels3570", nickname="nick")
+        self.other_user = Account.objects.create_user(email="other@email.com", password="fels3570", nickname="other")
+        self.category = Category.objects.create(name="test category")
+        self.product = Product.objects.create(
+            name="test product",
+            lender=self.user,
+            condition="good",
+            purchase_date="2024-01-01",
+            purchase_price=10000,
+            rental_fee=1000,
+            size="xs",
+            product_category=self.category,
+        )
+        redis_conn.delete(PRODUCT_LIKES_KEY, PRODUCT_LIKES_RECONCILING_KEY)
+        self.addCleanup(redis_conn.delete, PRODUCT_LIKES_KEY, PRODUCT_LIKES_RECONCILING_KEY)
+
+    def test_like_and_unlike_are_reconciled_from_like_rows(self) -> None:
+        for user in (self.user, self.other_user):
+            self.client.force_authenticate(user=user)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(reverse("likes"), {"product_id": self.product.uuid}, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(reverse("like_delete", kwargs={"pk": self.product.pk}))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        # 요청 중에는 Product 행을 변경하지 않고 redis에 증감만 기록
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes, 0)
+        self.assertEqual(int(redis_conn.hget(PRODUCT_LIKES_KEY, str(self.product.pk))), 1)
+
+        self.assertEqual(reconcile_product_likes(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes, 1)
+        self.assertFalse(redis_conn.exists(PRODUCT_LIKES_KEY, PRODUCT_LIKES_RECONCILING_KEY))
+        self.assertEqual(reconcile_product_likes(), 0)
+
+    def test_product_cache_is_invalidated_only_when_reconciled_likes_change(self) -> None:
+        self.client.force_authenticate(user=self.user)
+        with patch("apps.like.utils.invalidate_product_cache") as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("likes"), {"product_id": self.product.uuid}, format="json")
+            # 요청 중에는 Product.likes 가 바뀌지 않으므로 목록 캐시를 지우지 않음
+            invalidate.assert_not_called()
+
+            self.assertEqual(reconcile_product_likes(), 1)
+            invalidate.assert_called_once_with(self.product.pk)
+
+            # 다시 세어도 좋아요 수가 같으면 캐시를 지우지 않음
+            invalidate.reset_mock()
+            self.assertEqual(reconcile_product_likes([self.product.pk]), 0)
+            invalidate.assert_not_called()
+
+    def test_reconcile_all_products(self) -> None:
+        # redis에 기록되지 않은 좋아요도 --all 로 다시 계산
+        Like.objects.create(user=self.user, product=self.product)
+        Like.objects.create(user=self.other_user, product=self.product)
+        call_command("reconcile_product_likes", "--all", "--chunk-size", "1")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.likes, 2)
+
+
 class TestPermission(APITestCase):
     pass
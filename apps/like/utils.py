@@ -0,0 +1,81 @@
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from apps.like.models import Like
+from apps.product.models import Product
+from apps.product.utils import bump_product_counter_version, invalidate_product_cache
+
+redis_conn = get_redis_connection("default")
+
+# buffered 모드에서 좋아요 수가 바뀐 상품별 증감을 저장하는 hash, reconcile 할 때는 RECONCILING 키로 옮겨서 처리
+PRODUCT_LIKES_KEY = "product_likes"
+PRODUCT_LIKES_RECONCILING_KEY = f"{PRODUCT_LIKES_KEY}:reconciling"
+
+
+def use_buffered_like_counter() -> bool:
+    return bool(settings.LIKE_COUNTER_MODE == "buffered")
+
+
+def change_product_likes(product_id: Any, delta: int) -> None:
+    """
+    좋아요/좋아요 취소 시 상품의 좋아요 수를 변경
+    direct 모드는 요청 트랜잭션 안에서 Product 행을 바로 UPDATE 하고,
+    buffered 모드는 커밋 후 redis의 증감만 기록해서 인기 상품의 행 잠금을 기다리지 않도록 함
+    (Product.likes 는 reconcile_product_likes 커맨드가 Like 테이블에서 다시 계산)
+    상품 목록 캐시는 Product.likes 가 바뀔 때만 지우므로 buffered 모드에서는 reconcile 할 때 지움
+    """
+    if use_buffered_like_counter():
+        transaction.on_commit(lambda: redis_conn.hincrby(PRODUCT_LIKES_KEY, str(product_id), delta))
+    else:
+        Product.objects.filter(pk=product_id).update(likes=F("likes") + delta)
+        transaction.on_commit(lambda: invalidate_product_cache(product_id))
+        transaction.on_commit(bump_product_counter_version)
+
+
+def reconcile_product_likes(product_ids: Optional[list[Any]] = None) -> int:
+    """
+    좋아요 수가 바뀐 상품(product_ids를 넘기면 해당 상품)의 Product.likes 를 Like 행 수로 한 번의 UPDATE 로 다시 계산
+    증감값을 더하지 않고 다시 세므로 같은 상품을 여러 번 reconcile 해도 결과가 같고,
+    db 반영에 실패하면 RECONCILING 키가 남아서 다음 주기에 다시 계산함
+    좋아요 수가 실제로 바뀐 상품만 UPDATE 하고 목록 캐시를 지우며, 그 상품 수를 반환
+    """
+    from_redis = product_ids is None
+    if from_redis:
+        if not redis_conn.exists(PRODUCT_LIKES_RECONCILING_KEY):
+            try:
+                redis_conn.rename(PRODUCT_LIKES_KEY, PRODUCT_LIKES_RECONCILING_KEY)
+            except ResponseError:
+                # 좋아요 수가 바뀐 상품이 없음
+                return 0
+        product_ids = [product_id.decode() for product_id in redis_conn.hkeys(PRODUCT_LIKES_RECONCILING_KEY)]
+
+    like_count = (
+        Like.objects.filter(product_id=OuterRef("pk"))
+        .order_by()
+        .values("product_id")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    # 좋아요를 눌렀다가 취소한 상품처럼 다시 세어도 같은 상품은 UPDATE, 캐시 삭제를 하지 않음
+    changed_product_ids = list(
+        Product.objects.filter(pk__in=product_ids)
+        .alias(like_count=Coalesce(Subquery(like_count), 0))
+        .exclude(likes=F("like_count"))
+        .values_list("pk", flat=True)
+    )
+    updated_product_num = Product.objects.filter(pk__in=changed_product_ids).update(
+        likes=Coalesce(Subquery(like_count), 0)
+    )
+    if from_redis:
+        redis_conn.delete(PRODUCT_LIKES_RECONCILING_KEY)
+    for product_id in changed_product_ids:
+        invalidate_product_cache(product_id)
+    if updated_product_num:
+        bump_product_counter_version()
+    return updated_product_num
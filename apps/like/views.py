@@ -1,5 +1,5 @@
 from django.db import IntegrityError, transaction
-from django.db.models import F, QuerySet
+from django.db.models import QuerySet
 from rest_framework import generics, permissions
 from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.serializers import BaseSerializer
@@ -7,7 +7,7 @@ from rest_framework.serializers import BaseSerializer
 from apps.like.models import Like
 from apps.like.permissions import IsUserOrReadOnly
 from apps.like.serializers import LikeSerializer
-from apps.product.models import Product
+from apps.like.utils import change_product_likes
 from apps.user.models import Account
 
 
@@ -30,7 +30,7 @@ class LikeListCreateView(generics.ListCreateAPIView[Like]):
         try:
             with transaction.atomic():
                 serializer.save(user=self.request.user, product_id=product_id)
-                Product.objects.filter(pk=product_id).update(likes=F("likes") + 1)
+                change_product_likes(product_id, 1)
         except IntegrityError:
             raise ValidationError("Already liked this product.")
 
@@ -52,4 +52,4 @@ class LikeDestroyView(generics.DestroyAPIView[Like]):
         product_id = self.kwargs.get("pk")
         if instance:
             instance.delete()
-            Product.objects.filter(pk=product_id).update(likes=F("likes") - 1)
+            change_product_likes(product_id, -1)
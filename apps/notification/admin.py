@@ -9,10 +9,10 @@ from django.http import HttpRequest
 from apps.notification import serializers
 from apps.notification.models import (
     GlobalNotification,
-    GlobalNotificationConfirm,
+    GlobalNotificationWatermark,
     RentalNotification,
 )
-from apps.user.models import Account
+from apps.notification.utils import GLOBAL_NOTIFICATION_GROUP_NAME
 
 
 @admin.register(GlobalNotification)
@@ -21,15 +21,6 @@ class GlobalNotificationAdmin(admin.ModelAdmin[GlobalNotification]):
     list_display = ("id", "text", "image_url", "updated_at", "created_at")
     search_fields = ("text",)
 
-    class GlobalNotificationConfirmInline(admin.StackedInline[GlobalNotificationConfirm, GlobalNotification]):
-        model = GlobalNotificationConfirm
-        extra = 10
-        can_delete = True
-        show_change_link = True
-        classes = ("collapse",)
-
-    inlines = [GlobalNotificationConfirmInline]
-
     actions = ["send_notification_to_all_users"]
 
     def image_url(self, obj: GlobalNotification) -> Optional[str]:
@@ -38,45 +29,30 @@ class GlobalNotificationAdmin(admin.ModelAdmin[GlobalNotification]):
         return None
 
     def send_notification_to_all_users(self, request: HttpRequest, queryset: QuerySet[GlobalNotification]) -> None:
-        notifications = list(queryset)
-        users = Account.objects.all()
-        confirm_objects = []
-        for notification in notifications:
-            confirm_objects.extend([GlobalNotificationConfirm(user=user, notification=notification) for user in users])
-
-        GlobalNotificationConfirm.objects.bulk_create(confirm_objects)
-
+        """
+        유저별 확인 row를 만들지 않고 전체 알림 그룹으로 전송만 함
+        읽음 여부는 유저별 watermark로 판단하므로 유저 수와 상관없이 db 쓰기가 없고,
+        선택한 알림도 iterator로 나눠서 가져와서 메모리 사용량이 일정함
+        """
         channel_layer = get_channel_layer()
-        group_name = "notification-global"
+        group_name = GLOBAL_NOTIFICATION_GROUP_NAME
 
-        for notification in notifications:
+        for notification in queryset.order_by("id").iterator(chunk_size=100):
             data = serializers.GlobalNotificationSerializer(notification).data
-            data["type"] = "notification_global"
             async_to_sync(channel_layer.group_send)(group_name, data)
 
     send_notification_to_all_users.short_description = "모든 유저에게 선택한 알림 전송하기"  # type: ignore
 
 
-@admin.register(GlobalNotificationConfirm)
-class GlobalNotificationConfirmAdmin(admin.ModelAdmin[GlobalNotificationConfirm]):
+@admin.register(GlobalNotificationWatermark)
+class GlobalNotificationWatermarkAdmin(admin.ModelAdmin[GlobalNotificationWatermark]):
     fieldsets = (
-        ("Notification", {"fields": ("notification",)}),
         ("User", {"fields": ("user",)}),
-        ("ConfirmState", {"fields": ("confirm",)}),
+        ("Watermark", {"fields": ("last_read_id",)}),
     )
-    list_display = ("id", "notification", "user", "confirm")
-    search_fields = ("notification", "user")
-    list_filter = ("notification", "user")
-    actions = ["confirm_notification"]
-
-    def confirm_notification(self, request: HttpRequest, queryset: QuerySet[GlobalNotificationConfirm]) -> None:
-        if queryset.exists():
-            confirm_objects = list(queryset)
-            for obj in confirm_objects:
-                obj.confirm = True
-            GlobalNotificationConfirm.objects.bulk_update(confirm_objects, ("confirm",))
-
-    confirm_notification.short_description = "선택한 객체의 알림 확인상태로 변경"  # type: ignore
+    list_display = ("id", "user", "last_read_id", "updated_at")
+    search_fields = ("user__nickname",)
+    raw_id_fields = ("user",)
 
 
 @admin.register(RentalNotification)
@@ -5,11 +5,12 @@ from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
 from apps.notification.utils import (
+    GLOBAL_NOTIFICATION_GROUP_NAME,
     confirm_notification,
-    create_global_notification_confirm,
-    get_chat_notification_group_name,
-    get_entered_chatroom_ids,
+    get_confirm_notification_ids,
+    get_unread_notification_counts,
     get_unread_notifications,
+    get_user_notification_group_name,
 )
 
 logger = logging.getLogger(__name__)
@@ -22,11 +23,9 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
         try:
             self.user = self.scope["user"]
 
-            # 모든 유저에게 알림을 전달하는 그룹 추가
-            global_group_name = "notification-global"
-            self.groups.append(global_group_name)
-            # 각 채팅방에 대한 알림을 전달하는 그룹 추가
-            await self.group_add_by_chatroom_ids(user_id=self.user.id)
+            # 모든 유저에게 알림을 전달하는 그룹과 유저에게 오는 채팅, 대여 알림을 전달하는 유저별 그룹만 추가
+            # 참여한 채팅방 수와 상관없이 그룹은 2개이고, 소켓 연결 해제시 self.groups의 그룹은 모두 group_discard 됨
+            self.groups = [GLOBAL_NOTIFICATION_GROUP_NAME, get_user_notification_group_name(user_id=self.user.id)]
             # 채널레이어에 각 알림 그룹들을 group_add 로 추가
             for group in self.groups:
                 await self.channel_layer.group_add(group, self.channel_name)
@@ -43,69 +42,60 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):  # type: ignore
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(code=1011, reason=str(e))
 
-    async def disconnect(self, close_code: int) -> None:
-        # 모든 그룹 연결 해제
-        for group in self.groups:
-            await self.channel_layer.group_discard(group, self.channel_name)
-
     async def receive_json(self, content: dict[str, Any], **kwargs: Any) -> None:
         if content["command"]:
             await self.commands[content["command"]](self, data=content)
 
     async def global_notification_confirm(self, data: dict[str, Any]) -> None:
         try:
-            await database_sync_to_async(confirm_notification)(
-                command=data.get("command"), user_id=self.user.id, notification_id=data["notification_id"]
-            )
+            await self.confirm_notifications(data)
         except Exception as e:
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(1011, reason="기타 알림 읽음 처리시 예외 발생")
 
     async def rental_notification_confirm(self, data: dict[str, Any]) -> None:
         try:
-            await database_sync_to_async(confirm_notification)(
-                command=data.get("command"), user_id=self.user.id, notification_id=data["notification_id"]
-            )
+            await self.confirm_notifications(data)
         except Exception as e:
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(1011, reason="대여 알림 읽음 처리시 예외 발생")
 
+    async def confirm_notifications(self, data: dict[str, Any]) -> None:
+        """
+        notification_id 하나, notification_ids 목록 또는 up_to_id(이 id 이하 모두)로 확인한 알림을 한 번에 읽음 처리하고
+        읽음 처리 후의 안읽은 알림 수를 한 번에 보내줌
+        대여 알림은 보낸 id의 알림만 읽음 처리하지만, 전체 알림은 watermark 방식이므로 notification_id, notification_ids로 보내도
+        그 중 가장 큰 id 이하의 전체 알림이 모두 읽음 처리됨 (특정 전체 알림 하나만 읽음 처리할 수 없음)
+        """
+        notification_ids, up_to_id = get_confirm_notification_ids(data)
+        await database_sync_to_async(confirm_notification)(
+            command=data["command"], user_id=self.user.id, notification_ids=notification_ids, up_to_id=up_to_id
+        )
+        unread_counts = await database_sync_to_async(get_unread_notification_counts)(user_id=self.user.id)
+        await self.send_json(unread_counts)
+
     async def chat_notification(self, event: dict[str, Any]) -> None:
         try:
-            if event["nickname"] != self.user.nickname:
-                await self.send_json(event)
+            await self.send_json(event)
         except Exception as e:
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(1011, reason="클라이언트로 알림 전송 중 예외 발생")
 
     async def rental_notification(self, event: dict[str, Any]) -> None:
         try:
-            if event["recipient"] == self.user.id:
-                await self.send_json(event)
+            await self.send_json(event)
         except Exception as e:
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(1011, reason="클라이언트로 알림 전송 중 예외 발생")
 
     async def global_notification(self, event: dict[str, Any]) -> None:
         try:
-            # 알림을 보내기전에 각 유저마다 알림을 읽었는지 확인할 수 있는 fk 모델 생성
-            await database_sync_to_async(create_global_notification_confirm)(
-                user_id=self.user.id, notification_id=event["id"]
-            )
-            # 알림을 클라이언트로 전송
+            # 읽음 여부는 유저별 watermark로 판단하므로 전송시에는 db에 쓰지 않고 클라이언트로 전송만 함
             await self.send_json(event)
         except Exception as e:
             logger.error("예외 발생: %s", e, exc_info=True)
             await self.close(1011, reason="클라이언트로 알림 전송 중 예외 발생")
 
-    @database_sync_to_async  # type: ignore
-    def group_add_by_chatroom_ids(self, user_id: int) -> None:
-        entered_chatroom_ids = get_entered_chatroom_ids(user_id=user_id)
-        if entered_chatroom_ids is not None:
-            for chatroom_id in entered_chatroom_ids:
-                chat_notification_group = get_chat_notification_group_name(chatroom_id=chatroom_id)
-                self.groups.append(chat_notification_group)
-
     commands = {
         "rental_notification_confirm": rental_notification_confirm,
         "global_notification_confirm": global_notification_confirm,
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0001_initial"),
+        ("product", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="globalnotificationconfirm",
+            index=models.Index(condition=models.Q(("confirm", False)), fields=["user"], name="global_noti_unread_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="rentalnotification",
+            index=models.Index(
+                condition=models.Q(("confirm", False)), fields=["recipient"], name="rental_noti_unread_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from itertools import islice
+from typing import Any
+
+from django.db import migrations
+from django.db.models import Max, Min
+
+BATCH_SIZE = 1000
+
+
+def confirms_to_watermarks(apps: Any, schema_editor: Any) -> None:
+    """
+    GlobalNotificationConfirm을 지우기 전에 유저별 확인 상태를 watermark로 옮김
+    확인하지 않은 전체 알림이 있는 유저는 그 중 가장 작은 id 바로 앞까지만 읽음 처리해서 안읽은 알림이 사라지지 않도록 하고,
+    확인하지 않은 알림이 없는 유저는 지금까지의 전체 알림을 모두 읽음 처리 (이전에는 확인 row가 없는 알림은 안읽은 알림이 아니었음)
+    """
+    Account = apps.get_model("user", "Account")
+    GlobalNotification = apps.get_model("notification", "GlobalNotification")
+    GlobalNotificationConfirm = apps.get_model("notification", "GlobalNotificationConfirm")
+    GlobalNotificationWatermark = apps.get_model("notification", "GlobalNotificationWatermark")
+
+    latest_notification_id = GlobalNotification.objects.aggregate(latest_id=Max("id"))["latest_id"]
+    if latest_notification_id is None:
+        return
+    first_unread_ids = dict(
+        GlobalNotificationConfirm.objects.filter(confirm=False)
+        .values("user_id")
+        .annotate(first_unread_id=Min("notification_id"))
+        .values_list("user_id", "first_unread_id")
+    )
+    watermarks = (
+        GlobalNotificationWatermark(
+            user_id=user_id, last_read_id=first_unread_ids.get(user_id, latest_notification_id + 1) - 1
+        )
+        for user_id in Account.objects.exclude(globalnotificationwatermark__isnull=False)
+        .values_list("id", flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    while batch := list(islice(watermarks, BATCH_SIZE)):
+        GlobalNotificationWatermark.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0003_globalnotificationwatermark"),
+    ]
+
+    operations = [
+        # 되돌릴 때는 watermark로 확인 row를 다시 만들 수 없으므로 아무것도 하지 않음
+        migrations.RunPython(confirms_to_watermarks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0004_globalnotificationconfirm_to_watermark"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="GlobalNotificationConfirm",
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-18 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0005_delete_globalnotificationconfirm"),
+        ("product", "__first__"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RentalNotificationOutbox",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("REQUEST", "request"),
+                            ("ACCEPT", "accept"),
+                            ("RETURNED", "returned"),
+                            ("BORROWING", "borrowing"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "rental_history",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="product.rentalhistory"),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
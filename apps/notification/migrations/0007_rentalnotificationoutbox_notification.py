@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0006_rentalnotificationoutbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rentalnotificationoutbox",
+            name="notification",
+            field=models.OneToOneField(
+                blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="notification.rentalnotification"
+            ),
+        ),
+    ]
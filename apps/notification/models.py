@@ -21,10 +21,17 @@ class GlobalNotification(BaseModel):
         return f"{self.text[:30]}..."
 
 
-class GlobalNotificationConfirm(BaseModel):
-    user = models.ForeignKey(Account, on_delete=models.CASCADE)
-    notification = models.ForeignKey(GlobalNotification, on_delete=models.CASCADE)
-    confirm = models.BooleanField(default=False)
+class GlobalNotificationWatermark(BaseModel):
+    """
+    유저가 마지막으로 확인한 전체 알림 id
+    전체 알림마다 유저별 확인 row를 만들지 않고, 이 id 보다 큰 전체 알림을 안읽은 알림으로 판단
+    """
+
+    user = models.OneToOneField(Account, on_delete=models.CASCADE)
+    last_read_id = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.user} - {self.last_read_id}"
 
 
 class RentalNotification(BaseModel):
@@ -33,6 +40,11 @@ class RentalNotification(BaseModel):
     text = models.TextField()
     confirm = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["recipient"], condition=models.Q(confirm=False), name="rental_noti_unread_idx"),
+        ]
+
     def __str__(self) -> str:
         if self.rental_history:
             if self.rental_history.status == "REQUEST":
@@ -44,3 +56,15 @@ class RentalNotification(BaseModel):
             elif self.rental_history.status == "BORROWING":
                 return f"{self.rental_history.product.name}에 대한 {self.rental_history.borrower.nickname}님의 대여 진행중 알림"
         return f"{self.text[:30]}..."
+
+
+class RentalNotificationOutbox(BaseModel):
+    """
+    대여 내역이 저장될 때 같은 트랜잭션에서 함께 저장되는 알림 이벤트
+    요청 중에는 이벤트만 저장하고, 알림 생성과 전송은 dispatch_notifications 커맨드가 모아서 처리
+    """
+
+    rental_history = models.ForeignKey(RentalHistory, on_delete=models.CASCADE)
+    status = models.CharField(choices=RentalHistory.STATUS_CHOICE, max_length=10)  # 이벤트 발생 시점의 대여 상태
+    # 전송 전에 저장한 알림, 전송에 실패해서 다시 보낼 때 알림을 중복 저장하지 않도록 함
+    notification = models.OneToOneField(RentalNotification, on_delete=models.CASCADE, null=True, blank=True)
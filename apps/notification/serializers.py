@@ -2,11 +2,8 @@ from typing import Any, Optional
 
 from rest_framework import serializers
 
-from apps.notification.models import (
-    GlobalNotification,
-    GlobalNotificationConfirm,
-    RentalNotification,
-)
+from apps.notification.models import GlobalNotification, RentalNotification
+from apps.product.models import ProductImage
 
 
 class GlobalNotificationSerializer(serializers.ModelSerializer[GlobalNotification]):
@@ -20,26 +17,6 @@ class GlobalNotificationSerializer(serializers.ModelSerializer[GlobalNotificatio
         return data
 
 
-class GlobalNotificationConfirmSerializer(serializers.ModelSerializer[GlobalNotificationConfirm]):
-    text = serializers.CharField(source="notification.text", read_only=True)
-    image = serializers.SerializerMethodField()
-    recipient = serializers.CharField(source="notification.user", read_only=True)
-
-    class Meta:
-        model = GlobalNotificationConfirm
-        exclude = ["updated_at", "notification", "user"]
-
-    def get_image(self, obj: GlobalNotificationConfirm) -> Optional[str]:
-        if obj.notification.image:
-            return str(obj.notification.image.url)
-        return None
-
-    def to_representation(self, instance: GlobalNotificationConfirm) -> dict[str, Any]:
-        data = super().to_representation(instance)
-        data["type"] = "global_notification"
-        return data
-
-
 class RentalNotificationSerializer(serializers.ModelSerializer[RentalNotification]):
     product_name = serializers.CharField(source="rental_history.product.name")  # 상품 이름
     image = serializers.SerializerMethodField()  # 상품 이미지
@@ -66,10 +43,19 @@ class RentalNotificationSerializer(serializers.ModelSerializer[RentalNotificatio
         ]
 
     def get_image(self, obj: RentalNotification) -> Any:
-        product_images: RentalNotification = obj.rental_history.product.images.first()  # type: ignore
+        if obj.rental_history is None:
+            return None
+        product = obj.rental_history.product
+        # 목록 조회시 prefetch 한 이미지가 있으면 추가 쿼리 없이 사용
+        prefetched_images = getattr(product, "prefetched_images", None)
+        product_images: Optional[ProductImage]
+        if prefetched_images is not None:
+            product_images = prefetched_images[0] if prefetched_images else None
+        else:
+            product_images = product.images.first()
         if product_images:
             # 이미지의 URL을 리턴
-            return product_images.image.url  # type: ignore
+            return product_images.image.url
         return None  # 이미지가 없을 경우 None을 리턴
 
     def to_representation(self, instance: RentalNotification) -> dict[str, Any]:
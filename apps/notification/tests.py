@@ -1,35 +1,44 @@
-import base64
 import json
 from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
 
 from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from channels.routing import URLRouter
 from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TransactionTestCase
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase, override_settings
 from django.urls import path
 from django_redis import get_redis_connection
 
 from apps.category.models import Category
 from apps.chat.consumers import ChatConsumer
-from apps.chat.models import Chatroom
-from apps.chat.utils import get_group_name
+from apps.chat.models import Chatroom, Message
+from apps.chat.utils import get_group_name, save_chat_image
 from apps.notification.consumers import NotificationConsumer
 from apps.notification.models import (
     GlobalNotification,
-    GlobalNotificationConfirm,
+    GlobalNotificationWatermark,
     RentalNotification,
+    RentalNotificationOutbox,
+)
+from apps.notification.utils import (
+    clear_unread_notifications_cache,
+    confirm_global_notification,
+    confirm_notification,
+    dispatch_rental_notifications,
+    get_unread_global_notifications,
+    get_unread_notifications,
+    get_unread_notifications_cache_key,
+    get_user_notification_group_name,
 )
 from apps.product.models import Product, ProductImage, RentalHistory
 from apps.user.models import Account
 
 
-def encode_image_to_base64(image_path: str) -> str:
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-    return "data:image/jpeg;base64," + encoded_string
-
-
 class BaseTestCase(TransactionTestCase):
     def setUp(self) -> None:
         # 요청을 보낼 유저 생성
@@ -54,7 +63,6 @@ class BaseTestCase(TransactionTestCase):
         self.image = SimpleUploadedFile(
             name="test.jpg", content=open("static/test/test.jpeg", "rb").read(), content_type="image/jpeg"
         )
-        self.encoded_image = encode_image_to_base64("static/test/test.jpeg")
         self.product_image = ProductImage.objects.create(product=self.product, image=self.image)
         # 채팅방 생성
         self.chatroom = Chatroom.objects.create(product=self.product, borrower=self.borrower, lender=self.lender)
@@ -101,6 +109,9 @@ class RentalNotificationTestCase(BaseTestCase):
         # 정상적으로 생성되었는지 확인
         self.assertEqual(await database_sync_to_async(RentalHistory.objects.count)(), 1)
 
+        # outbox에 쌓인 알림 이벤트를 dispatcher가 전송
+        self.assertEqual(await database_sync_to_async(dispatch_rental_notifications)(), 1)
+
         # 판매자에게 요청알림이 갔는지 확인
         req_notification = await communicator2.receive_json_from()
 
@@ -130,10 +141,13 @@ class RentalNotificationTestCase(BaseTestCase):
         await communicator2.send_json_to(
             {"command": "rental_notification_confirm", "notification_id": rental_notification.id}
         )
+        unread_counts = await communicator2.receive_json_from()
+        self.assertEqual(unread_counts["type"], "unread_notification_count")
+        self.assertEqual(unread_counts["rental_notification"], 0)
         updated_confirm = await database_sync_to_async(RentalNotification.objects.get)(
             rental_history=rental_history, recipient=self.lender
         )
-        self.assertFalse(updated_confirm.confirm)
+        self.assertTrue(updated_confirm.confirm)
 
         # 소켓 연결 해제
         await communicator1.disconnect()
@@ -162,8 +176,9 @@ class ChatNotificationTestCase(BaseTestCase):
         self.assertTrue(alert.get("opponent_state"), "offline")
 
         # 새로운 채팅 메시지 생성
-        # 채팅메시지와 유저 정보 전송하기
-        data = {"text": "Test message", "image": self.encoded_image, "sender": self.borrower.nickname}
+        # 이미지는 먼저 업로드하고 저장소 키만 채팅메시지와 유저 정보와 함께 전송하기
+        uploaded = await database_sync_to_async(save_chat_image)(self.chatroom.id, self.image)
+        data = {"text": "Test message", "image": uploaded["image"], "sender": self.borrower.nickname}
         await chat_communicator.send_json_to(data)
 
         # 메시지가 올바르게 받아졌는지 확인
@@ -177,8 +192,9 @@ class ChatNotificationTestCase(BaseTestCase):
         count = await database_sync_to_async(self.chatroom.message_set.count)()
         self.assertEqual(count, 0)
         key = f"{get_group_name(chatroom_id=self.chatroom.id)}_messages"
+        self.addCleanup(self.redis_conn.delete, key, f"{get_group_name(chatroom_id=self.chatroom.id)}_unread")
 
-        stored_message = self.redis_conn.lrange(key, -1, -1)
+        stored_message = self.redis_conn.lrange(key, 0, 0)
         redis_message = json.loads(stored_message[0])
 
         self.assertEqual(redis_message.get("chatroom_id"), self.chatroom.id)
@@ -248,36 +264,317 @@ class GlobalNotificationTestCase(TransactionTestCase):
         self.assertEqual(notification_for_user2["image"], notification.image.url)
         self.assertEqual(notification_for_user2["text"], notification.text)
 
-        # 알림 확인 모델이 생성되었는지 테스트
-        self.assertTrue(
-            await database_sync_to_async(
-                GlobalNotificationConfirm.objects.filter(
-                    notification=notification, user=self.user1, confirm=False
-                ).exists
-            )()
-        )
-        self.assertTrue(
-            await database_sync_to_async(
-                GlobalNotificationConfirm.objects.filter(
-                    notification=notification, user=self.user2, confirm=False
-                ).exists
-            )()
-        )
+        # 알림을 전송해도 유저별 확인 row는 생성되지 않음
+        self.assertFalse(await database_sync_to_async(GlobalNotificationWatermark.objects.exists)())
 
         # 유저1의 알림 읽기 테스트
         await communicator1.send_json_to({"command": "global_notification_confirm", "notification_id": notification.id})
-        user1_confirm_instance = await database_sync_to_async(GlobalNotificationConfirm.objects.get)(
-            notification=notification, user=self.user1
-        )
-        self.assertFalse(user1_confirm_instance.confirm)
+        unread_counts = await communicator1.receive_json_from()
+        self.assertEqual(unread_counts["global_notification"], 0)
+        user1_watermark = await database_sync_to_async(GlobalNotificationWatermark.objects.get)(user=self.user1)
+        self.assertEqual(user1_watermark.last_read_id, notification.id)
 
-        # 유저2의 알림 읽기 테스트
-        await communicator1.send_json_to({"command": "global_notification_confirm", "notification_id": notification.id})
-        user2_confirm_instance = await database_sync_to_async(GlobalNotificationConfirm.objects.get)(
-            notification=notification, user=self.user2
-        )
-        self.assertFalse(user2_confirm_instance.confirm)
+        # 유저2는 알림을 읽지 않았으므로 안읽은 알림으로 남아있음
+        unread_for_user2 = await database_sync_to_async(
+            lambda: list(get_unread_global_notifications(user_id=self.user2.id))
+        )()
+        self.assertEqual(unread_for_user2, [notification])
 
         # 소켓 정리
         await communicator1.disconnect()
         await communicator2.disconnect()
+
+
+class NotificationGroupTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        self.user = Account.objects.create_user(email="test@example.com", password="testpw123", nickname="user1")
+        self.opponent = Account.objects.create_user(email="test2@example.com", password="testpw1234", nickname="user2")
+        # 참여한 채팅방이 많아도 연결시 추가되는 그룹 수는 같아야함
+        for _ in range(5):
+            Chatroom.objects.create(borrower=self.user, lender=self.opponent)
+        self.application = URLRouter([path("ws/notification/", NotificationConsumer.as_asgi())])
+        self.redis_conn = get_redis_connection("default")
+
+    async def test_유저별_알림그룹으로만_연결되고_알림을_받는지_확인(self) -> None:
+        communicator = WebsocketCommunicator(self.application, "/ws/notification/")
+        communicator.scope["user"] = self.user
+        communicator.scope["type"] = "websocket"
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        user_group = get_user_notification_group_name(user_id=self.user.id)
+        self.assertEqual(self.redis_conn.zcard(f"asgi:group:{user_group}"), 1)
+        self.assertEqual(NotificationConsumer.groups, [])
+
+        # 상대방에게 보내는 알림은 받지 않고, 유저에게 보내는 알림만 받음
+        channel_layer = get_channel_layer()
+        opponent_group = get_user_notification_group_name(user_id=self.opponent.id)
+        await channel_layer.group_send(opponent_group, {"type": "chat_notification", "text": "to opponent"})
+        await channel_layer.group_send(user_group, {"type": "chat_notification", "text": "to user"})
+        notification = await communicator.receive_json_from()
+        self.assertEqual(notification["text"], "to user")
+        self.assertTrue(await communicator.receive_nothing())
+
+        # 연결을 해제하면 유저별 그룹에서 제거됨
+        await communicator.disconnect()
+        self.assertEqual(self.redis_conn.zcard(f"asgi:group:{user_group}"), 0)
+
+
+class GlobalNotificationWatermarkTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        # 가입 전에 생성된 전체 알림
+        self.old_notification = GlobalNotification.objects.create(text="가입 전 알림")
+        self.user = Account.objects.create_user(email="test@example.com", password="testpw123", nickname="user1")
+        self.notifications = [GlobalNotification.objects.create(text=f"알림{i}") for i in range(3)]
+
+    def test_watermark_보다_큰_전체_알림만_안읽은_알림으로_판단(self) -> None:
+        # watermark가 없으면 가입 이후의 알림만 안읽은 알림
+        self.assertEqual(list(get_unread_global_notifications(user_id=self.user.id)), self.notifications)
+
+        # 두 번째 알림을 확인하면 그 이하의 알림은 모두 읽음 처리됨
+        confirm_global_notification(user_id=self.user.id, notification_id=self.notifications[1].id)
+        self.assertEqual(list(get_unread_global_notifications(user_id=self.user.id)), self.notifications[2:])
+
+        # 이전 알림을 다시 확인해도 watermark는 내려가지 않음
+        confirm_global_notification(user_id=self.user.id, notification_id=self.notifications[0].id)
+        watermark = GlobalNotificationWatermark.objects.get(user=self.user)
+        self.assertEqual(watermark.last_read_id, self.notifications[1].id)
+
+        # 안읽은 전체 알림 조회는 한 번의 쿼리로 watermark와 가입일을 가져옴
+        with self.assertNumQueries(2):
+            list(get_unread_global_notifications(user_id=self.user.id))
+
+    def test_배포시_전체_알림_확인_row를_watermark로_옮기는지_확인(self) -> None:
+        # given : watermark 도입 전 상태로 되돌리고 유저별 확인 row를 만듦
+        before = [("notification", "0003_globalnotificationwatermark")]
+        after = [("notification", "0004_globalnotificationconfirm_to_watermark")]
+        executor = MigrationExecutor(connection)
+        self.addCleanup(lambda: MigrationExecutor(connection).migrate(executor.loader.graph.leaf_nodes()))
+        executor.migrate(before)
+        GlobalNotificationConfirm = executor.loader.project_state(before).apps.get_model(
+            "notification", "GlobalNotificationConfirm"
+        )
+        reader = Account.objects.create_user(email="reader@example.com", password="testpw123", nickname="reader")
+        for user, confirmed in ((self.user, [True, False, True]), (reader, [True, True, True])):
+            for notification, confirm in zip(self.notifications, confirmed):
+                GlobalNotificationConfirm.objects.create(
+                    user_id=user.id, notification_id=notification.id, confirm=confirm
+                )
+
+        # when
+        executor = MigrationExecutor(connection)
+        executor.migrate(after)
+
+        # then : 확인하지 않은 알림은 안읽은 알림으로 남고, 모두 확인한 유저는 지금까지의 알림을 모두 읽음 처리
+        watermarks = dict(GlobalNotificationWatermark.objects.values_list("user_id", "last_read_id"))
+        self.assertEqual(watermarks, {self.user.id: self.notifications[1].id - 1, reader.id: self.notifications[2].id})
+
+
+class UnreadNotificationSnapshotTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        self.borrower = Account.objects.create_user(email="test@example.com", password="testpw123", nickname="user1")
+        self.lender = Account.objects.create_user(email="test2@example.com", password="testpw1234", nickname="user2")
+        self.category = Category.objects.create(name="test")
+        # 상품마다 대여 신청 알림과 채팅방의 안읽은 메시지를 만듦
+        for i in range(3):
+            product = Product.objects.create(
+                name=f"Test Product{i}",
+                lender=self.lender,
+                product_category=self.category,
+                condition="Test Condition",
+                purchase_date=datetime.now(),
+                purchase_price=60000,
+                rental_fee=5000,
+                size="XL",
+            )
+            ProductImage.objects.create(
+                product=product, image=SimpleUploadedFile(name="test.jpg", content=b"image", content_type="image/jpeg")
+            )
+            RentalHistory.objects.create(
+                product=product,
+                borrower=self.borrower,
+                rental_date=datetime.now(),
+                return_date=datetime.now() + timedelta(days=3),
+            )
+            chatroom = Chatroom.objects.create(product=product, borrower=self.borrower, lender=self.lender)
+            Message.objects.create(chatroom=chatroom, sender=self.borrower, text=f"old{i}")
+            Message.objects.create(chatroom=chatroom, sender=self.borrower, text=f"new{i}")
+        dispatch_rental_notifications()
+        GlobalNotification.objects.create(text="전체 알림")
+        clear_unread_notifications_cache(self.lender.id)
+        self.addCleanup(clear_unread_notifications_cache, self.lender.id)
+
+    def test_안읽은_알림을_정해진_쿼리_수로_가져오고_캐싱(self) -> None:
+        # 채팅방, 알림 수와 상관없이 전체 알림 2번, 대여 알림 2번(prefetch 포함), 채팅 알림 1번
+        with self.assertNumQueries(5):
+            result = get_unread_notifications(user_id=self.lender.id)
+        self.assertEqual(len(result["rental_notification"]), 3)
+        self.assertTrue(all(notification["image"] for notification in result["rental_notification"]))
+        self.assertEqual([msg["text"] for msg in result["chat_notification"]], ["new0", "new1", "new2"])
+
+        # 다시 연결하면 db 조회 없이 캐시에서 가져옴
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_notifications(user_id=self.lender.id), result)
+
+        # 알림을 읽으면 캐시가 지워져서 다시 조회함
+        confirm_notification(
+            command="rental_notification_confirm",
+            notification_id=result["rental_notification"][0]["id"],
+            user_id=self.lender.id,
+        )
+        self.assertEqual(len(get_unread_notifications(user_id=self.lender.id)["rental_notification"]), 2)
+
+        # 새 전체 알림이 생기면 전체 알림 버전이 올라가서 다시 조회함
+        GlobalNotification.objects.create(text="새 전체 알림")
+        self.assertEqual(len(get_unread_notifications(user_id=self.lender.id)["global_notification"]), 2)
+
+
+class RentalNotificationOutboxTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        self.borrower = Account.objects.create_user(email="test@example.com", password="testpw123", nickname="user1")
+        self.lender = Account.objects.create_user(email="test2@example.com", password="testpw1234", nickname="user2")
+        self.product = Product.objects.create(
+            name="Test Product",
+            lender=self.lender,
+            product_category=Category.objects.create(name="test"),
+            condition="Test Condition",
+            purchase_date=datetime.now(),
+            purchase_price=60000,
+            rental_fee=5000,
+            size="XL",
+        )
+
+    def create_rental_history(self) -> RentalHistory:
+        return RentalHistory.objects.create(
+            product=self.product,
+            borrower=self.borrower,
+            rental_date=datetime.now(),
+            return_date=datetime.now() + timedelta(days=3),
+        )
+
+    def test_대여_내역_저장시_outbox에만_저장하고_dispatcher가_전송(self) -> None:
+        # 대여 신청시 알림은 만들지 않고 outbox에 이벤트만 저장
+        rental_history = self.create_rental_history()
+        self.assertEqual(RentalNotificationOutbox.objects.get().status, "REQUEST")
+        self.assertFalse(RentalNotification.objects.exists())
+
+        # 알림이 생기지 않는 수정은 이벤트를 저장하지 않음
+        rental_history.return_date += timedelta(days=1)
+        rental_history.save()
+        rental_history.status = "ACCEPT"
+        rental_history.save()
+        self.assertEqual(RentalNotificationOutbox.objects.count(), 2)
+
+        self.assertEqual(dispatch_rental_notifications(), 2)
+        self.assertFalse(RentalNotificationOutbox.objects.exists())
+        self.assertEqual(
+            list(RentalNotification.objects.order_by("id").values_list("recipient_id", flat=True)),
+            [self.lender.id, self.borrower.id],
+        )
+        self.assertEqual(dispatch_rental_notifications(), 0)
+
+    @override_settings(NOTIFICATION_DISPATCH_LEASE=0)
+    def test_전송_실패시_저장된_알림을_다시_전송(self) -> None:
+        self.create_rental_history()
+        with patch(
+            "apps.notification.utils.channel_layer.group_send", new=AsyncMock(side_effect=ConnectionError("redis down"))
+        ):
+            with self.assertRaises(ConnectionError):
+                dispatch_rental_notifications()
+
+        # 알림은 전송 전에 저장되어 커밋되고, 이벤트는 outbox에 남아서 lease가 지나면 다시 전송됨
+        event = RentalNotificationOutbox.objects.get()
+        notification = RentalNotification.objects.get(recipient=self.lender)
+        self.assertEqual(event.notification_id, notification.id)
+
+        with patch("apps.notification.utils.channel_layer.group_send", new=AsyncMock()) as group_send:
+            self.assertEqual(dispatch_rental_notifications(), 1)
+        # 같은 알림을 중복 저장하지 않고 다시 전송하며, 클라이언트가 중복을 거를 수 있도록 outbox_id를 함께 보냄
+        self.assertEqual(RentalNotification.objects.get().id, notification.id)
+        assert group_send.await_args is not None
+        sent = group_send.await_args.args[1]
+        self.assertEqual((sent["id"], sent["outbox_id"]), (notification.id, event.id))
+        self.assertFalse(RentalNotificationOutbox.objects.exists())
+
+    def test_전송중인_이벤트는_lease가_지나기_전에_다시_가져가지_않음(self) -> None:
+        self.create_rental_history()
+        with patch(
+            "apps.notification.utils.channel_layer.group_send", new=AsyncMock(side_effect=ConnectionError("redis down"))
+        ):
+            with self.assertRaises(ConnectionError):
+                dispatch_rental_notifications()
+
+        with patch("apps.notification.utils.channel_layer.group_send", new=AsyncMock()) as group_send:
+            self.assertEqual(dispatch_rental_notifications(), 0)
+        group_send.assert_not_awaited()
+        self.assertEqual(RentalNotificationOutbox.objects.count(), 1)
+
+
+class NotificationConfirmTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        self.user = Account.objects.create_user(email="test@example.com", password="testpw123", nickname="user1")
+        borrower = Account.objects.create_user(email="test2@example.com", password="testpw1234", nickname="user2")
+        product = Product.objects.create(
+            name="Test Product",
+            lender=self.user,
+            product_category=Category.objects.create(name="test"),
+            condition="Test Condition",
+            purchase_date=datetime.now(),
+            purchase_price=60000,
+            rental_fee=5000,
+            size="XL",
+        )
+        rental_history = RentalHistory.objects.create(
+            product=product,
+            borrower=borrower,
+            rental_date=datetime.now(),
+            return_date=datetime.now() + timedelta(days=3),
+        )
+        self.notifications = [
+            RentalNotification.objects.create(recipient=self.user, rental_history=rental_history, text=f"알림{i}")
+            for i in range(5)
+        ]
+        self.application = URLRouter([path("ws/notification/", NotificationConsumer.as_asgi())])
+        clear_unread_notifications_cache(self.user.id)
+        self.addCleanup(clear_unread_notifications_cache, self.user.id)
+
+    def test_여러_알림을_한_번의_UPDATE로_읽음처리(self) -> None:
+        notification_ids = [notification.id for notification in self.notifications[:3]]
+        with self.assertNumQueries(1):
+            confirm_notification(
+                command="rental_notification_confirm", user_id=self.user.id, notification_ids=notification_ids
+            )
+        self.assertEqual(RentalNotification.objects.filter(confirm=True).count(), 3)
+
+    def test_읽음처리가_커밋된_뒤에_안읽은_알림_캐시를_지우는지_확인(self) -> None:
+        cache_key = get_unread_notifications_cache_key(self.user.id)
+        for command, notification_id in (
+            ("rental_notification_confirm", self.notifications[0].id),
+            ("global_notification_confirm", GlobalNotification.objects.create(text="전체 알림").id),
+        ):
+            with self.subTest(command=command):
+                get_unread_notifications(user_id=self.user.id)
+                with transaction.atomic():
+                    confirm_notification(command=command, user_id=self.user.id, notification_id=notification_id)
+                    # 커밋 전에 지우면 다른 연결이 읽음 처리 전 상태로 캐시를 다시 채울 수 있음
+                    self.assertIsNotNone(cache.get(cache_key))
+                self.assertIsNone(cache.get(cache_key))
+
+    async def test_up_to_id_이하의_알림을_읽음처리하고_안읽은_알림_수를_전송(self) -> None:
+        communicator = WebsocketCommunicator(self.application, "/ws/notification/")
+        communicator.scope["user"] = self.user
+        communicator.scope["type"] = "websocket"
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        unread_notifications = await communicator.receive_json_from()
+        self.assertEqual(len(unread_notifications["rental_notification"]), 5)
+
+        await communicator.send_json_to(
+            {"command": "rental_notification_confirm", "up_to_id": self.notifications[3].id}
+        )
+        unread_counts = await communicator.receive_json_from()
+        self.assertEqual(
+            unread_counts, {"type": "unread_notification_count", "global_notification": 0, "rental_notification": 1}
+        )
+
+        await communicator.disconnect()
@@ -1,30 +1,48 @@
 import logging
-from typing import Any, Optional, Type
+from datetime import timedelta
+from typing import Any, Optional
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from django.db import IntegrityError, models
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import OuterRef, Prefetch, Q, QuerySet, Subquery
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django_redis import get_redis_connection
 from rest_framework.utils.serializer_helpers import ReturnDict
 
-from apps.chat.models import Chatroom
+from apps.chat.models import Message
 from apps.chat.serializers import MessageSerializer
-from apps.chat.utils import check_opponent_online, get_group_name
 from apps.notification import serializers
 from apps.notification.models import (
     GlobalNotification,
-    GlobalNotificationConfirm,
+    GlobalNotificationWatermark,
     RentalNotification,
+    RentalNotificationOutbox,
 )
-from apps.product.models import RentalHistory
+from apps.product.models import ProductImage, RentalHistory
+from apps.user.models import Account
 
 channel_layer = get_channel_layer()
 logger = logging.getLogger(__name__)
 redis_conn = get_redis_connection("default")
 
+# 모든 유저에게 알림을 전달하는 그룹
+GLOBAL_NOTIFICATION_GROUP_NAME = "notification-global"
+
+# 소켓 연결시 보내주는 유저별 안읽은 알림 캐시
+UNREAD_NOTIFICATIONS_KEY = "unread_notifications"
+GLOBAL_NOTIFICATION_VERSION_KEY = f"{UNREAD_NOTIFICATIONS_KEY}:global_version"
+UNREAD_NOTIFICATIONS_CACHE_TIME = 60 * 10
+
+
+def get_user_notification_group_name(user_id: int) -> str:
+    # 유저에게 오는 채팅, 대여 알림을 전달하는 유저별 그룹
+    return f"notification-user_{user_id}"
+
 
 @receiver(post_save, sender=GlobalNotification)  # type: ignore
 def send_global_notification(sender, instance, created, **kwargs):
@@ -32,7 +50,8 @@ def send_global_notification(sender, instance, created, **kwargs):
     모든 유저에게 전송할 알림이 db에 저장되었을 때 그룹으로 알림을 발송해 줌
     """
     if created:
-        group_name = "notification-global"
+        bump_global_notification_version()
+        group_name = GLOBAL_NOTIFICATION_GROUP_NAME
         data = serializers.GlobalNotificationSerializer(instance).data
         async_to_sync(channel_layer.group_send)(group_name, data)
 
@@ -54,54 +73,101 @@ def send_global_notification(sender, instance, created, **kwargs):
 #             async_to_sync(channel_layer.group_send)(notification_group, data)
 
 
-def chat_notification(chatroom_id: int, data: dict[str, Any]) -> None:
-    # 상대방이 채팅방에 접속중인지 확인하고 채팅방에 접속하지 않은 상태면 새메시지 알림을 전송
-    notification_group = get_chat_notification_group_name(chatroom_id=chatroom_id)
-    chat_group_name = get_group_name(chatroom_id=chatroom_id)
-    if not check_opponent_online(chat_group_name):
-        data["type"] = "chat_notification"
-        async_to_sync(channel_layer.group_send)(notification_group, data)
+def chat_notification(data: dict[str, Any], recipient_id: int) -> None:
+    # 상대방이 채팅방에 접속하지 않은 상태에서 보낸 메시지(ChatConsumer가 접속 상태를 확인)를 상대방에게 새메시지 알림으로 전송
+    notification_group = get_user_notification_group_name(user_id=recipient_id)
+    clear_unread_notifications_cache(recipient_id)
+    data["type"] = "chat_notification"
+    async_to_sync(channel_layer.group_send)(notification_group, data)
 
 
 @receiver(post_save, sender=RentalHistory)  # type: ignore
 def rental_notification(sender, instance, created, **kwargs: Any) -> None:
     """
-    유저가 상품을 대여신청 했을 때 판매자에게 대여신청 알림을 보내주는 메서드
+    대여 내역이 저장되었을 때 알림을 바로 보내지 않고 같은 트랜잭션에서 outbox에 알림 이벤트만 저장
+    대여 내역이 커밋되어야 이벤트도 커밋되고, 알림 생성과 전송은 요청 밖에서 dispatch_rental_notifications 가 처리
     """
-    text = ""
-    recipient_id = ""
-    if created and instance.status == "REQUEST":
-        text = f"{instance.borrower.nickname}님의 {instance.product.name} 상품 대여 신청 확인하기"
-        recipient_id = instance.product.lender.id
-    elif instance.status == "ACCEPT":
-        text = f"{instance.product.name} 상품 대여 신청이 수락되었습니다."
-        recipient_id = instance.borrower.id
-
-    elif instance.status == "RETURNED":
-        text = f"{instance.product.name}이 정상적으로 반납 완료되었습니다."
-        recipient_id = instance.borrower.id
+    if (created and instance.status == "REQUEST") or instance.status in ("ACCEPT", "RETURNED", "BORROWING"):
+        RentalNotificationOutbox.objects.create(rental_history=instance, status=instance.status)
 
-    elif instance.status == "BORROWING":
-        text = f"{instance.product.name}의 대여가 시작되었습니다. 반납일은 {instance.return_data.date}입니다."
-        recipient_id = instance.borrower.id
 
-    chatroom_id = instance.product.chatroom_set.get(borrower=instance.borrower, lender=instance.product.lender).id
-    # 가져온 채팅방 정보를 통해서 그룹네임을 가져옴
-    chat_group_name = get_chat_notification_group_name(chatroom_id=chatroom_id)
+def get_rental_notification_content(rental_history: RentalHistory, status: str) -> tuple[int, str]:
+    # 대여 상태에 따라 알림을 받는 유저와 알림 내용을 정함
+    product = rental_history.product
+    if status == "REQUEST":
+        return product.lender_id, f"{rental_history.borrower.nickname}님의 {product.name} 상품 대여 신청 확인하기"
+    if status == "ACCEPT":
+        text = f"{product.name} 상품 대여 신청이 수락되었습니다."
+    elif status == "RETURNED":
+        text = f"{product.name}이 정상적으로 반납 완료되었습니다."
+    else:
+        text = f"{product.name}의 대여가 시작되었습니다. 반납일은 {rental_history.return_date.date()}입니다."
+    return rental_history.borrower_id, text
 
-    # 요청에 대한 새로운 알림을 데이터 베이스에 저장
-    notification = create_rental_notification(
-        model=RentalNotification, rental_history=instance, text=text, recipient_id=int(recipient_id)
-    )
-    # 저장된 알림을 직렬화해서 데이터에 담음
-    serializer = serializers.RentalNotificationSerializer(notification)
-    data = serializer.data
-    # 직렬화된 데이터를 그룹으로 보냄
-    async_to_sync(channel_layer.group_send)(chat_group_name, data)
 
-
-def get_chat_notification_group_name(chatroom_id: int) -> str:
-    return f"notification-chat_{chatroom_id}"
+def dispatch_rental_notifications(batch_size: int = 100) -> int:
+    """
+    outbox에 쌓인 대여 알림 이벤트로 알림을 저장하고 유저별 알림 그룹으로 전송
+    1. 짧은 트랜잭션에서 skip_locked 로 이벤트를 잠그고 알림을 저장해서 이벤트에 연결한 뒤 바로 커밋
+       (전송하는 동안에는 row lock을 잡고 있지 않음)
+    2. 커밋 후 알림을 전송하고 전송한 이벤트만 outbox에서 지움
+    전송에 실패하거나 지우기 전에 종료된 이벤트는 NOTIFICATION_DISPATCH_LEASE 가 지나면 저장된 알림을 다시 전송함
+    따라서 전송은 at-least-once 이고, 클라이언트는 알림의 outbox_id 로 중복 알림을 걸러야 함
+    전송한 이벤트 수를 반환
+    """
+    now = timezone.now()
+    lease_expired_at = now - timedelta(seconds=settings.NOTIFICATION_DISPATCH_LEASE)
+    with transaction.atomic():
+        events = list(
+            RentalNotificationOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(Q(notification__isnull=True) | Q(updated_at__lte=lease_expired_at))
+            .select_related("notification", "rental_history__borrower", "rental_history__product__lender")
+            .prefetch_related(
+                Prefetch(
+                    "rental_history__product__images",
+                    queryset=ProductImage.objects.order_by("id"),
+                    to_attr="prefetched_images",
+                )
+            )
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        new_events = [event for event in events if event.notification is None]
+        notifications = []
+        for event in new_events:
+            recipient_id, text = get_rental_notification_content(event.rental_history, event.status)
+            notifications.append(
+                RentalNotification(recipient_id=recipient_id, rental_history=event.rental_history, text=text)
+            )
+        RentalNotification.objects.bulk_create(notifications)
+        for event, new_notification in zip(new_events, notifications):
+            event.notification = new_notification
+        # updated_at 으로 다른 dispatcher가 전송중인 이벤트를 lease 동안 다시 가져가지 않도록 함
+        for event in events:
+            event.updated_at = now
+        RentalNotificationOutbox.objects.bulk_update(events, ["notification", "updated_at"])
+
+    # 커밋된 뒤에 캐시를 지워야 다시 만든 안읽은 알림 캐시에 새 알림이 포함됨
+    clear_unread_notifications_cache(*{event.notification.recipient_id for event in events if event.notification})
+
+    sent_event_ids = []
+    try:
+        for event in events:
+            notification = event.notification
+            if notification is None:
+                continue
+            # 직렬화할 때 다시 조회하지 않도록 미리 가져온 대여 내역을 사용
+            notification.rental_history = event.rental_history
+            data = serializers.RentalNotificationSerializer(notification).data
+            data["outbox_id"] = event.id
+            notification_group = get_user_notification_group_name(user_id=notification.recipient_id)
+            async_to_sync(channel_layer.group_send)(notification_group, data)
+            sent_event_ids.append(event.id)
+    finally:
+        RentalNotificationOutbox.objects.filter(id__in=sent_event_ids).delete()
+    return len(sent_event_ids)
 
 
 # def get_opponent_channel_name(group_name: str, channel_name: str) -> list[str]:
@@ -115,69 +181,169 @@ def get_chat_notification_group_name(chatroom_id: int) -> str:
 #     return other_values
 
 
-def confirm_notification(command: str, notification_id: int, user_id: int) -> None:
+def get_confirm_notification_ids(data: dict[str, Any]) -> tuple[list[int], Optional[int]]:
+    """
+    알림 확인 요청에서 확인한 알림 id 목록과 up_to_id(이 id 이하의 알림을 모두 확인)를 가져옴
+    notification_id 하나만 보내는 이전 요청 형식도 지원
+    """
+    if data.get("up_to_id") is not None:
+        return [], int(data["up_to_id"])
+    if data.get("notification_ids") is not None:
+        return [int(notification_id) for notification_id in data["notification_ids"]], None
+    return [int(data["notification_id"])], None
+
+
+def confirm_notification(
+    command: str,
+    user_id: int,
+    notification_id: Optional[int] = None,
+    notification_ids: Optional[list[int]] = None,
+    up_to_id: Optional[int] = None,
+) -> None:
     """
-    유저가 확인한 알림을 가져와서 comfirm = True 로 변경
+    유저가 확인한 알림들을 한 번의 UPDATE로 comfirm = True 로 변경
+    알림 id 하나, id 목록, up_to_id 중 하나로 확인한 알림을 지정
     """
+    notification_ids = list(notification_ids or [])
+    if notification_id is not None:
+        notification_ids.append(notification_id)
+    if not notification_ids and up_to_id is None:
+        return
+
     if command == "rental_notification_confirm":
-        RentalNotification.objects.filter(id=notification_id, recipient_id=user_id, confirm=False).update(confirm=True)
+        notifications = RentalNotification.objects.filter(recipient_id=user_id, confirm=False)
+        if up_to_id is not None:
+            notifications = notifications.filter(id__lte=up_to_id)
+        else:
+            notifications = notifications.filter(id__in=notification_ids)
+        notifications.update(confirm=True)
+        clear_unread_notifications_cache_on_commit(user_id)
     if command == "global_notification_confirm":
-        GlobalNotificationConfirm.objects.filter(
-            notification_id=notification_id, user_id=user_id, confirm=False
-        ).update(confirm=True)
-
-
-def create_rental_notification(
-    model: Type[RentalNotification],
-    recipient_id: int,
-    rental_history: RentalHistory,
-    text: str,
-    **kwargs: Any,
-) -> Optional[RentalNotification]:
-    try:
-        return model.objects.create(recipient_id=recipient_id, rental_history=rental_history, text=text, **kwargs)
-    except IntegrityError as e:
-        logger.error("알림 db 저장 중 예외 발생: %s", e, exc_info=True)
-        return None
+        # 전체 알림은 watermark 방식이므로 확인한 알림 중 가장 큰 id까지 읽음 처리
+        confirm_global_notification(
+            user_id=user_id, notification_id=up_to_id if up_to_id is not None else max(notification_ids)
+        )
 
 
-def get_entered_chatroom_ids(user_id: int) -> Optional[list[int]]:
-    try:
-        # 해당 사용자가 판매자 또는 대여자인 모든 채팅방을 가져옴
-        chatrooms = Chatroom.objects.filter(Q(borrower_id=user_id) | Q(lender_id=user_id))
-        # 가져온 채팅방들의 아이디를 리스트로 반환
-        chatroom_ids = chatrooms.values_list("id", flat=True)
-        return chatroom_ids  # type: ignore
-    except Chatroom.DoesNotExist:
-        return None
+def get_unread_notification_counts(user_id: int) -> dict[str, Any]:
+    # 알림 확인 후 클라이언트에 보내줄 종류별 안읽은 알림 수
+    return {
+        "type": "unread_notification_count",
+        "global_notification": get_unread_global_notifications(user_id=user_id).count(),
+        "rental_notification": RentalNotification.objects.filter(recipient_id=user_id, confirm=False).count(),
+    }
+
+
+def confirm_global_notification(user_id: int, notification_id: int) -> None:
+    """
+    전체 알림은 유저가 확인한 알림 id로 watermark를 올려서 그 이하의 전체 알림을 모두 읽음 처리
+    이미 더 큰 id까지 확인했다면 watermark를 내리지 않음
+    """
+    updated = GlobalNotificationWatermark.objects.filter(user_id=user_id, last_read_id__lt=notification_id).update(
+        last_read_id=notification_id
+    )
+    if not updated:
+        GlobalNotificationWatermark.objects.get_or_create(user_id=user_id, defaults={"last_read_id": notification_id})
+    clear_unread_notifications_cache_on_commit(user_id)
 
 
 def get_unread_chat_notifications(user_id: int) -> list[ReturnDict[Any, Any]]:
-    # 해당 사용자가 판매자 또는 대여자인 모든 채팅방을 가져옴
-    chatroom_list = Chatroom.objects.filter(Q(borrower_id=user_id) | Q(lender_id=user_id))
-    # 각 채팅방의 최신 메시지를 필터링하여 가져옴
+    """
+    참여중인 채팅방별로 상대방이 보낸 안읽은 메시지 중 가장 최신 메시지를 한 번의 쿼리로 가져옴
+    채팅방마다 쿼리하지 않도록 채팅방별 최신 메시지 id는 서브쿼리로 구함
+    """
+    unread_messages = Message.objects.filter(~Q(sender_id=user_id), status=True)
+    latest_unread_message_id = (
+        unread_messages.filter(chatroom=OuterRef("chatroom")).order_by("-created_at", "-id").values("id")[:1]
+    )
+    messages = (
+        unread_messages.filter(
+            Q(chatroom__borrower_id=user_id) | Q(chatroom__lender_id=user_id), id=Subquery(latest_unread_message_id)
+        )
+        .select_related("sender")
+        .order_by("chatroom_id")
+    )
     unread_last_messages = []
-    if chatroom_list:
-        for chatroom in chatroom_list:
-            message = chatroom.message_set.exclude(sender=user_id).filter(status=True).order_by("-created_at").first()
-            if message:
-                data = MessageSerializer(message).data
-                data["type"] = "chat_notification"
-                unread_last_messages.append(data)
+    for message in messages:
+        data = MessageSerializer(message).data
+        data["type"] = "chat_notification"
+        unread_last_messages.append(data)
     return unread_last_messages
 
 
+def get_unread_rental_notifications(user_id: int) -> QuerySet[RentalNotification]:
+    # 직렬화할 때 알림마다 대여 내역, 상품, 유저, 상품 이미지를 조회하지 않도록 미리 함께 가져옴
+    return (
+        RentalNotification.objects.filter(recipient_id=user_id, confirm=False)
+        .select_related("rental_history__borrower", "rental_history__product__lender")
+        .prefetch_related(
+            Prefetch(
+                "rental_history__product__images",
+                queryset=ProductImage.objects.order_by("id"),
+                to_attr="prefetched_images",
+            )
+        )
+        .order_by("id")
+    )
+
+
+def get_unread_notifications_cache_key(user_id: int) -> str:
+    return f"{UNREAD_NOTIFICATIONS_KEY}:{user_id}"
+
+
+def get_global_notification_version() -> int:
+    version = cache.get(GLOBAL_NOTIFICATION_VERSION_KEY)
+    if version is None:
+        # 버전 키는 만료되지 않도록 timeout=None 으로 저장
+        cache.add(GLOBAL_NOTIFICATION_VERSION_KEY, 1, None)
+        version = cache.get(GLOBAL_NOTIFICATION_VERSION_KEY, 1)
+    return int(version)
+
+
+def bump_global_notification_version() -> None:
+    """
+    전체 알림은 모든 유저의 안읽은 알림에 포함되므로 유저별 캐시를 지우지 않고 버전을 올려서 한 번에 무효화함
+    """
+    try:
+        cache.incr(GLOBAL_NOTIFICATION_VERSION_KEY)
+    except ValueError:
+        cache.add(GLOBAL_NOTIFICATION_VERSION_KEY, 2, None)
+
+
+def clear_unread_notifications_cache(*user_ids: int) -> None:
+    # 새 알림이 오거나 알림을 읽은 유저의 안읽은 알림 캐시를 지움
+    if user_ids:
+        cache.delete_many([get_unread_notifications_cache_key(user_id) for user_id in user_ids])
+
+
+def clear_unread_notifications_cache_on_commit(*user_ids: int) -> None:
+    """
+    읽음 처리가 커밋된 뒤에 캐시를 지움
+    먼저 지우면 커밋 전에 다른 연결이 이전 상태로 캐시를 다시 채울 수 있음 (트랜잭션 밖에서는 바로 지움)
+    """
+    transaction.on_commit(lambda: clear_unread_notifications_cache(*user_ids))
+
+
 def get_unread_notifications(user_id: int) -> dict[str, Any]:
+    """
+    소켓 연결시 보내줄 안읽은 알림을 유저별로 캐싱해서, 배포 후 재접속이 몰려도 db 조회는 알림이 바뀐 유저만 하도록 함
+    캐시에 저장할 때의 전체 알림 버전이 현재 버전과 다르면 새 전체 알림이 생긴 것이므로 다시 조회함
+    """
+    cache_key = get_unread_notifications_cache_key(user_id)
+    version = get_global_notification_version()
+    cached = cache.get(cache_key)
+    if cached is not None and cached["version"] == version:
+        cached_result: dict[str, Any] = cached["result"]
+        return cached_result
+
     result: dict[str, Any] = {}
-    unread_global_notification = GlobalNotification.objects.filter(
-        globalnotificationconfirm__user_id=user_id, globalnotificationconfirm__confirm=False
-    )
+    unread_global_notification = list(get_unread_global_notifications(user_id=user_id))
     if unread_global_notification:
         result["global_notification"] = serializers.GlobalNotificationSerializer(
             unread_global_notification, many=True
         ).data
 
-    unread_rental_notification = RentalNotification.objects.filter(recipient_id=user_id, confirm=False)
+    unread_rental_notification = list(get_unread_rental_notifications(user_id=user_id))
     if unread_rental_notification:
         result["rental_notification"] = serializers.RentalNotificationSerializer(
             unread_rental_notification, many=True
@@ -187,9 +353,17 @@ def get_unread_notifications(user_id: int) -> dict[str, Any]:
     if unread_message:
         result["chat_notification"] = unread_message
 
+    cache.set(cache_key, {"version": version, "result": result}, UNREAD_NOTIFICATIONS_CACHE_TIME)
     return result
 
 
-def create_global_notification_confirm(user_id: int, notification_id: int) -> GlobalNotificationConfirm:
-    obj, created = GlobalNotificationConfirm.objects.get_or_create(user_id=user_id, notification_id=notification_id)
-    return obj
+def get_unread_global_notifications(user_id: int) -> QuerySet[GlobalNotification]:
+    """
+    watermark 보다 id가 큰 전체 알림을 안읽은 알림으로 가져옴
+    watermark가 없는 유저는 가입한 이후에 생성된 전체 알림만 안읽은 알림으로 판단
+    """
+    user = Account.objects.filter(id=user_id).values("created_at", "globalnotificationwatermark__last_read_id").first()
+    if user is None:
+        return GlobalNotification.objects.none()
+    last_read_id = user["globalnotificationwatermark__last_read_id"] or 0
+    return GlobalNotification.objects.filter(id__gt=last_read_id, created_at__gte=user["created_at"]).order_by("id")
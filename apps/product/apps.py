@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProductConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.product"
+
+    def ready(self) -> None:
+        # 검색 색인을 갱신하는 signal receiver 등록
+        import apps.product.search  # noqa: F401
@@ -0,0 +1,110 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:32
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import apps.product.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("category", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Product",
+            fields=[
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("uuid", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=50)),
+                ("brand", models.CharField(default="None", max_length=20)),
+                ("condition", models.TextField()),
+                ("description", models.TextField(blank=True, null=True)),
+                ("purchase_date", models.DateField()),
+                ("purchase_price", models.IntegerField()),
+                ("rental_fee", models.IntegerField()),
+                ("size", models.CharField(max_length=10)),
+                ("views", models.IntegerField(default=0)),
+                ("status", models.BooleanField(default=True)),
+                ("amount", models.IntegerField(default=1)),
+                ("region", models.CharField(default="None", max_length=30)),
+                ("likes", models.IntegerField(default=0)),
+                (
+                    "lender",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="products",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "product_category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="products", to="category.category"
+                    ),
+                ),
+                ("styles", models.ManyToManyField(blank=True, related_name="products", to="category.style")),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductImage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("image", models.ImageField(upload_to=apps.product.models.upload_to_s3_product)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="images", to="product.product"
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="RentalHistory",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("rental_date", models.DateTimeField()),
+                ("return_date", models.DateTimeField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("REQUEST", "request"),
+                            ("ACCEPT", "accept"),
+                            ("RETURNED", "returned"),
+                            ("BORROWING", "borrowing"),
+                        ],
+                        default="REQUEST",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "borrower",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                ("product", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="product.product")),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0001_initial"),
+        ("product", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "product_category", "created_at"], name="product_status_cat_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["created_at", "uuid"], name="product_created_uuid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["rental_fee", "uuid"], name="product_rental_fee_uuid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["views", "uuid"], name="product_views_uuid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["likes", "uuid"], name="product_likes_uuid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="rentalhistory",
+            index=models.Index(fields=["borrower", "product", "status"], name="rental_borrower_product_idx"),
+        ),
+    ]
@@ -0,0 +1,100 @@
+from typing import Any
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+# apps.product.search.get_search_vector 와 같은 값을 계산하는 SQL
+# 이후 검색 코드가 바뀌어도 마이그레이션 결과가 달라지지 않도록 코드를 import 하지 않고 이 시점의 식을 그대로 복사
+BACKFILL_SEARCH_VECTOR_SQL = """
+UPDATE product_product AS product
+SET search_vector =
+    setweight(to_tsvector('simple'::regconfig, COALESCE(product.name, '')), 'A')
+    || setweight(to_tsvector('simple'::regconfig, COALESCE(product.brand, '')), 'B')
+    || setweight(
+        to_tsvector(
+            'simple'::regconfig,
+            COALESCE(
+                (
+                    SELECT STRING_AGG(style.name, ' ')
+                    FROM category_style AS style
+                    INNER JOIN product_product_styles AS product_styles ON product_styles.style_id = style.id
+                    WHERE product_styles.product_id = product.uuid
+                ),
+                ''
+            )
+        ),
+        'B'
+    )
+    || setweight(to_tsvector('simple'::regconfig, COALESCE(product.description, '')), 'C')
+    || setweight(
+        to_tsvector(
+            'simple'::regconfig,
+            COALESCE((SELECT account.nickname FROM user_account AS account WHERE account.id = product.lender_id), '')
+        ),
+        'D'
+    )
+WHERE product.uuid IN (
+    SELECT uuid FROM product_product WHERE search_vector IS NULL ORDER BY uuid LIMIT %s
+)
+"""
+
+
+class PostgresAddIndex(migrations.AddIndex):
+    """
+    GIN 인덱스는 SQLite 테스트 db에서 만들 수 없으므로 postgres 에서만 생성 (모델 상태에는 항상 추가)
+    이전 post_migrate 훅이 같은 이름으로 만들어둔 인덱스가 있으면 그대로 사용
+    """
+
+    def database_forwards(self, app_label: str, schema_editor: Any, from_state: Any, to_state: Any) -> None:
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        with schema_editor.connection.cursor() as cursor:
+            constraints = schema_editor.connection.introspection.get_constraints(cursor, model._meta.db_table)
+        if self.index.name not in constraints:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label: str, schema_editor: Any, from_state: Any, to_state: Any) -> None:
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def backfill_search_vector(apps: Any, schema_editor: Any) -> None:
+    """
+    search_vector 컬럼이 추가되기 전에 저장된 상품의 색인 데이터를 채움
+    마이그레이션이 트랜잭션 밖에서 실행되므로 배치마다 커밋되고, 중간에 실패하면 비어있는 상품부터 다시 채움
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            cursor.execute(BACKFILL_SEARCH_VECTOR_SQL, [BATCH_SIZE])
+            if cursor.rowcount < BATCH_SIZE:
+                break
+
+
+class Migration(migrations.Migration):
+    # 상품이 많을 때 backfill 이 하나의 트랜잭션으로 테이블을 오래 잠그지 않도록 배치마다 커밋
+    atomic = False
+
+    dependencies = [
+        ("category", "0001_initial"),
+        ("user", "0001_initial"),
+        ("product", "0003_product_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        PostgresAddIndex(
+            model_name="product",
+            index=GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+        ),
+        PostgresAddIndex(
+            model_name="product",
+            index=GinIndex(OpClass("name", name="gin_trgm_ops"), name="product_name_trgm_idx"),
+        ),
+    ]
@@ -1,6 +1,8 @@
 import uuid
 from typing import Any
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from apps.category.models import Style
@@ -27,6 +29,22 @@ class Product(BaseModel):
     amount = models.IntegerField(default=1)
     region = models.CharField(max_length=30, default="None")
     likes = models.IntegerField(default=0)
+    # 상품 검색용 tsvector, apps/product/search.py 의 PostgresProductSearchBackend 가 갱신
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # 상품 목록 필터 + 기본 정렬
+            models.Index(fields=["status", "product_category", "created_at"], name="product_status_cat_created_idx"),
+            # 상품 목록 정렬(ordering_fields) + keyset 페이지네이션 tie-breaker
+            models.Index(fields=["created_at", "uuid"], name="product_created_uuid_idx"),
+            models.Index(fields=["rental_fee", "uuid"], name="product_rental_fee_uuid_idx"),
+            models.Index(fields=["views", "uuid"], name="product_views_uuid_idx"),
+            models.Index(fields=["likes", "uuid"], name="product_likes_uuid_idx"),
+            # 상품 검색(PostgresProductSearchBackend), postgres 에서만 생성 (migrations/0004_product_search_indexes.py)
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(OpClass("name", name="gin_trgm_ops"), name="product_name_trgm_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -63,5 +81,10 @@ class RentalHistory(BaseModel):
     return_date = models.DateTimeField()  # 대여 반납일
     status = models.CharField(choices=STATUS_CHOICE, default="REQUEST", max_length=10)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["borrower", "product", "status"], name="rental_borrower_product_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.product} - Rented by {self.product.lender}"
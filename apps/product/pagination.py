@@ -0,0 +1,147 @@
+import base64
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Field, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+
+class ProductKeysetPagination(PageNumberPagination):
+    """
+    기본은 PageNumberPagination 과 동일하게 동작하고,
+    요청에 `cursor` 쿼리 파라미터가 있으면(빈 값이면 첫 페이지) keyset 방식으로 페이지를 나눔
+
+    keyset 모드는 OrderingFilter 가 적용한 정렬 필드 + uuid(tie-breaker)의 마지막 값을 커서에 담아서
+    다음 페이지를 `WHERE (정렬값, uuid) > (커서값)` 조건으로 가져오므로 COUNT(*)와 OFFSET 없이
+    몇 번째 페이지든 첫 페이지와 같은 비용으로 조회함
+    """
+
+    cursor_query_param = "cursor"
+    tie_breaker = "uuid"
+    default_ordering = ("-created_at",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self) -> None:
+        self.use_cursor = False
+        self.ordering: list[tuple[str, bool]] = []
+        self.next_values: Optional[list[Any]] = None
+        self.previous_values: Optional[list[Any]] = None
+        self.request: Optional[Request] = None
+
+    def paginate_queryset(
+        self, queryset: QuerySet[Any], request: Request, view: Optional[APIView] = None
+    ) -> Optional[list[Any]]:
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.use_cursor = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            # 페이지 크기가 설정되지 않았으면 DRF 페이지네이션과 같이 페이지를 나누지 않음
+            return None
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor["r"])
+
+        # 이전 페이지로 갈 때는 정렬을 뒤집어서 가져온 뒤 결과를 다시 뒤집음
+        order_by = [f"-{field}" if descending != reverse else field for field, descending in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if cursor:
+            queryset = queryset.filter(self.get_keyset_filter(cursor["v"], reverse))
+
+        results = list(queryset[: page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = True if reverse else has_more
+        has_previous = has_more if reverse else cursor is not None
+        self.next_values = self.get_values(results[-1]) if results and has_next else None
+        self.previous_values = self.get_values(results[0]) if results and has_previous else None
+        return results
+
+    def get_paginated_response(self, data: Any) -> Response:
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_cursor_link(self.next_values, reverse=False)),
+                    ("previous", self.get_cursor_link(self.previous_values, reverse=True)),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_ordering(self, queryset: QuerySet[Any]) -> list[tuple[str, bool]]:
+        # OrderingFilter 가 지정한 정렬을 그대로 따르고, 마지막에 uuid 를 붙여서 정렬 키를 유일하게 만듦
+        # OrderingFilter, 검색 관련도 정렬은 모두 문자열 필드명으로 정렬하므로 식(expression) 정렬은 커서에 담지 않음
+        fields = [
+            field
+            for field in queryset.query.order_by
+            if isinstance(field, str) and field.lstrip("-") != self.tie_breaker
+        ]
+        if not fields:
+            fields = list(self.default_ordering)
+        ordering = [(field.lstrip("-"), field.startswith("-")) for field in fields]
+        ordering.append((self.tie_breaker, ordering[-1][1]))
+        return ordering
+
+    def get_keyset_filter(self, values: list[Any], reverse: bool) -> Q:
+        """
+        (a, b, uuid) > (x, y, z) 를 필드별 정렬 방향을 고려해서
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND uuid > z) 형태로 풀어씀
+        """
+        keyset_filter = Q()
+        equal_filter: dict[str, Any] = {}
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = "lt" if descending != reverse else "gt"
+            keyset_filter |= Q(**equal_filter, **{f"{field}__{lookup}": value})
+            equal_filter[field] = value
+        return keyset_filter
+
+    def get_values(self, instance: Model) -> list[Any]:
+        return [getattr(instance, field) for field, _ in self.ordering]
+
+    def get_cursor_link(self, values: Optional[list[Any]], reverse: bool) -> Optional[str]:
+        if values is None:
+            return None
+        ordering = [f"-{field}" if descending else field for field, descending in self.ordering]
+        payload = json.dumps({"o": ordering, "v": values, "r": reverse}, default=str)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        assert self.request is not None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request, model: type[Model]) -> Optional[dict[str, Any]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor: dict[str, Any] = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            ordering = [f"-{field}" if descending else field for field, descending in self.ordering]
+            # 커서를 만든 정렬과 현재 요청의 정렬이 다르면 커서 값이 의미가 없으므로 잘못된 커서로 처리
+            if cursor["o"] != ordering or len(cursor["v"]) != len(self.ordering):
+                raise ValueError("ordering mismatch")
+            cursor["v"] = [self.to_python(model, field, value) for (field, _), value in zip(self.ordering, cursor["v"])]
+            cursor["r"] = bool(cursor["r"])
+            return cursor
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, model: type[Model], field: str, value: Any) -> Any:
+        # 검색 관련도(rank)처럼 모델 필드가 아닌 annotate 값은 json 값을 그대로 사용
+        try:
+            model_field = model._meta.get_field(field)
+        except FieldDoesNotExist:
+            return value
+        # 역참조 관계처럼 값을 변환할 수 없는 필드도 json 값을 그대로 사용
+        return model_field.to_python(value) if isinstance(model_field, Field) else value
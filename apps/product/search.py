@@ -0,0 +1,177 @@
+from typing import Any, Iterable
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.views import APIView
+
+from apps.category.models import Style
+from apps.product.models import Product
+from apps.user.models import Account
+
+# 한국어 형태소 사전이 없으므로 공백 단위로 토큰을 나누는 simple 설정을 사용하고, 부분 일치는 trigram 인덱스로 처리
+SEARCH_CONFIG = "simple"
+
+
+def get_search_vector() -> CombinedExpression:
+    """
+    PostgresProductSearchBackend 가 저장하는 상품의 search_vector 값
+    """
+    style_names = (
+        Style.objects.filter(products=OuterRef("pk"))
+        .order_by()
+        .values("products")
+        .annotate(names=StringAgg("name", delimiter=" "))
+        .values("names")
+    )
+    # UPDATE 에서는 조인한 필드를 참조할 수 없으므로 스타일, 판매자 닉네임은 서브쿼리로 가져옴
+    lender_nickname = Account.objects.filter(pk=OuterRef("lender_id")).values("nickname")[:1]
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("brand", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(Subquery(style_names, output_field=TextField()), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        + SearchVector(Subquery(lender_nickname), weight="D", config=SEARCH_CONFIG)
+    )
+
+
+class BaseProductSearchBackend:
+    """
+    상품 검색 백엔드 인터페이스
+    search: 검색어와 일치하는 상품만 남기고 관련도(rank) 순으로 정렬한 queryset 반환
+    update_search_vector: 검색에 사용하는 색인 데이터를 갱신 (색인이 없는 백엔드는 아무것도 하지 않음)
+    """
+
+    def search(self, queryset: QuerySet[Product], term: str) -> QuerySet[Product]:
+        raise NotImplementedError
+
+    def update_search_vector(self, product_ids: Iterable[Any]) -> None:
+        pass
+
+
+class SimpleProductSearchBackend(BaseProductSearchBackend):
+    """
+    SQLite 테스트 환경에서 사용하는 LIKE 검색, 상품명이 일치하는 상품을 먼저 보여줌
+    """
+
+    def search(self, queryset: QuerySet[Product], term: str) -> QuerySet[Product]:
+        matched = Product.objects.filter(
+            Q(name__icontains=term)
+            | Q(brand__icontains=term)
+            | Q(description__icontains=term)
+            | Q(styles__name__icontains=term)
+            | Q(lender__nickname__icontains=term)
+        )
+        # styles 조인으로 생기는 중복 행이 없도록 서브쿼리로 필터링
+        return (
+            queryset.filter(pk__in=matched.values("pk"))
+            .annotate(
+                rank=Case(When(name__icontains=term, then=Value(2)), default=Value(1), output_field=IntegerField())
+            )
+            .order_by("-rank", "-created_at")
+        )
+
+
+class PostgresProductSearchBackend(BaseProductSearchBackend):
+    """
+    Product.search_vector(tsvector) 전문 검색 + 상품명 trigram 유사도 검색
+    search_vector 는 상품명(A), 브랜드/스타일(B), 설명(C), 판매자 닉네임(D) 가중치로 저장하고
+    상품, 스타일, 판매자 닉네임이 바뀔 때 update_search_vector 로 갱신
+    두 조건 모두 GIN 인덱스(Product.Meta.indexes)를 사용하므로 ILIKE '%검색어%' 처럼 전체 행을 읽지 않음
+    """
+
+    def search(self, queryset: QuerySet[Product], term: str) -> QuerySet[Product]:
+        query = SearchQuery(term, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.filter(Q(search_vector=query) | Q(name__trigram_word_similar=term))
+            # real 타입 그대로 커서에 담으면 double 로 비교할 때 값이 달라지므로 double precision 으로 변환
+            .annotate(
+                rank=Cast(SearchRank(F("search_vector"), query) + TrigramWordSimilarity(term, "name"), FloatField())
+            ).order_by("-rank", "-created_at")
+        )
+
+    def update_search_vector(self, product_ids: Iterable[Any]) -> None:
+        Product.objects.filter(pk__in=list(product_ids)).update(search_vector=get_search_vector())
+
+
+SEARCH_BACKENDS: dict[str, BaseProductSearchBackend] = {
+    "postgresql": PostgresProductSearchBackend(),
+}
+
+
+def get_product_search_backend() -> BaseProductSearchBackend:
+    # 사용중인 db에 맞는 검색 백엔드를 사용하고, 등록되지 않은 db는 LIKE 검색을 사용
+    return SEARCH_BACKENDS.get(connection.vendor, SimpleProductSearchBackend())
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    ?search= 파라미터를 검색 백엔드로 처리하는 필터
+    정렬 파라미터(?ordering=)가 없으면 관련도 순으로 정렬
+    """
+
+    def filter_queryset(self, request: Request, queryset: QuerySet[Any, Any], view: APIView) -> QuerySet[Any, Any]:
+        term = " ".join(self.get_search_terms(request))
+        if not term:
+            return queryset
+        return get_product_search_backend().search(queryset, term)
+
+
+@receiver(post_save, sender=Product)  # type: ignore
+def update_product_search_vector(sender, instance, **kwargs: Any) -> None:
+    get_product_search_backend().update_search_vector([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.styles.through)  # type: ignore
+def update_product_styles_search_vector(sender, instance, action, reverse, pk_set, **kwargs: Any) -> None:
+    # 스타일 쪽에서 상품을 추가/삭제하면 instance 가 스타일이고 pk_set 이 상품 id
+    if reverse and action == "pre_clear":
+        # clear 후에는 스타일에 연결되어 있던 상품을 알 수 없으므로 미리 저장
+        instance._cleared_product_ids = list(instance.products.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        product_ids: Iterable[Any] = [instance.pk]
+    elif action == "post_clear":
+        product_ids = instance.__dict__.pop("_cleared_product_ids", [])
+    else:
+        product_ids = pk_set
+    get_product_search_backend().update_search_vector(product_ids)
+
+
+@receiver(post_save, sender=Style)  # type: ignore
+def update_style_products_search_vector(sender, instance, created, update_fields, **kwargs: Any) -> None:
+    if not created and (update_fields is None or "name" in update_fields):
+        get_product_search_backend().update_search_vector(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Account)  # type: ignore
+def update_lender_products_search_vector(sender, instance, created, update_fields, **kwargs: Any) -> None:
+    # 로그인할 때 last_login 만 저장하는 경우처럼 닉네임이 바뀌지 않는 저장은 무시
+    if not created and (update_fields is None or "nickname" in update_fields):
+        get_product_search_backend().update_search_vector(instance.products.values_list("pk", flat=True))
@@ -1,10 +1,12 @@
 import logging
 from typing import Any
 
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 
 from apps.category.models import Category, Style
+from apps.category.serializers import TaxonomySlugRelatedField
+from apps.category.utils import clear_local_taxonomy
 from apps.like.models import Like
 from apps.product.models import Product, ProductImage, RentalHistory
 from apps.user.serializers import UserInfoSerializer
@@ -24,8 +26,9 @@ class ProductSerializer(serializers.ModelSerializer[Product]):
     lender = UserInfoSerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     is_liked = serializers.SerializerMethodField()
-    product_category = serializers.SlugRelatedField(slug_field="name", queryset=Category.objects.all())
-    styles = serializers.SlugRelatedField(many=True, slug_field="name", queryset=Style.objects.all())
+    # 이름으로 id를 찾을 때 db 대신 캐싱된 카테고리/스타일 목록을 사용
+    product_category = TaxonomySlugRelatedField("category", queryset=Category.objects.all())
+    styles = TaxonomySlugRelatedField("style", many=True, queryset=Style.objects.all())
 
     class Meta:
         model = Product
@@ -57,17 +60,46 @@ class ProductSerializer(serializers.ModelSerializer[Product]):
 
     def get_is_liked(self, obj: Product) -> bool:
         user = self.context["request"].user
-        if user.is_authenticated:
-            return Like.objects.filter(user=user, product=obj).exists()
-        return False
+        if not user.is_authenticated:
+            return False
+        # 뷰에서 페이지 단위로 한 번에 조회해둔 좋아요 상품 id 집합이 있으면 추가 쿼리 없이 확인
+        liked_product_ids = self.context.get("liked_product_ids")
+        if liked_product_ids is not None:
+            return obj.pk in liked_product_ids
+        return Like.objects.filter(user=user, product=obj).exists()
+
+    def save(self, **kwargs: Any) -> Product:
+        try:
+            return super().save(**kwargs)
+        except IntegrityError:
+            # 캐싱된 카테고리/스타일 id가 그 사이 삭제된 경우, db에서 다시 찾아서 한 번만 다시 저장 (없으면 400 응답)
+            clear_local_taxonomy()
+            self.resolve_taxonomy_from_db()
+            return super().save(**kwargs)
+
+    def resolve_taxonomy_from_db(self) -> None:
+        validated_data = self.validated_data
+        try:
+            field = self.fields["product_category"]
+            if "product_category" in validated_data and isinstance(field, TaxonomySlugRelatedField):
+                validated_data["product_category"] = field.to_db_value(validated_data["product_category"])
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({"product_category": e.detail})
+        try:
+            styles_field = self.fields["styles"]
+            if (
+                "styles" in validated_data
+                and isinstance(styles_field, serializers.ManyRelatedField)
+                and isinstance(styles_field.child_relation, TaxonomySlugRelatedField)
+            ):
+                child = styles_field.child_relation
+                validated_data["styles"] = [child.to_db_value(style) for style in validated_data["styles"]]
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({"styles": e.detail})
 
     def set_styles(self, styles_data: list[Style]) -> list[Style]:
-        styles = []
-        for style in styles_data:
-            style_name = style.name
-            style_item, _ = Style.objects.get_or_create(name=style_name)
-            styles.append(style)
-        return styles
+        # styles 필드가 존재하는 스타일인지 이미 확인했으므로 다시 조회하지 않음
+        return list(styles_data)
 
     @transaction.atomic
     def create(self, validated_data: Any) -> Product:
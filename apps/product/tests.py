@@ -1,8 +1,16 @@
 from datetime import timedelta
+from typing import Any
+from unittest import skipUnless
+from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
@@ -15,9 +23,19 @@ from rest_framework.test import (
 from rest_framework_simplejwt.tokens import AccessToken
 
 from apps.category.models import Category, Style
+from apps.category.utils import clear_local_taxonomy, get_taxonomy_id
+from apps.like.models import Like
 from apps.product.models import Product, ProductImage, RentalHistory
+from apps.product.pagination import ProductKeysetPagination
 from apps.product.permissions import IsLenderOrReadOnly
+from apps.product.search import SEARCH_CONFIG
 from apps.product.serializers import ProductImageSerializer, ProductSerializer
+from apps.product.utils import (
+    PRODUCT_VIEWS_FLUSHING_KEY,
+    PRODUCT_VIEWS_KEY,
+    flush_product_views,
+    redis_conn,
+)
 from apps.product.views import ProductViewSet
 from apps.user.models import Account
 
@@ -316,8 +334,10 @@ class ProductViewSetTest(APITestCase):
         self.client = APIClient()
         self.user = Account.objects.create_user(email="test@example.com", password="password")
         self.client.force_authenticate(user=self.user)
-        self.category = Category.objects.create(name="category1")
-        self.style = Style.objects.create(name="style1")
+        # 카테고리/스타일 캐시 버전은 커밋 후에 올라가므로 on_commit 콜백을 실행
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name="category1")
+            self.style = Style.objects.create(name="style1")
         self.data = {
             "name": "product1",
             "lender": self.user,
@@ -345,6 +365,20 @@ class ProductViewSetTest(APITestCase):
         self.assertEqual(Product.objects.count(), 1)
         self.assertEqual(Product.objects.get().name, self.data["name"])
 
+    def test_create_product_resolves_category_and_styles_from_cache(self) -> None:
+        data = {**self.data, "product_category": self.category.name, "styles": [self.style.name]}
+        data.pop("lender")
+        # 캐시를 채워둔 뒤에는 카테고리/스타일 이름으로 id를 찾는 쿼리가 실행되지 않음
+        self.client.get(reverse("style-list"))
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(reverse("product-list"), data=data)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        name_lookups = [query for query in context.captured_queries if '."name" = ' in query["sql"]]
+        self.assertFalse(name_lookups)
+        product = Product.objects.get()
+        self.assertEqual(product.product_category, self.category)
+        self.assertEqual(list(product.styles.all()), [self.style])
+
     def test_update_product(self) -> None:
         product = Product.objects.create(**self.data)
         url = reverse("product-detail", kwargs={"pk": product.pk})
@@ -361,6 +395,483 @@ class ProductViewSetTest(APITestCase):
         self.assertEqual(Product.objects.count(), 0)
 
 
+class ProductStaleTaxonomyCacheTest(TransactionTestCase):
+    """
+    다른 프로세스에서 카테고리가 삭제된 뒤 이 프로세스의 캐시가 아직 갱신되지 않은 경우
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        clear_local_taxonomy()
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="category1")
+        self.data = {
+            "name": "product1",
+            "brand": "brand",
+            "condition": "condition",
+            "purchase_date": "2024-05-01",
+            "purchase_price": 100000,
+            "rental_fee": 10000,
+            "size": "m",
+            "product_category": self.category.name,
+        }
+        # 삭제되기 전의 카테고리 id를 캐싱해둠
+        self.assertEqual(get_taxonomy_id("category", self.category.name), self.category.id)
+
+    def delete_category_in_other_process(self) -> None:
+        # 다른 프로세스의 버전 변경은 TAXONOMY_LOCAL_CACHE_TIME 이 지나야 반영되므로 현재 프로세스 캐시는 그대로 둠
+        with patch("apps.category.utils.bump_taxonomy_version"):
+            self.category.delete()
+
+    def test_create_product_looks_up_recreated_category_from_db(self) -> None:
+        self.delete_category_in_other_process()
+        with patch("apps.category.utils.bump_taxonomy_version"):
+            category = Category.objects.create(name="category1")
+
+        res = self.client.post(reverse("product-list"), data=self.data)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Product.objects.get().product_category, category)
+
+    def test_create_product_with_deleted_category_returns_400(self) -> None:
+        self.delete_category_in_other_process()
+
+        res = self.client.post(reverse("product-list"), data=self.data)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("product_category", res.json())
+        self.assertFalse(Product.objects.exists())
+
+
+class ProductListCacheTest(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password")
+        self.category = Category.objects.create(name="category1")
+        self.product = Product.objects.create(
+            name="product1",
+            lender=self.user,
+            brand="brand",
+            condition="condition",
+            purchase_date="2024-05-01",
+            purchase_price=100000,
+            rental_fee=10000,
+            size="m",
+            product_category=self.category,
+        )
+        self.url = reverse("product-list")
+
+    def test_anonymous_list_is_served_from_cache(self) -> None:
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached_res = self.client.get(self.url)
+        self.assertEqual(cached_res.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_res.data, res.data)
+
+    def test_update_invalidates_cached_page(self) -> None:
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        res = self.client.patch(reverse("product-detail", kwargs={"pk": self.product.pk}), {"brand": "brand2"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=None)
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data["results"][0]["brand"], "brand2")
+
+    def test_create_invalidates_cached_pages(self) -> None:
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.user)
+        data = {
+            "name": "product2",
+            "condition": "condition",
+            "purchase_date": "2024-05-01",
+            "purchase_price": 100000,
+            "rental_fee": 10000,
+            "size": "m",
+            "product_category": self.category.name,
+        }
+        res = self.client.post(self.url, data)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(user=None)
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data.get("count"), 2)
+
+
+class ProductQueryCountTest(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password", nickname="user")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="category1")
+        self.styles = [Style.objects.create(name="style1"), Style.objects.create(name="style2")]
+
+    def create_products(self, count: int) -> None:
+        for i in range(count):
+            lender = Account.objects.create_user(
+                email=f"lender{Product.objects.count()}@example.com",
+                password="password",
+                nickname=f"lender{Product.objects.count()}",
+            )
+            product = Product.objects.create(
+                name=f"product{i}",
+                lender=lender,
+                condition="condition",
+                purchase_date="2024-05-01",
+                purchase_price=100000,
+                rental_fee=10000,
+                size="m",
+                product_category=self.category,
+            )
+            product.styles.set(self.styles)
+            ProductImage.objects.create(
+                product=product, image=SimpleUploadedFile("image.jpg", b"content", content_type="image/jpeg")
+            )
+            if i % 2 == 0:
+                Like.objects.create(user=self.user, product=product)
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_page_size(self) -> None:
+        self.create_products(2)
+        small_page_queries = self.count_queries(reverse("product-list"))
+        self.create_products(10)
+        full_page_queries = self.count_queries(reverse("product-list"))
+        self.assertEqual(small_page_queries, full_page_queries)
+
+        res = self.client.get(reverse("product-list"))
+        liked = {str(product_id) for product_id in Like.objects.values_list("product_id", flat=True)}
+        for product in res.data["results"]:
+            self.assertEqual(product["is_liked"], product["uuid"] in liked)
+            self.assertEqual(len(product["images"]), 1)
+            self.assertEqual(len(product["styles"]), 2)
+
+    def test_detail_query_count(self) -> None:
+        self.create_products(1)
+        product = Product.objects.get()
+        # select_related(lender, category) + images + styles + liked ids
+        with self.assertNumQueries(4):
+            res = self.client.get(reverse("product-detail", kwargs={"pk": product.pk}))
+        self.assertTrue(res.data["is_liked"])
+
+
+class ProductViewCountTest(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password", nickname="user")
+        self.category = Category.objects.create(name="category1")
+        self.product = Product.objects.create(
+            name="product1",
+            lender=self.user,
+            condition="condition",
+            purchase_date="2024-05-01",
+            purchase_price=100000,
+            rental_fee=10000,
+            size="m",
+            product_category=self.category,
+        )
+        self.url = reverse("product-detail", kwargs={"pk": self.product.pk})
+        self.clear_view_keys()
+        self.addCleanup(self.clear_view_keys)
+
+    def clear_view_keys(self) -> None:
+        keys = list(redis_conn.scan_iter(f"{PRODUCT_VIEWS_KEY}*"))
+        if keys:
+            redis_conn.delete(*keys)
+
+    def test_detail_views_are_buffered_and_flushed_in_batch(self) -> None:
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.url)
+        # 같은 유저의 조회는 한 번만 집계
+        self.client.get(self.url)
+        self.client.force_authenticate(user=None)
+        self.client.get(self.url, REMOTE_ADDR="10.0.0.1")
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_product_views(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 2)
+        self.assertEqual(flush_product_views(), 0)
+
+    def test_anonymous_viewer_cannot_spoof_forwarded_for(self) -> None:
+        # 클라이언트가 X-Forwarded-For의 첫 번째 값을 바꿔도 같은 viewer로 집계
+        for forwarded_for in ("1.1.1.1", "2.2.2.2", "3.3.3.3, 10.0.0.1"):
+            self.client.get(self.url, REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR=forwarded_for)
+        flush_product_views()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 1)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1})
+    def test_viewer_ip_is_the_rightmost_trusted_hop(self) -> None:
+        # 프록시가 추가한 가장 오른쪽 값만 사용하므로 클라이언트가 앞에 붙인 값은 무시
+        self.client.get(self.url, REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="1.1.1.1, 203.0.113.7")
+        self.client.get(self.url, REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="2.2.2.2, 203.0.113.7")
+        self.client.get(self.url, REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="203.0.113.8")
+        flush_product_views()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 2)
+
+    @override_settings(PRODUCT_VIEW_DEDUP_TIME=0)
+    def test_leftover_flushing_views_are_merged_back(self) -> None:
+        # 이전 flusher가 db에 반영하지 못하고 남긴 조회수와 그 뒤에 쌓인 조회수를 함께 반영
+        redis_conn.hset(PRODUCT_VIEWS_FLUSHING_KEY, str(self.product.pk), 5)
+        self.client.get(self.url)
+        self.assertEqual(flush_product_views(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 6)
+        self.assertFalse(redis_conn.exists(PRODUCT_VIEWS_KEY, PRODUCT_VIEWS_FLUSHING_KEY))
+
+    def test_views_ordering_page_cache_is_refreshed_after_flush(self) -> None:
+        # 이전 테스트에서 캐싱된 페이지와 무효화 간격을 지움
+        cache.clear()
+        popular = Product.objects.create(
+            name="product2",
+            lender=self.user,
+            condition="condition",
+            purchase_date="2024-05-01",
+            purchase_price=100000,
+            rental_fee=10000,
+            size="m",
+            product_category=self.category,
+            views=5,
+        )
+        views_url = f"{reverse('product-list')}?ordering=-views"
+        latest_url = f"{reverse('product-list')}?ordering=-created_at"
+        self.assertEqual(self.client.get(views_url).data["results"][0]["uuid"], str(popular.uuid))
+        latest_page = self.client.get(latest_url).data
+
+        redis_conn.hincrby(PRODUCT_VIEWS_KEY, str(self.product.pk), 10)
+        flush_product_views()
+
+        # 조회수 정렬 페이지 캐시만 무효화되어 바뀐 순서로 응답하고, 다른 정렬 페이지 캐시는 그대로 사용
+        self.assertEqual(self.client.get(views_url).data["results"][0]["uuid"], str(self.product.uuid))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(latest_url).data, latest_page)
+
+    @override_settings(PRODUCT_VIEW_DEDUP_TIME=0)
+    def test_every_view_is_counted_without_dedup(self) -> None:
+        for _ in range(3):
+            self.client.get(self.url)
+        flush_product_views()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 3)
+
+
+class ProductSearchTestBase(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password", nickname="옷장주인")
+        self.category = Category.objects.create(name="category1")
+        self.style = Style.objects.create(name="캐주얼")
+        self.url = reverse("product-list")
+
+    def create_product(self, name: str, **kwargs: Any) -> Product:
+        return Product.objects.create(
+            name=name,
+            lender=self.user,
+            condition="condition",
+            purchase_date="2024-05-01",
+            purchase_price=100000,
+            rental_fee=10000,
+            size="m",
+            product_category=self.category,
+            **kwargs,
+        )
+
+    def search(self, term: str, **params: Any) -> list[str]:
+        res = self.client.get(self.url, {"search": term, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in res.data["results"]]
+
+
+class ProductSearchTest(ProductSearchTestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.shirt = self.create_product("파란 셔츠", brand="nike")
+        self.pants = self.create_product("검정 바지", description="셔츠와 잘 어울리는 바지")
+        self.pants.styles.add(self.style)
+
+    def test_search_matches_name_brand_description_style_and_lender(self) -> None:
+        # 상품명이 일치하는 상품이 설명만 일치하는 상품보다 먼저 나옴
+        self.assertEqual(self.search("셔츠"), ["파란 셔츠", "검정 바지"])
+        self.assertEqual(self.search("nike"), ["파란 셔츠"])
+        self.assertEqual(self.search("캐주얼"), ["검정 바지"])
+        self.assertEqual(len(self.search("옷장주인")), 2)
+        self.assertEqual(self.search("없는상품"), [])
+
+    @patch.object(ProductKeysetPagination, "page_size", 1)
+    def test_search_with_cursor_pagination(self) -> None:
+        # 관련도(rank) 순으로 정렬된 검색 결과도 커서로 이어서 조회
+        res = self.client.get(self.url, {"search": "셔츠", "cursor": ""})
+        self.assertEqual([product["name"] for product in res.data["results"]], ["파란 셔츠"])
+        res = self.client.get(res.data["next"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([product["name"] for product in res.data["results"]], ["검정 바지"])
+        self.assertIsNone(res.data["next"])
+
+
+@skipUnless(connection.vendor == "postgresql", "tsvector, pg_trgm 검색은 postgres 에서만 동작")
+class PostgresProductSearchTest(ProductSearchTestBase):
+    def matched_names(self, term: str) -> list[str]:
+        query = SearchQuery(term, config=SEARCH_CONFIG)
+        return list(Product.objects.filter(search_vector=query).order_by("name").values_list("name", flat=True))
+
+    def test_search_vector_is_updated_when_product_style_and_lender_change(self) -> None:
+        product = self.create_product("denim jacket", brand="levis")
+        self.assertEqual(self.matched_names("levis"), ["denim jacket"])
+
+        product.name = "wool coat"
+        product.save()
+        product.styles.add(self.style)
+        self.user.nickname = "새주인"
+        self.user.save()
+
+        self.assertEqual(self.matched_names("denim"), [])
+        self.assertEqual(self.matched_names("coat"), ["wool coat"])
+        self.assertEqual(self.matched_names("캐주얼"), ["wool coat"])
+        self.assertEqual(self.matched_names("새주인"), ["wool coat"])
+
+        # 스타일 쪽에서 상품 연결을 모두 끊어도 색인에서 빠짐
+        self.style.products.clear()
+        self.assertEqual(self.matched_names("캐주얼"), [])
+
+    def test_search_orders_by_field_weight(self) -> None:
+        # 상품명(A) > 브랜드(B) > 설명(C) > 판매자 닉네임(D) 순으로 관련도가 높음
+        self.create_product("plain shirt", description="denim look")
+        self.create_product("denim jacket")
+        self.create_product("plain pants", brand="denim")
+        self.user.nickname = "denim"
+        self.user.save()
+        self.create_product("plain skirt")
+
+        self.assertEqual(self.search("denim"), ["denim jacket", "plain pants", "plain shirt", "plain skirt"])
+
+    def test_search_falls_back_to_trigram_similarity_for_typos(self) -> None:
+        # 오타는 tsvector 토큰과 일치하지 않으므로 상품명 trigram 유사도로 검색
+        self.create_product("denim jacket")
+        self.create_product("wool coat")
+
+        self.assertEqual(self.matched_names("jackt"), [])
+        self.assertEqual(self.search("jackt"), ["denim jacket"])
+
+
+class ProductFacetTest(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password", nickname="user")
+        self.top = Category.objects.create(name="top")
+        self.bottom = Category.objects.create(name="bottom")
+        self.casual = Style.objects.create(name="casual")
+        self.street = Style.objects.create(name="street")
+        for category, size, styles, available in [
+            (self.top, "m", [self.casual, self.street], True),
+            (self.top, "l", [self.casual], False),
+            (self.bottom, "m", [], True),
+        ]:
+            product = Product.objects.create(
+                name=f"{category.name}-{size}",
+                lender=self.user,
+                condition="condition",
+                purchase_date="2024-05-01",
+                purchase_price=100000,
+                rental_fee=10000,
+                size=size,
+                product_category=category,
+                status=available,
+            )
+            product.styles.set(styles)
+        self.url = reverse("product-facets")
+
+    def test_facet_counts_in_one_query(self) -> None:
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["product_category"], [{"value": "top", "count": 2}, {"value": "bottom", "count": 1}])
+        self.assertEqual(res.data["styles"], [{"value": "casual", "count": 2}, {"value": "street", "count": 1}])
+        self.assertEqual(res.data["size"], [{"value": "m", "count": 2}, {"value": "l", "count": 1}])
+        self.assertEqual(res.data["status"], [{"value": True, "count": 2}, {"value": False, "count": 1}])
+
+        # 같은 조건의 요청은 캐시에서 응답
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_facet_counts_follow_current_filters(self) -> None:
+        res = self.client.get(self.url, {"product_category": self.top.pk})
+        self.assertEqual(res.data["product_category"], [{"value": "top", "count": 2}])
+        self.assertEqual(res.data["size"], [{"value": "l", "count": 1}, {"value": "m", "count": 1}])
+
+        res = self.client.get(self.url, {"search": "bottom"})
+        self.assertEqual(res.data["styles"], [])
+        self.assertEqual(res.data["status"], [{"value": True, "count": 1}])
+
+
+class ProductKeysetPaginationTest(APITestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = Account.objects.create_user(email="test@example.com", password="password")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="category1")
+        for i in range(30):
+            Product.objects.create(
+                name=f"product{i}",
+                lender=self.user,
+                condition="condition",
+                purchase_date="2024-05-01",
+                purchase_price=100000,
+                rental_fee=(i % 3 + 1) * 1000,
+                size="m",
+                product_category=self.category,
+            )
+
+    def walk_pages(self, url: str) -> list[str]:
+        uuids: list[str] = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", res.data)
+            uuids.extend(product["uuid"] for product in res.data["results"])
+            url = res.data["next"]
+        return uuids
+
+    def test_cursor_pages_cover_every_product_once(self) -> None:
+        for ordering in ["-created_at", "rental_fee", "-rental_fee", "views", "-likes"]:
+            uuids = self.walk_pages(f"{reverse('product-list')}?cursor=&ordering={ordering}")
+            tie_breaker = "-uuid" if ordering.startswith("-") else "uuid"
+            expected = [
+                str(uuid) for uuid in Product.objects.order_by(ordering, tie_breaker).values_list("uuid", flat=True)
+            ]
+            self.assertEqual(uuids, expected)
+
+    def test_previous_cursor_returns_previous_page(self) -> None:
+        first_page = self.client.get(f"{reverse('product-list')}?cursor=&ordering=rental_fee")
+        second_page = self.client.get(first_page.data["next"])
+        self.assertIsNone(first_page.data["previous"])
+        self.assertIsNone(second_page.data["next"])
+
+        res = self.client.get(second_page.data["previous"])
+        self.assertEqual(res.data["results"], first_page.data["results"])
+
+    def test_cursor_page_skips_count_query(self) -> None:
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(f"{reverse('product-list')}?cursor=")
+        self.assertFalse(any("COUNT(" in query["sql"] for query in context.captured_queries))
+
+    def test_invalid_cursor(self) -> None:
+        res = self.client.get(f"{reverse('product-list')}?cursor=invalid")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class ProductPermissionTest(TestCase):
     def setUp(self) -> None:
         self.user1 = Account.objects.create_user(email="user1@test.com", password="password", nickname="user1")
@@ -1,20 +1,264 @@
-from typing import Any
+import hashlib
+import time
+from typing import Any, Iterable, Optional
 
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
-from django.db.models import QuerySet
+from django.db.models import Case, CharField, Count, F, QuerySet, Value, When
+from django.db.models.functions import Cast
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError, WatchError
+from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
 
+from apps.like.models import Like
+from apps.product.models import Product
+from apps.user.models import Account
 
-def get_or_set_cache(key: str, queryset: QuerySet[Any], timeout: int) -> QuerySet[Any] | None:
-    return cache.get_or_set(key, queryset, timeout)
+redis_conn = get_redis_connection("default")
+
+PRODUCT_LIST_KEY = "products_list"
+PRODUCT_LIST_VERSION_KEY = f"{PRODUCT_LIST_KEY}:version"
+PRODUCT_LIST_CACHE_TIME = 60 * 10
+# 조회수, 좋아요 수 정렬 페이지는 이 버전을 함께 키에 사용해서 카운터가 db에 반영될 때 따로 무효화
+PRODUCT_COUNTER_VERSION_KEY = f"{PRODUCT_LIST_KEY}:counter_version"
+PRODUCT_COUNTER_ORDERING_FIELDS = ("views", "likes")
+PRODUCT_COUNTER_VERSION_BUMP_INTERVAL = 60  # 카운터 정렬 페이지 캐시를 무효화하는 최소 간격(초)
+# 상품 목록 필터 사이드바에 개수를 보여줄 필드 (응답 키: 그룹으로 묶을 값)
+PRODUCT_FACETS = {
+    "product_category": "product_category__name",
+    "styles": "styles__name",
+    "size": "size",
+    "status": "status",
+}
+# 상품별로 아직 db에 반영되지 않은 조회수를 저장하는 hash, flush 할 때는 FLUSHING 키로 옮겨서 처리
+PRODUCT_VIEWS_KEY = "product_views"
+PRODUCT_VIEWS_FLUSHING_KEY = f"{PRODUCT_VIEWS_KEY}:flushing"
 
 
 def get_cache(key: str) -> Any:
     return cache.get(key)
 
 
-def set_cache(key: str, value: QuerySet[Any], timeout: int) -> None:
+def set_cache(key: str, value: Any, timeout: int) -> None:
     cache.set(key, value, timeout)
 
 
 def clear_cache(key: str) -> None:
     cache.delete(key)
+
+
+def get_product_list_version() -> int:
+    version = cache.get(PRODUCT_LIST_VERSION_KEY)
+    if version is None:
+        # 버전 키는 만료되지 않도록 timeout=None 으로 저장
+        cache.add(PRODUCT_LIST_VERSION_KEY, 1, None)
+        version = cache.get(PRODUCT_LIST_VERSION_KEY, 1)
+    return int(version)
+
+
+def bump_product_list_version() -> None:
+    """
+    상품이 추가/삭제되거나 필터, 검색, 정렬 결과가 바뀌는 수정이 일어나면 모든 페이지의 순서가 밀리므로
+    버전을 올려서 이전 버전의 페이지 캐시를 한 번에 무효화함 (이전 페이지들은 TTL로 자연스럽게 만료)
+    """
+    try:
+        cache.incr(PRODUCT_LIST_VERSION_KEY)
+    except ValueError:
+        cache.add(PRODUCT_LIST_VERSION_KEY, 2, None)
+
+
+def get_product_counter_version() -> int:
+    version = cache.get(PRODUCT_COUNTER_VERSION_KEY)
+    if version is None:
+        cache.add(PRODUCT_COUNTER_VERSION_KEY, 1, None)
+        version = cache.get(PRODUCT_COUNTER_VERSION_KEY, 1)
+    return int(version)
+
+
+def bump_product_counter_version() -> None:
+    """
+    조회수, 좋아요 수가 db에 반영되면 그 값으로 정렬한 페이지의 순서가 바뀌므로 카운터 정렬 페이지 캐시만 무효화
+    flush 주기마다 무효화하면 캐시가 거의 사용되지 않으므로 PRODUCT_COUNTER_VERSION_BUMP_INTERVAL 동안 한 번만 버전을 올림
+    """
+    if not cache.add(f"{PRODUCT_COUNTER_VERSION_KEY}:bumped", 1, PRODUCT_COUNTER_VERSION_BUMP_INTERVAL):
+        return
+    try:
+        cache.incr(PRODUCT_COUNTER_VERSION_KEY)
+    except ValueError:
+        cache.add(PRODUCT_COUNTER_VERSION_KEY, 2, None)
+
+
+def is_counter_ordering(request: Request) -> bool:
+    # ordering 파라미터에 조회수나 좋아요 수가 포함되어 있는지 확인 (예: ?ordering=-views,created_at)
+    ordering = request.query_params.get("ordering", "")
+    return any(field.strip().lstrip("-") in PRODUCT_COUNTER_ORDERING_FIELDS for field in ordering.split(","))
+
+
+def get_product_pages_key(product_id: Any) -> str:
+    return f"{PRODUCT_LIST_KEY}:product:{product_id}:pages"
+
+
+def get_product_list_cache_key(request: Request) -> str:
+    """
+    필터, 검색, 정렬, 페이지 쿼리 파라미터를 정렬해서 해시한 값으로 페이지 캐시 키를 만듦
+    응답의 url, next, previous 링크가 host를 포함하므로 host도 키에 포함
+    """
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    raw_key = f"{request.get_host()}?{params}"
+    digest = hashlib.md5(raw_key.encode()).hexdigest()
+    if is_counter_ordering(request):
+        return f"{PRODUCT_LIST_KEY}:v{get_product_list_version()}:c{get_product_counter_version()}:{digest}"
+    return f"{PRODUCT_LIST_KEY}:v{get_product_list_version()}:{digest}"
+
+
+def set_product_list_cache(key: str, data: Any, product_ids: Iterable[Any]) -> None:
+    """
+    직렬화된 페이지를 캐싱하고, 페이지에 포함된 각 상품마다 페이지 키를 기록해서
+    상품 단위로 해당 상품이 들어있는 페이지만 무효화할 수 있도록 함
+    """
+    cache.set(key, data, PRODUCT_LIST_CACHE_TIME)
+    with redis_conn.pipeline() as pipe:
+        for product_id in product_ids:
+            pages_key = get_product_pages_key(product_id)
+            pipe.sadd(pages_key, key)
+            pipe.expire(pages_key, PRODUCT_LIST_CACHE_TIME)
+        pipe.execute()
+
+
+def invalidate_product_cache(product_id: Any) -> None:
+    # 해당 상품이 포함된 페이지 캐시만 삭제
+    pages_key = get_product_pages_key(product_id)
+    page_keys = [key.decode() for key in redis_conn.smembers(pages_key)]
+    if page_keys:
+        cache.delete_many(page_keys)
+    redis_conn.delete(pages_key)
+
+
+def get_liked_product_ids(user: Account | AnonymousUser, products: Iterable[Product]) -> set[Any]:
+    # 직렬화할 상품들 중 유저가 좋아요 한 상품의 id를 한 번의 쿼리로 가져옴
+    if not user.is_authenticated:
+        return set()
+    product_ids = [product.pk for product in products]
+    return set(Like.objects.filter(user=user, product_id__in=product_ids).values_list("product_id", flat=True))
+
+
+def get_product_viewers_key(product_id: Any, dedup_time: int) -> str:
+    # 조회수 중복 집계를 막기 위해 dedup_time 구간마다 상품을 조회한 유저/IP를 저장하는 HyperLogLog
+    return f"{PRODUCT_VIEWS_KEY}:{product_id}:viewers:{int(time.time() // dedup_time)}"
+
+
+def get_viewer_id(request: Request) -> str:
+    """
+    로그인 유저는 유저 id, 비로그인 유저는 클라이언트 IP로 구분
+    X-Forwarded-For의 첫 번째 값은 클라이언트가 마음대로 보낼 수 있으므로, drf 쓰로틀링과 같이 NUM_PROXIES 설정으로
+    신뢰하는 프록시가 추가한 가장 오른쪽 hop만 사용 (NUM_PROXIES가 0이면 REMOTE_ADDR)
+    """
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{BaseThrottle().get_ident(request)}"
+
+
+def increase_product_views(product_id: Any, viewer_id: Optional[str] = None) -> bool:
+    """
+    상품 상세 조회마다 db의 행을 잠그지 않도록 redis의 조회수만 1 증가시키고, db 반영은 flush_product_views 커맨드가 처리
+    PRODUCT_VIEW_DEDUP_TIME 이 0보다 크면 그 시간 구간 동안 같은 viewer의 조회는 한 번만 집계
+    조회수가 증가했으면 True를 반환
+    """
+    dedup_time = settings.PRODUCT_VIEW_DEDUP_TIME
+    if dedup_time > 0 and viewer_id is not None:
+        viewers_key = get_product_viewers_key(product_id, dedup_time)
+        with redis_conn.pipeline() as pipe:
+            pipe.pfadd(viewers_key, viewer_id)
+            pipe.expire(viewers_key, dedup_time)
+            added = pipe.execute()[0]
+        if not added:
+            return False
+    redis_conn.hincrby(PRODUCT_VIEWS_KEY, str(product_id), 1)
+    return True
+
+
+def restore_flushing_product_views() -> None:
+    """
+    이전 flush에서 반영하지 못하고 남은 FLUSHING 키의 조회수를 쌓이고 있는 조회수 hash에 다시 합침
+    FLUSHING 키를 그대로 두고 RENAME 하면 남아있던 조회수를 덮어쓰게 되므로 합친 뒤에 지움
+    flush 중인 FLUSHING 키를 합치지 않도록 flush_product_views 커맨드는 하나만 실행해야 함
+    """
+    with redis_conn.pipeline() as pipe:
+        try:
+            pipe.watch(PRODUCT_VIEWS_FLUSHING_KEY)
+            leftover = pipe.hgetall(PRODUCT_VIEWS_FLUSHING_KEY)
+            if not leftover:
+                return
+            pipe.multi()
+            for product_id, count in leftover.items():
+                pipe.hincrby(PRODUCT_VIEWS_KEY, product_id, int(count))
+            pipe.delete(PRODUCT_VIEWS_FLUSHING_KEY)
+            pipe.execute()
+        except WatchError:
+            # 다른 flusher가 먼저 합쳤거나 반영함
+            return
+
+
+def flush_product_views() -> int:
+    """
+    redis에 쌓인 상품별 조회수를 한 번의 UPDATE 로 Product.views 에 더하고, 반영한 상품 수를 반환
+    hash를 FLUSHING 키로 옮긴 뒤 처리하므로 flush 중에 들어온 조회수는 다음 주기에 반영됨
+    db 반영에 실패하거나 flusher가 종료되어 FLUSHING 키가 남아있으면, 그 사이 쌓인 조회수에 다시 합친 뒤 옮겨서 함께 반영
+
+    조회수가 바뀔 때마다 상품 목록 캐시를 무효화하면 캐시가 거의 사용되지 않으므로 조회수 정렬 페이지만
+    bump_product_counter_version 으로 간격을 두고 무효화하고, 다른 정렬 페이지의 조회수는 PRODUCT_LIST_CACHE_TIME 이 지나면 갱신됨
+    """
+    restore_flushing_product_views()
+    try:
+        redis_conn.rename(PRODUCT_VIEWS_KEY, PRODUCT_VIEWS_FLUSHING_KEY)
+    except ResponseError:
+        # 쌓인 조회수가 없음
+        return 0
+
+    deltas = {
+        product_id.decode(): int(count) for product_id, count in redis_conn.hgetall(PRODUCT_VIEWS_FLUSHING_KEY).items()
+    }
+    if deltas:
+        Product.objects.filter(pk__in=deltas).update(
+            views=F("views")
+            + Case(*(When(pk=product_id, then=Value(count)) for product_id, count in deltas.items()), default=0)
+        )
+        bump_product_counter_version()
+    redis_conn.delete(PRODUCT_VIEWS_FLUSHING_KEY)
+    return len(deltas)
+
+
+def get_product_facet_counts(queryset: QuerySet[Product]) -> dict[str, list[dict[str, Any]]]:
+    """
+    필터, 검색이 적용된 상품들의 카테고리, 스타일, 사이즈, 대여 가능 여부별 상품 수를 반환
+    facet마다 GROUP BY 한 결과를 UNION ALL 로 묶어서 한 번의 쿼리로 계산
+    """
+    products = Product.objects.filter(pk__in=queryset.order_by().values("pk"))
+    facet_querysets = []
+    for facet, field in PRODUCT_FACETS.items():
+        # UNION 하려면 모든 값의 타입이 같아야 하므로 대여 가능 여부(boolean)를 포함한 모든 값을 문자열로 변환
+        value_expression = (
+            Case(When(status=True, then=Value("true")), default=Value("false"), output_field=CharField())
+            if field == "status"
+            else Cast(field, output_field=CharField())
+        )
+        facet_querysets.append(
+            products.order_by()
+            .annotate(facet=Value(facet, output_field=CharField()), value=value_expression)
+            .values("facet", "value")
+            # 스타일은 상품과 다대다 관계이므로 같은 상품이 여러 번 세어지지 않도록 distinct
+            .annotate(count=Count("pk", distinct=True))
+            .values_list("facet", "value", "count")
+        )
+
+    facet_counts: dict[str, list[dict[str, Any]]] = {facet: [] for facet in PRODUCT_FACETS}
+    for facet, value, count in facet_querysets[0].union(*facet_querysets[1:], all=True):
+        # 스타일이 없는 상품은 스타일 값이 NULL 이므로 제외
+        if value is None:
+            continue
+        facet_counts[facet].append({"value": value == "true" if facet == "status" else value, "count": count})
+    for counts in facet_counts.values():
+        counts.sort(key=lambda item: (-item["count"], str(item["value"])))
+    return facet_counts
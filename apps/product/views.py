@@ -1,9 +1,11 @@
+import logging
 from typing import Any
 
 from django.db.models import QuerySet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework.generics import ListAPIView, ListCreateAPIView, UpdateAPIView
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.request import Request
@@ -11,43 +13,118 @@ from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer
 
 from apps.product.models import Product, RentalHistory
+from apps.product.pagination import ProductKeysetPagination
 from apps.product.permissions import IsLenderOrReadOnly
+from apps.product.search import ProductSearchFilter
 from apps.product.serializers import ProductSerializer, RentalHistorySerializer
-from apps.product.utils import clear_cache, get_or_set_cache
-
-CACHE_TIME = 60 * 60 * 24
-PRODUCT_KEY = "products_list"
+from apps.product.utils import (
+    PRODUCT_LIST_CACHE_TIME,
+    bump_product_list_version,
+    get_cache,
+    get_liked_product_ids,
+    get_product_facet_counts,
+    get_product_list_cache_key,
+    get_viewer_id,
+    increase_product_views,
+    invalidate_product_cache,
+    set_cache,
+    set_product_list_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+# 값이 바뀌면 필터, 검색, 정렬 결과(페이지 구성)가 달라지는 필드
+# 조회수, 좋아요 수는 수정 api로 바뀌지 않고 flush/reconcile 커맨드가 bump_product_counter_version 으로 무효화
+LIST_AFFECTING_FIELDS = ("name", "status", "product_category_id", "condition", "size", "rental_fee")
 
 
 class ProductViewSet(viewsets.ModelViewSet[Product]):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsLenderOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # 검색은 ProductSearchFilter 가 db에 맞는 검색 백엔드(Postgres 전문 검색 + trigram, SQLite는 LIKE)로 처리
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_fields = ["status", "product_category", "condition", "size", "styles"]
-    search_fields = ["name", "lender__nickname"]
     ordering_fields = ["created_at", "rental_fee", "views", "likes"]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = ProductKeysetPagination
+
+    def get_queryset(self) -> QuerySet[Product]:
+        return (
+            Product.objects.select_related("lender", "product_category")
+            .prefetch_related("images", "styles")
+            # 검색 색인(tsvector)은 응답에 사용하지 않으므로 조회하지 않음
+            .defer("search_vector")
+            .order_by("-created_at")
+        )
+
+    def get_serializer(self, *args: Any, **kwargs: Any) -> BaseSerializer[Product]:
+        # 직렬화할 상품(목록이면 현재 페이지)의 좋아요 여부를 한 번에 조회해서 context로 공유
+        if args and self.request.user.is_authenticated:
+            instance = args[0]
+            products = instance if isinstance(instance, list | QuerySet) else [instance]
+            context = kwargs.setdefault("context", self.get_serializer_context())
+            context["liked_product_ids"] = get_liked_product_ids(self.request.user, products)
+        return super().get_serializer(*args, **kwargs)
 
-    def get_queryset(self) -> Any:
-        queryset = Product.objects.all().order_by("-created_at")
-        cached_queryset = get_or_set_cache(PRODUCT_KEY, queryset, CACHE_TIME)
-        # queryset = get_cache(PRODUCT_KEY)
-        # if not queryset:
-        #     queryset = Product.objects.all().order_by("-created_at")
-        #     set_cache(PRODUCT_KEY, queryset, CACHE_TIME)
-        return cached_queryset
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        # is_liked 값이 유저마다 다르므로 비로그인 유저의 목록 조회만 캐시에서 바로 응답
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        cache_key = get_product_list_cache_key(request)
+        cached_data = get_cache(cache_key)
+        if cached_data is not None:
+            return Response(cached_data)
+
+        response = super().list(request, *args, **kwargs)
+        results = response.data.get("results", []) if isinstance(response.data, dict) else response.data
+        set_product_list_cache(cache_key, response.data, [product["uuid"] for product in results])
+        return response
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request: Request) -> Response:
+        """
+        목록 조회와 같은 필터, 검색 파라미터를 받아서 카테고리, 스타일, 사이즈, 대여 가능 여부별 상품 수를 반환
+        결과는 유저와 상관없으므로 모든 요청을 상품 목록 캐시 버전으로 캐싱
+        """
+        cache_key = f"{get_product_list_cache_key(request)}:facets"
+        facet_counts = get_cache(cache_key)
+        if facet_counts is None:
+            facet_counts = get_product_facet_counts(self.filter_queryset(self.get_queryset()))
+            set_cache(cache_key, facet_counts, PRODUCT_LIST_CACHE_TIME)
+        return Response(facet_counts)
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        response = super().retrieve(request, *args, **kwargs)
+        try:
+            # 조회수는 redis에만 증가시키고 flush_product_views 커맨드가 모아서 db에 반영
+            increase_product_views(response.data["uuid"], get_viewer_id(request))
+        except Exception as e:
+            # 조회수 집계에 실패해도 상세 조회는 정상 응답
+            logger.error("예외 발생: %s", e, exc_info=True)
+        return response
 
     def perform_create(self, serializer: BaseSerializer[Product]) -> None:
         serializer.save(lender=self.request.user)
-        clear_cache(PRODUCT_KEY)
+        bump_product_list_version()
 
     def perform_update(self, serializer: BaseSerializer[Product]) -> None:
-        serializer.save()
-        clear_cache(PRODUCT_KEY)
+        instance: Product = serializer.instance  # type: ignore
+        before = [getattr(instance, field) for field in LIST_AFFECTING_FIELDS]
+        before_styles = set(instance.styles.values_list("id", flat=True))
+        product = serializer.save()
+
+        after = [getattr(product, field) for field in LIST_AFFECTING_FIELDS]
+        after_styles = set(product.styles.values_list("id", flat=True))
+        if before != after or before_styles != after_styles:
+            bump_product_list_version()
+        invalidate_product_cache(product.pk)
 
     def perform_destroy(self, instance: Product) -> None:
+        product_id = instance.pk
         instance.delete()
-        clear_cache(PRODUCT_KEY)
+        bump_product_list_version()
+        invalidate_product_cache(product_id)
 
 
 class RentalHistoryBorrowerView(ListCreateAPIView[RentalHistory]):
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+import apps.user.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Account",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("password", models.CharField(max_length=128, verbose_name="password")),
+                ("last_login", models.DateTimeField(blank=True, null=True, verbose_name="last login")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("email", models.EmailField(max_length=100, unique=True)),
+                ("nickname", models.CharField(max_length=15, unique=True)),
+                ("age", models.IntegerField(blank=True, null=True)),
+                ("gender", models.CharField(blank=True, max_length=7, null=True)),
+                ("height", models.IntegerField(blank=True, null=True)),
+                ("region", models.CharField(blank=True, max_length=30, null=True)),
+                ("phone", models.CharField(max_length=15)),
+                ("grade", models.CharField(blank=True, max_length=10, null=True)),
+                (
+                    "profile_img",
+                    models.ImageField(blank=True, null=True, upload_to=apps.user.models.upload_to_s3_account),
+                ),
+                ("is_staff", models.BooleanField(default=False)),
+                ("is_active", models.BooleanField(default=True)),
+                ("is_superuser", models.BooleanField(default=False)),
+                (
+                    "groups",
+                    models.ManyToManyField(
+                        blank=True,
+                        help_text="The groups this user belongs to. A user will get all permissions granted to each of their groups.",
+                        related_name="user_set",
+                        related_query_name="user",
+                        to="auth.group",
+                        verbose_name="groups",
+                    ),
+                ),
+                (
+                    "user_permissions",
+                    models.ManyToManyField(
+                        blank=True,
+                        help_text="Specific permissions for this user.",
+                        related_name="user_set",
+                        related_query_name="user",
+                        to="auth.permission",
+                        verbose_name="user permissions",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
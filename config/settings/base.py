@@ -29,6 +29,7 @@ DJANGO_SYSTEM_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
 ]
 
 CUSTOM_USER_APPS = [
@@ -152,6 +153,8 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 24,
+    # X-Forwarded-For에서 신뢰하는 프록시 수, 클라이언트 IP는 오른쪽에서 이 수번째 값을 사용 (0이면 REMOTE_ADDR)
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
 }
 
 # drf-spectacular 관련 설정
@@ -208,3 +211,54 @@ REST_AUTH = {
     "JWT_AUTH_COOKIE_USE_CSRF": False,  # default: False
     "JWT_AUTH_COOKIE_ENFORCE_CSRF_ON_UNAUTHENTICATED": False,
 }
+
+# 채팅 메시지 write-behind(flush_chat_messages 커맨드) 관련 설정
+CHAT_FLUSH_MAX_MESSAGES = 100  # 채팅방에 캐싱된 메시지가 이 수 이상이면 db에 저장
+CHAT_FLUSH_MAX_AGE = 30  # 메시지가 처음 캐싱된 뒤 이 시간(초)이 지나면 db에 저장
+CHAT_FLUSH_INTERVAL = 1  # flush 대상 채팅방을 확인하는 주기(초)
+# 채팅 메시지를 캐싱할 redis 자료구조 ("list": LIST, "stream": consumer group으로 저장하는 Redis Stream)
+CHAT_MESSAGE_STORE = os.environ.get("CHAT_MESSAGE_STORE", "list")
+CHAT_STREAM_CONSUMER = os.environ.get("HOSTNAME", "chat-flusher")  # stream 모드에서 flusher의 consumer 이름
+CHAT_STREAM_CLAIM_IDLE = 60  # 다른 flusher가 이 시간(초) 이상 처리하지 못한 메시지는 가져와서 저장
+# 채팅방별로 이 시간(초) 동안 들어온 메시지를 모아서 한 번에 저장하고 chat_messages 프레임으로 전송 (0이면 메시지마다 전송)
+CHAT_MESSAGE_BATCH_WINDOW = float(os.environ.get("CHAT_MESSAGE_BATCH_WINDOW", 0))
+CHAT_MESSAGE_BATCH_MAX_RETRIES = (
+    5  # redis 저장에 실패한 메시지를 다시 저장하는 최대 횟수 (window * 2^횟수 뒤에 다시 시도)
+)
+CHAT_MESSAGE_BATCH_MAX_PENDING = 1000  # 채팅방별로 모아둘 수 있는 최대 메시지 수 (넘치는 메시지는 버리고 로그를 남김)
+
+# 채널 레이어 방식 ("sharded": 그룹을 sorted set, 메시지를 채널별 list로 저장, "pubsub": Redis pub/sub으로 바로 전달)
+# pubsub은 redis 명령 수가 적고 지연시간이 짧지만, 구독중이 아닌 채널로 보낸 메시지는 저장되지 않고 버려짐
+CHANNEL_LAYER_MODE = os.environ.get("CHANNEL_LAYER_MODE", "sharded")
+CHANNEL_LAYER_BACKENDS = {
+    "sharded": "apps.core.channel_layers.ShardedRedisChannelLayer",
+    "pubsub": "channels_redis.pubsub.RedisPubSubChannelLayer",
+}
+
+# 채팅방 접속 상태(presence) 관련 설정
+CHAT_PRESENCE_TTL = 30  # heartbeat 없이 이 시간(초)이 지난 연결은 접속중이 아닌 것으로 판단
+CHAT_PRESENCE_HEARTBEAT_INTERVAL = 10  # 접속 상태의 만료 시각을 연장하는 주기(초)
+CHAT_PRESENCE_CACHE_TIME = 5  # 소켓 연결마다 캐싱한 상대방 접속 상태를 다시 확인하는 주기(초)
+
+# 대여 알림 outbox(dispatch_notifications 커맨드) 관련 설정
+NOTIFICATION_DISPATCH_BATCH_SIZE = 100  # 한 번에 생성하고 전송할 알림 이벤트 수
+NOTIFICATION_DISPATCH_INTERVAL = 1  # outbox에 쌓인 알림 이벤트를 확인하는 주기(초)
+NOTIFICATION_DISPATCH_LEASE = 30  # 알림을 저장하고 전송중인 이벤트를 다른 dispatcher가 다시 가져가지 않는 시간(초)
+
+# 상품 조회수(flush_product_views 커맨드) 관련 설정
+PRODUCT_VIEW_DEDUP_TIME = 60 * 60  # 같은 유저/IP의 조회는 이 시간(초) 동안 한 번만 집계 (0이면 모든 조회를 집계)
+PRODUCT_VIEWS_FLUSH_INTERVAL = 10  # redis에 쌓인 조회수를 db에 반영하는 주기(초)
+
+# 상품 좋아요 수 관련 설정
+# "direct": 좋아요 요청마다 Product.likes 를 UPDATE, "buffered": redis에 증감만 기록하고 reconcile_product_likes 커맨드가 모아서 다시 계산
+LIKE_COUNTER_MODE = os.environ.get("LIKE_COUNTER_MODE", "direct")
+PRODUCT_LIKES_RECONCILE_INTERVAL = 5  # 좋아요 수가 바뀐 상품의 Product.likes 를 다시 계산하는 주기(초)
+
+# 카테고리/스타일 목록 캐시 관련 설정
+TAXONOMY_CACHE_TIME = 60 * 60 * 24  # redis에 캐싱하는 시간(초), 저장/삭제되면 버전이 바뀌어서 바로 무효화
+TAXONOMY_LOCAL_CACHE_TIME = 5  # 프로세스 메모리에 캐싱한 목록의 버전을 redis에서 다시 확인하는 주기(초)
+
+# 채팅 이미지 업로드 관련 설정
+CHAT_IMAGE_MAX_SIZE = 10 * 1024 * 1024  # 업로드할 수 있는 이미지 최대 크기(byte)
+CHAT_IMAGE_THUMBNAIL_SIZE = (320, 320)  # 미리보기 이미지 최대 크기(px)
+CHAT_IMAGE_MAX_PIXELS = 40_000_000  # 미리보기를 만들 이미지의 최대 픽셀 수 (넘으면 디코딩하지 않고 미리보기 없이 저장)
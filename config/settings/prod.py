@@ -1,5 +1,6 @@
 from ast import literal_eval
 from datetime import timedelta
+from urllib.parse import quote
 
 import sentry_sdk
 
@@ -56,12 +57,22 @@ CSRF_COOKIE_SAMESITE = "None"
 CSRF_COOKIE_HTTPONLY = False
 CSRF_COOKIE_DOMAIN = ENV["DOMAIN"]
 
+# 앞단의 nginx가 X-Forwarded-For에 클라이언트 IP를 추가하므로 가장 오른쪽 hop 하나만 신뢰
+REST_FRAMEWORK["NUM_PROXIES"] = int(ENV.get("NUM_PROXIES", 1))
 
+
+# 채널 레이어를 여러 redis 호스트로 나눌 때는 쉼표로 구분한 redis url 목록을 설정 (없으면 캐시와 같은 호스트 사용)
+# 그룹 이름을 consistent hashing 으로 호스트에 배정하고, 연결 풀은 캐시와 따로 관리됨
+CHANNEL_REDIS_HOSTS = ENV.get("CHANNEL_REDIS_HOSTS", "")
+# 호스트는 항상 redis url 로 지정, 기본값은 캐시와 같은 redis 를 같은 비밀번호로 사용
+CHANNEL_REDIS_DEFAULT_URL = (
+    f"redis://:{quote(ENV['CACHES_PASSWORD'], safe='')}@{ENV['REDIS_HOST']}:{ENV['REDIS_PORT']}/0"
+)
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": CHANNEL_LAYER_BACKENDS[CHANNEL_LAYER_MODE],
         "CONFIG": {
-            "hosts": [(ENV["REDIS_HOST"], ENV["REDIS_PORT"])],
+            "hosts": CHANNEL_REDIS_HOSTS.split(",") if CHANNEL_REDIS_HOSTS else [CHANNEL_REDIS_DEFAULT_URL],
         },
     },
 }
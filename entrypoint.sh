@@ -6,7 +6,6 @@ ln -sf prod.py config/settings/settings.py
 #sudo apt-get install vim -y
 export DJANGO_SETTINGS_MODULE=config.settings.settings
 
-python manage.py makemigrations
 python manage.py migrate
 python manage.py collectstatic --noinput
 python manage.py shell < tools/create_superuser.py
@@ -16,4 +15,6 @@ python manage.py shell < tools/create_superuser.py
 #uvicorn config.asgi:application --workers 4
 #gunicorn config.asgi:application  -w 4 -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
 
+# 백그라운드 커맨드(flush_chat_messages, dispatch_notifications 등)는 docker-compose.yml 의 worker 서비스로 따로 실행
+
 gunicorn config.asgi:application -c tools/gunicorn_prod.conf.py
@@ -0,0 +1,119 @@
+"""
+채널 레이어 group_send fan-out 처리량과 메시지 전달 지연시간 측정
+
+여러 로컬 redis 인스턴스를 띄운 뒤 호스트 목록을 넘겨서 실행
+    redis-server --port 6380 --daemonize yes
+    redis-server --port 6381 --daemonize yes
+    python -m tools.benchmark_channel_layer --hosts redis://127.0.0.1:6379 redis://127.0.0.1:6380 redis://127.0.0.1:6381
+
+chat_<id> 그룹마다 --members 개의 채널을 추가하고 --messages 개의 메시지를 그룹들에 나눠서 보낸 뒤
+모든 채널이 메시지를 받을 때까지의 전송/수신 처리량과 호스트별 그룹 수를 출력
+처리량 측정 후에는 1:1 채팅방 그룹에 메시지를 하나씩 보내서 두 채널이 모두 받을 때까지의 지연시간을 측정
+
+--backend 로 sorted set + 채널별 list 기반 레이어(default, sharded)와 pub/sub 레이어(pubsub)를 비교
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from typing import Any
+
+from channels_redis.core import RedisChannelLayer
+from channels_redis.pubsub import RedisPubSubChannelLayer
+
+from apps.core.channel_layers import ShardedRedisChannelLayer
+
+BACKENDS = {
+    "sharded": ShardedRedisChannelLayer,
+    "default": RedisChannelLayer,
+    "pubsub": RedisPubSubChannelLayer,
+}
+
+
+async def receive_messages(layer: Any, channel: str, expected: int) -> int:
+    for _ in range(expected):
+        await layer.receive(channel)
+    return expected
+
+
+async def measure_latency(layer: Any, samples: int) -> list[float]:
+    # 1:1 채팅방처럼 두 채널이 속한 그룹에 메시지를 하나씩 보내고 두 채널이 모두 받을 때까지 기다림
+    group_name = "chat_latency"
+    channels = [await layer.new_channel() for _ in range(2)]
+    for channel in channels:
+        await layer.group_add(group_name, channel)
+    latencies = []
+    for _ in range(samples):
+        started_at = time.perf_counter()
+        await layer.group_send(group_name, {"type": "chat.message"})
+        await asyncio.gather(*(layer.receive(channel) for channel in channels))
+        latencies.append(time.perf_counter() - started_at)
+    for channel in channels:
+        await layer.group_discard(group_name, channel)
+    return latencies
+
+
+async def run(options: argparse.Namespace) -> None:
+    layer = BACKENDS[options.backend](hosts=options.hosts, capacity=options.messages * options.members)
+    group_names = [f"chat_{i}" for i in range(options.groups)]
+    group_channels: dict[str, list[str]] = {}
+    for group_name in group_names:
+        group_channels[group_name] = [await layer.new_channel() for _ in range(options.members)]
+        for channel in group_channels[group_name]:
+            await layer.group_add(group_name, channel)
+
+    # 메시지를 그룹에 순서대로 나눠서 보내므로 그룹마다 받을 메시지 수를 미리 계산
+    messages_per_group = Counter(group_names[i % options.groups] for i in range(options.messages))
+    receivers = [
+        asyncio.create_task(receive_messages(layer, channel, messages_per_group[group_name]))
+        for group_name, channels in group_channels.items()
+        for channel in channels
+    ]
+
+    started_at = time.perf_counter()
+    for start in range(0, options.messages, options.concurrency):
+        await asyncio.gather(
+            *(
+                layer.group_send(group_names[i % options.groups], {"type": "chat.message"})
+                for i in range(start, min(start + options.concurrency, options.messages))
+            )
+        )
+    sent_at = time.perf_counter()
+    delivered = sum(await asyncio.gather(*receivers))
+    finished_at = time.perf_counter()
+
+    print(f"backend: {options.backend}, hosts: {len(options.hosts)}")
+    print(f"group_send: {options.messages / (sent_at - started_at):.0f} msg/s")
+    print(f"delivered: {delivered / (finished_at - started_at):.0f} msg/s ({delivered} messages)")
+    # pub/sub 레이어는 호스트 배정 방식을 외부에 노출하지 않음
+    if hasattr(BACKENDS[options.backend], "consistent_hash"):
+        shards = Counter(layer.consistent_hash(group_name) for group_name in group_names)
+        print(f"groups per host: {[shards[index] for index in range(len(options.hosts))]}")
+
+    latencies = await measure_latency(layer, options.latency_samples)
+    print(
+        f"1:1 room latency: p50 {statistics.median(latencies) * 1000:.2f}ms, "
+        f"p99 {statistics.quantiles(latencies, n=100)[98] * 1000:.2f}ms"
+    )
+
+    for group_name, channels in group_channels.items():
+        for channel in channels:
+            await layer.group_discard(group_name, channel)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure channel layer group_send fan-out throughput.")
+    parser.add_argument("--hosts", nargs="+", default=["redis://127.0.0.1:6379"])
+    parser.add_argument("--backend", choices=BACKENDS, default="sharded")
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--members", type=int, default=2, help="Channels added to each group.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20, help="group_send calls awaited together.")
+    parser.add_argument("--latency-samples", type=int, default=500, help="Messages sent one by one to a 1:1 room.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()